@@ -56,13 +56,13 @@ def create_app(config_name=None) -> Flask:
         jti = jwt_payload['jti']
         return jti in blacklisted_tokens
     
-    # Ensure upload folder exists
-    upload_path: str = app.config['UPLOAD_FOLDER']  # type: ignore
-    os.makedirs(upload_path, exist_ok=True)
-    
-    # Create database tables
-    with app.app_context():
-        db.create_all()
+    # Schema setup belongs to `flask init-db` / migrations; workers only build an empty
+    # database when asked, so the factory stays cheap and safe to run once in a preloading master
+    if app.config['AUTO_CREATE_SCHEMA']:
+        from app.schema import create_if_empty, ensure_upload_folder
+        ensure_upload_folder(app)
+        with app.app_context():
+            create_if_empty()
     
     # Register web routes (existing functionality)
     from app.routes import main
@@ -74,4 +74,12 @@ def create_app(config_name=None) -> Flask:
     from app.api import init_api
     init_api(app)
     
+    # Register CLI commands
+    from app.jobs import fail_interrupted_jobs_command
+    from app.rollups import rollups_cli
+    from app.schema import init_db_command
+    app.cli.add_command(rollups_cli)
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(fail_interrupted_jobs_command)
+    
     return app
@@ -0,0 +1,238 @@
+"""
+Database-side aggregates behind the summary and report endpoints
+
+Totals, category and monthly breakdowns are read from the per-user
+monthly rollup whenever the requested range covers whole months (or is
+unbounded), so their cost depends on the number of months and categories.
+Other ranges read the transactions themselves: during a request they are
+loaded once into NumPy columns (see app.columnar) shared by every
+breakdown of that request, elsewhere each function runs a single GROUP BY.
+Money is summed and returned as integer paise; callers convert with
+to_rupees where they build API, chart or PDF output. Sums over no rows
+come back as 0, and all paths order their groups the same way.
+"""
+from datetime import timedelta
+
+from flask import has_request_context
+from sqlalchemy import case, func
+
+from app import columnar
+from app.models import db, Transaction, TransactionRollup, sum_paise
+from app.periods import period_start
+from app.rollups import month_of
+
+
+def _or_zero(value):
+    """SUM over no rows is NULL; report it as 0 like an empty Python sum"""
+    return value or 0
+
+
+def _income():
+    return sum_paise(case((Transaction.amount_paise > 0, Transaction.amount_paise)))
+
+
+def _expenses():
+    return sum_paise(case((Transaction.amount_paise < 0, -Transaction.amount_paise)))
+
+
+def _month():
+    """First day of a transaction's month, the raw-table counterpart of the rollup month"""
+    return period_start('month', Transaction.date)
+
+
+def rollup_months(start_date=None, end_date=None):
+    """The (first, last) rollup months covering a date range, or None if it splits a month.
+
+    Either end may be None for an open range.
+    """
+    if start_date and start_date.day != 1:
+        return None
+    if end_date and (end_date + timedelta(days=1)).day != 1:
+        return None
+    return (month_of(start_date) if start_date else None, month_of(end_date) if end_date else None)
+
+
+def raw_columns(user_id, start_date=None, end_date=None):
+    """The request's columnar copy of a range the rollup cannot answer, or None outside a request"""
+    if not has_request_context():
+        return None
+    return columnar.for_request(user_id, start_date, end_date)
+
+
+def scoped(query, user_id, start_date=None, end_date=None):
+    """Restrict a query to one user's transactions, optionally within a date range"""
+    query = query.filter(Transaction.user_id == user_id)
+    if start_date:
+        query = query.filter(Transaction.date >= start_date)
+    if end_date:
+        query = query.filter(Transaction.date <= end_date)
+    return query
+
+
+def rollup_scoped(query, user_id, months):
+    """Restrict a rollup query to one user and an inclusive (first, last) month range"""
+    first, last = months
+    query = query.filter(TransactionRollup.user_id == user_id)
+    if first:
+        query = query.filter(TransactionRollup.month >= first)
+    if last:
+        query = query.filter(TransactionRollup.month <= last)
+    return query
+
+
+def totals(user_id, start_date=None, end_date=None):
+    """Total income, total expenses (positive) and transaction count in one pass"""
+    months = rollup_months(start_date, end_date)
+    if months:
+        query = rollup_scoped(
+            db.session.query(sum_paise(TransactionRollup.income_paise), sum_paise(TransactionRollup.expenses_paise),
+                             func.sum(TransactionRollup.count)),
+            user_id, months
+        )
+    else:
+        columns = raw_columns(user_id, start_date, end_date)
+        if columns is not None:
+            return columns.totals()
+        query = scoped(
+            db.session.query(_income(), _expenses(), func.count(Transaction.id)),
+            user_id, start_date, end_date
+        )
+
+    income, expenses, count = query.one()
+    return {
+        'total_income': _or_zero(income),
+        'total_expenses': _or_zero(expenses),
+        'transaction_count': count or 0
+    }
+
+
+def category_totals(user_id, start_date=None, end_date=None):
+    """Net total and count per category, by the month each category first appears, then name"""
+    months = rollup_months(start_date, end_date)
+    if months:
+        rows = rollup_scoped(
+            db.session.query(TransactionRollup.category, sum_paise(TransactionRollup.total_paise),
+                             func.sum(TransactionRollup.count)),
+            user_id, months
+        ).group_by(TransactionRollup.category)\
+         .order_by(func.min(TransactionRollup.month), TransactionRollup.category)\
+         .all()
+    else:
+        columns = raw_columns(user_id, start_date, end_date)
+        if columns is not None:
+            return columns.category_totals()
+        rows = scoped(
+            db.session.query(Transaction.category, sum_paise(Transaction.amount_paise), func.count(Transaction.id)),
+            user_id, start_date, end_date
+        ).group_by(Transaction.category)\
+         .order_by(func.min(_month()), Transaction.category)\
+         .all()
+    return [{'category': category, 'total': total, 'count': count} for category, total, count in rows]
+
+
+def expense_categories(user_id, start_date=None, end_date=None):
+    """Expense total (positive) per category, by the latest month with an expense, then name"""
+    months = rollup_months(start_date, end_date)
+    if months:
+        rows = rollup_scoped(
+            db.session.query(TransactionRollup.category, sum_paise(TransactionRollup.expenses_paise)),
+            user_id, months
+        ).filter(TransactionRollup.expenses_paise > 0)\
+         .group_by(TransactionRollup.category)\
+         .order_by(func.max(TransactionRollup.month).desc(), TransactionRollup.category)\
+         .all()
+    else:
+        columns = raw_columns(user_id, start_date, end_date)
+        if columns is not None:
+            return columns.expense_categories()
+        rows = scoped(
+            db.session.query(Transaction.category, sum_paise(-Transaction.amount_paise)),
+            user_id, start_date, end_date
+        ).filter(Transaction.amount_paise < 0)\
+         .group_by(Transaction.category)\
+         .order_by(func.max(_month()).desc(), Transaction.category)\
+         .all()
+    return [(category, total) for category, total in rows]
+
+
+def monthly_totals(user_id, start_date=None, end_date=None):
+    """Income, expenses (positive) and net total per YYYY-MM month, oldest first"""
+    months = rollup_months(start_date, end_date)
+    if months:
+        rows = rollup_scoped(
+            db.session.query(TransactionRollup.month, sum_paise(TransactionRollup.income_paise),
+                             sum_paise(TransactionRollup.expenses_paise), sum_paise(TransactionRollup.total_paise)),
+            user_id, months
+        ).group_by(TransactionRollup.month).order_by(TransactionRollup.month).all()
+    else:
+        columns = raw_columns(user_id, start_date, end_date)
+        if columns is not None:
+            return columns.monthly_totals()
+        month = _month()
+        rows = [
+            (month_of(first_day), income, expenses, total)
+            for first_day, income, expenses, total in scoped(
+                db.session.query(month, _income(), _expenses(), sum_paise(Transaction.amount_paise)),
+                user_id, start_date, end_date
+            ).group_by(month).order_by(month).all()
+        ]
+    return [
+        {
+            'month': month,
+            'income': _or_zero(income),
+            'expenses': _or_zero(expenses),
+            'total': total
+        }
+        for month, income, expenses, total in rows
+    ]
+
+
+def overview(user_id):
+    """Totals, category and monthly breakdowns of all of a user's data in one rollup query.
+
+    Returns (totals, category_totals, monthly_totals) shaped and ordered like
+    the functions above; the rollup rows are folded together in Python.
+    """
+    rows = db.session.query(
+        TransactionRollup.month, TransactionRollup.category, TransactionRollup.total_paise,
+        TransactionRollup.count, TransactionRollup.income_paise, TransactionRollup.expenses_paise
+    ).filter(TransactionRollup.user_id == user_id)\
+     .order_by(TransactionRollup.month, TransactionRollup.category)\
+     .all()
+
+    summary = {'total_income': 0, 'total_expenses': 0, 'transaction_count': 0}
+    categories = {}
+    months = {}
+    for month, category, total, count, income, expenses in rows:
+        summary['total_income'] += income
+        summary['total_expenses'] += expenses
+        summary['transaction_count'] += count
+
+        by_category = categories.setdefault(category, {'category': category, 'total': 0, 'count': 0})
+        by_category['total'] += total
+        by_category['count'] += count
+
+        by_month = months.setdefault(month, {'month': month, 'income': 0, 'expenses': 0, 'total': 0})
+        by_month['income'] += income
+        by_month['expenses'] += expenses
+        by_month['total'] += total
+
+    return summary, list(categories.values()), list(months.values())
+
+
+def top_transactions(user_id, expenses=True, limit=10, start_date=None, end_date=None):
+    """Largest expense (or income) transactions, biggest first.
+
+    Walks ix_transaction_user_amount from the most negative (or most positive)
+    end and stops after ``limit`` rows, so the cost does not grow with history.
+    """
+    if rollup_months(start_date, end_date) is None:
+        columns = raw_columns(user_id, start_date, end_date)
+        if columns is not None:
+            return columns.top_transactions(expenses, limit)
+    query = scoped(Transaction.query, user_id, start_date, end_date)
+    if expenses:
+        query = query.filter(Transaction.amount_paise < 0).order_by(Transaction.amount_paise.asc(), Transaction.id)
+    else:
+        query = query.filter(Transaction.amount_paise > 0).order_by(Transaction.amount_paise.desc(), Transaction.id)
+    return query.limit(limit).all()
@@ -2,7 +2,8 @@
 API package initialization
 """
 from flask_restx import Api
-from flask_jwt_extended import JWTManager
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt.exceptions import PyJWTError
 
 # Initialize extensions
 api = Api(
@@ -13,12 +14,16 @@ api = Api(
     prefix='/api/v1'
 )
 
-jwt = JWTManager()
+# flask-restx handles errors before Flask-JWT-Extended can, so missing, invalid
+# and revoked tokens would otherwise surface as 500s
+@api.errorhandler(JWTExtendedException)
+@api.errorhandler(PyJWTError)
+def handle_auth_error(error):
+    return {'message': str(error) or 'Invalid token'}, 401
 
 def init_api(app):
-    """Initialize API extensions with Flask app"""
+    """Initialize API extensions with Flask app; JWT is set up once, by create_app"""
     api.init_app(app)
-    jwt.init_app(app)
     
     # Import namespaces after initialization to avoid circular imports
     from .auth import api as auth_ns
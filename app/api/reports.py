@@ -1,17 +1,16 @@
 """
 Reports API endpoints
 """
-from flask import request, send_file
+from flask import current_app, request, send_file
 from flask_restx import Namespace, Resource, fields
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from io import BytesIO
-import json
-import plotly
-import plotly.graph_objs as go
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from sqlalchemy import func
 
-from app.models import Transaction, User, db
+from app import aggregates, balances, cache, charts, downsample, jobs, pdfs, timeseries
+from app.models import db, ReportJob, Transaction, User, to_rupees
+from app.periods import UNITS
 
 api = Namespace('reports', description='Report generation operations')
 
@@ -22,6 +21,90 @@ report_request_model = api.model('ReportRequest', {
     'categories': fields.List(fields.String, description='Filter by categories')
 })
 
+pdf_request_model = api.model('PDFReportRequest', {
+    'start_date': fields.String(description='Start date (YYYY-MM-DD)'),
+    'end_date': fields.String(description='End date (YYYY-MM-DD)'),
+    'detail_rows': fields.Integer(description='List up to this many of the latest transactions (default 0)')
+})
+
+def summary_report(user_id, start_date=None, end_date=None, top_n=10):
+    """Totals, monthly and category breakdowns and the top_n largest transactions for a date range"""
+    # Basic calculations
+    summary = aggregates.totals(user_id, start_date, end_date)
+    
+    if not summary['transaction_count']:
+        return {
+            'total_income': 0,
+            'total_expenses': 0,
+            'net_balance': 0,
+            'transaction_count': 0,
+            'monthly_breakdown': [],
+            'category_breakdown': [],
+            'top_expenses': [],
+            'income_sources': []
+        }
+    
+    # Sums arrive in paise and become rupees only here
+    total_income = summary['total_income']
+    total_expenses = summary['total_expenses']
+    
+    # Monthly breakdown
+    monthly_breakdown = [
+        {
+            'month': month['month'],
+            'income': to_rupees(month['income']),
+            'expenses': to_rupees(month['expenses']),
+            'net': to_rupees(month['income'] - month['expenses'])
+        }
+        for month in aggregates.monthly_totals(user_id, start_date, end_date)
+    ]
+    
+    # Category breakdown
+    category_breakdown = [
+        {
+            'category': data['category'],
+            'total': to_rupees(data['total']),
+            'count': data['count'],
+            'percentage': (abs(data['total']) / (total_income + total_expenses)) * 100 if (total_income + total_expenses) > 0 else 0
+        }
+        for data in aggregates.category_totals(user_id, start_date, end_date)
+    ]
+    
+    # Top expenses (largest expense transactions)
+    top_expenses = [
+        {
+            'date': t.date.strftime('%Y-%m-%d'),
+            'category': t.category,
+            'amount': abs(t.amount),
+            'description': t.description
+        }
+        for t in aggregates.top_transactions(user_id, expenses=True, limit=top_n,
+                                             start_date=start_date, end_date=end_date)
+    ]
+    
+    # Income sources
+    income_sources = [
+        {
+            'date': t.date.strftime('%Y-%m-%d'),
+            'category': t.category,
+            'amount': t.amount,
+            'description': t.description
+        }
+        for t in aggregates.top_transactions(user_id, expenses=False, limit=top_n,
+                                             start_date=start_date, end_date=end_date)
+    ]
+    
+    return {
+        'total_income': to_rupees(total_income),
+        'total_expenses': to_rupees(total_expenses),
+        'net_balance': to_rupees(total_income - total_expenses),
+        'transaction_count': summary['transaction_count'],
+        'monthly_breakdown': monthly_breakdown,
+        'category_breakdown': category_breakdown,
+        'top_expenses': top_expenses,
+        'income_sources': income_sources
+    }
+
 @api.route('/summary')
 class ReportSummary(Resource):
     @jwt_required()
@@ -33,112 +116,110 @@ class ReportSummary(Resource):
         parser = api.parser()
         parser.add_argument('start_date', type=str, help='Start date (YYYY-MM-DD)')
         parser.add_argument('end_date', type=str, help='End date (YYYY-MM-DD)')
+        parser.add_argument('top_n', type=int, help='Number of top expenses and income sources (default REPORT_TOP_N)')
         args = parser.parse_args()
         
-        query = Transaction.query.filter_by(user_id=current_user_id)
+        start_date = end_date = None
+        top_n = current_app.config['REPORT_TOP_N'] if args['top_n'] is None else args['top_n']
+        if not 1 <= top_n <= current_app.config['REPORT_TOP_N_MAX']:
+            api.abort(400, f"top_n must be between 1 and {current_app.config['REPORT_TOP_N_MAX']}")
         
         # Apply date filters
         if args['start_date']:
             start_date = datetime.strptime(args['start_date'], '%Y-%m-%d').date()
-            query = query.filter(Transaction.date >= start_date)
         
         if args['end_date']:
             end_date = datetime.strptime(args['end_date'], '%Y-%m-%d').date()
-            query = query.filter(Transaction.date <= end_date)
-        
-        transactions = query.all()
-        
-        if not transactions:
-            return {
-                'total_income': 0,
-                'total_expenses': 0,
-                'net_balance': 0,
-                'transaction_count': 0,
-                'monthly_breakdown': [],
-                'category_breakdown': [],
-                'top_expenses': [],
-                'income_sources': []
-            }
-        
-        # Basic calculations
-        total_income = sum(t.amount for t in transactions if t.amount > 0)
-        total_expenses = sum(abs(t.amount) for t in transactions if t.amount < 0)
-        net_balance = total_income - total_expenses
-        
-        # Monthly breakdown
-        monthly_data = {}
-        for t in transactions:
-            month_key = t.date.strftime('%Y-%m')
-            if month_key not in monthly_data:
-                monthly_data[month_key] = {'income': 0, 'expenses': 0}
-            
-            if t.amount > 0:
-                monthly_data[month_key]['income'] += t.amount
-            else:
-                monthly_data[month_key]['expenses'] += abs(t.amount)
-        
-        monthly_breakdown = [
-            {
-                'month': month,
-                'income': data['income'],
-                'expenses': data['expenses'],
-                'net': data['income'] - data['expenses']
-            }
-            for month, data in sorted(monthly_data.items())
-        ]
-        
-        # Category breakdown
-        category_data = {}
-        for t in transactions:
-            if t.category not in category_data:
-                category_data[t.category] = {'total': 0, 'count': 0}
-            category_data[t.category]['total'] += t.amount
-            category_data[t.category]['count'] += 1
-        
-        category_breakdown = [
-            {
-                'category': cat,
-                'total': data['total'],
-                'count': data['count'],
-                'percentage': (abs(data['total']) / (total_income + total_expenses)) * 100 if (total_income + total_expenses) > 0 else 0
-            }
-            for cat, data in category_data.items()
-        ]
-        
-        # Top expenses (largest expense transactions)
-        top_expenses = [
-            {
-                'date': t.date.strftime('%Y-%m-%d'),
-                'category': t.category,
-                'amount': abs(t.amount),
-                'description': t.description
-            }
-            for t in sorted([t for t in transactions if t.amount < 0], 
-                          key=lambda x: abs(x.amount), reverse=True)[:10]
-        ]
         
-        # Income sources
-        income_sources = [
-            {
-                'date': t.date.strftime('%Y-%m-%d'),
-                'category': t.category,
-                'amount': t.amount,
-                'description': t.description
-            }
-            for t in sorted([t for t in transactions if t.amount > 0], 
-                          key=lambda x: x.amount, reverse=True)[:10]
-        ]
-        
-        return {
-            'total_income': total_income,
-            'total_expenses': total_expenses,
-            'net_balance': net_balance,
-            'transaction_count': len(transactions),
-            'monthly_breakdown': monthly_breakdown,
-            'category_breakdown': category_breakdown,
-            'top_expenses': top_expenses,
-            'income_sources': income_sources
-        }
+        return cache.conditional_json(
+            'reports.summary', current_user_id, {'start_date': start_date, 'end_date': end_date, 'top_n': top_n},
+            lambda: summary_report(current_user_id, start_date, end_date, top_n)
+        )
+
+def chart_payload(user_id, max_points=None):
+    """Plotly overview, expense category, monthly and balance charts as JSON-ready dicts.
+
+    With max_points, the monthly chart sums runs of consecutive months and
+    the balance line keeps the points LTTB picks, so neither has more.
+    """
+    summary = aggregates.totals(user_id)
+    
+    if not summary['transaction_count']:
+        return {'charts': {}}
+    
+    # Calculate totals
+    total_income = to_rupees(summary['total_income'])
+    total_expenses = to_rupees(summary['total_expenses'])
+    net_balance = to_rupees(summary['total_income'] - summary['total_expenses'])
+    
+    figures = {}
+    
+    # Specs are plain dicts, so the cache encodes each response exactly once
+    # 1. Financial Overview Bar Chart
+    figures['overview'] = charts.figure(
+        charts.layout('Financial Overview', yaxis_title='Amount (₹)'),
+        charts.bar(
+            ['Income', 'Expenses', 'Net Balance'],
+            [total_income, -total_expenses, net_balance],
+            ['green', 'red', 'blue' if net_balance >= 0 else 'orange'],
+            '<b>%{x}</b><br>Amount: ₹%{y:.2f}<extra></extra>',
+            text=[f'₹{total_income:.2f}', f'₹{total_expenses:.2f}', f'₹{net_balance:.2f}']
+        )
+    )
+    
+    # 2. Category Pie Chart (expenses only)
+    expense_categories = aggregates.expense_categories(user_id)
+    
+    if expense_categories:
+        figures['categories'] = charts.figure(
+            charts.layout('Expense Categories'),
+            charts.pie(
+                [category for category, _ in expense_categories],
+                [to_rupees(paise) for _, paise in expense_categories],
+                '<b>%{label}</b><br>Amount: ₹%{value:.2f}<br>Percentage: %{percent}<extra></extra>'
+            )
+        )
+    
+    # 3. Monthly Trend Chart
+    monthly_data = aggregates.monthly_totals(user_id)
+    
+    if monthly_data:
+        months = [month['month'] for month in monthly_data]
+        totals = [month['total'] for month in monthly_data]
+        if max_points:
+            # Bars are flows: merge runs of months, labelled by their first month, instead of dropping any
+            starts = downsample.bucket_starts(len(months), max_points)
+            months, totals = [months[i] for i in starts], downsample.bucket_sums(totals, starts)
+        totals = [to_rupees(total) for total in totals]
+        figures['monthly'] = charts.figure(
+            charts.layout('Monthly Financial Summary', xaxis_title='Month', yaxis_title='Amount (₹)'),
+            charts.bar(
+                months,
+                totals,
+                ['green' if total >= 0 else 'red' for total in totals],
+                '<b>%{x}</b><br>Total: ₹%{y:.2f}<extra></extra>',
+                text=[f'₹{total:.2f}' for total in totals]
+            )
+        )
+    
+    # 4. Running Balance Line Chart (closing balance of each month)
+    closing = balances.monthly_balances(user_id)
+    
+    if closing and max_points:
+        closing = thinned(closing, max_points)
+    
+    if closing:
+        figures['balance'] = charts.figure(
+            charts.layout('Running Balance', xaxis_title='Month', yaxis_title='Balance (₹)'),
+            charts.line(
+                [month for month, _ in closing],
+                [to_rupees(balance) for _, balance in closing],
+                'blue',
+                '<b>%{x}</b><br>Balance: ₹%{y:.2f}<extra></extra>'
+            )
+        )
+    
+    return {'charts': figures}
 
 @api.route('/charts')
 class ReportCharts(Resource):
@@ -147,173 +228,253 @@ class ReportCharts(Resource):
         """Get chart data for dashboard visualization"""
         current_user_id = get_jwt_identity()
         
-        transactions = Transaction.query.filter_by(user_id=current_user_id)\
-                                      .order_by(Transaction.date.desc())\
-                                      .all()
-        
-        if not transactions:
-            return {'charts': {}}
+        parser = api.parser()
+        add_max_points_argument(parser)
+        max_points = parse_max_points(parser.parse_args())
         
-        # Calculate totals
-        total_income = sum(t.amount for t in transactions if t.amount > 0)
-        total_expenses = sum(abs(t.amount) for t in transactions if t.amount < 0)
-        net_balance = total_income - total_expenses
+        return cache.conditional_json(
+            'reports.charts', current_user_id, {'max_points': max_points},
+            lambda: chart_payload(current_user_id, max_points)
+        )
+
+def add_max_points_argument(parser):
+    """Declare the optional max_points query parameter of the chart endpoints"""
+    parser.add_argument('max_points', type=int,
+                        help=f'Downsample each series to at most this many points (at least {downsample.MIN_POINTS})')
+
+def parse_max_points(args):
+    """The max_points argument, or a 400 if it is too small to draw a line"""
+    max_points = args['max_points']
+    if max_points is not None and max_points < downsample.MIN_POINTS:
+        api.abort(400, f'max_points must be at least {downsample.MIN_POINTS}')
+    return max_points
+
+def thinned(points, max_points):
+    """(x, value) points of a level such as a balance, reduced to the ones LTTB keeps"""
+    positions = [x.toordinal() if isinstance(x, date) else index for index, (x, _) in enumerate(points)]
+    return [points[i] for i in downsample.lttb_indices(positions, [value for _, value in points], max_points)]
+
+def parse_date(value, name):
+    """A YYYY-MM-DD query parameter as a date, or a 400 naming the parameter"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        api.abort(400, f'Invalid {name}. Use YYYY-MM-DD')
+
+def balance_report(user_id, start_date=None, end_date=None, granularity='day', max_points=None):
+    """Running balance at the end of each period of a date range.
+
+    The range defaults to the user's first transaction through today. With
+    max_points, the series keeps only the points LTTB picks.
+    """
+    if start_date is None:
+        start_date = db.session.query(func.min(Transaction.date)).filter(Transaction.user_id == user_id).scalar()
+    if end_date is None:
+        end_date = date.today()
+    if start_date is None:
+        return {'granularity': granularity, 'start_date': None, 'end_date': end_date.isoformat(), 'balances': []}
+    
+    points = balances.balance_series(user_id, start_date, end_date, granularity)
+    if max_points:
+        points = thinned(points, max_points)
+    
+    return {
+        'granularity': granularity,
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'balances': [{'date': day.isoformat(), 'balance': to_rupees(balance)} for day, balance in points]
+    }
+
+@api.route('/balance')
+class ReportBalance(Resource):
+    @jwt_required()
+    def get(self):
+        """Get the balance as of a date, or the running balance over a date range"""
+        current_user_id = get_jwt_identity()
         
-        charts = {}
+        parser = api.parser()
+        parser.add_argument('date', type=str, help='Balance at the end of this date (YYYY-MM-DD)')
+        parser.add_argument('start_date', type=str, help='Series start date (YYYY-MM-DD, default first transaction)')
+        parser.add_argument('end_date', type=str, help='Series end date (YYYY-MM-DD, default today)')
+        parser.add_argument('granularity', type=str, choices=UNITS, default='day',
+                            help='Series point spacing: ' + ', '.join(UNITS))
+        add_max_points_argument(parser)
+        args = parser.parse_args()
+        max_points = parse_max_points(args)
         
-        # 1. Financial Overview Bar Chart
-        overview_chart = go.Figure(data=[
-            go.Bar(
-                x=['Income', 'Expenses', 'Net Balance'],
-                y=[total_income, -total_expenses, net_balance],
-                marker_color=['green', 'red', 'blue' if net_balance >= 0 else 'orange'],
-                hovertemplate='<b>%{x}</b><br>Amount: ₹%{y:.2f}<extra></extra>',
-                text=[f'₹{total_income:.2f}', f'₹{total_expenses:.2f}', f'₹{net_balance:.2f}'],
-                textposition='auto'
+        if args['date']:
+            day = parse_date(args['date'], 'date')
+            return cache.conditional_json(
+                'reports.balance', current_user_id, {'date': day},
+                lambda: {'date': day.isoformat(), 'balance': to_rupees(balances.balance_as_of(current_user_id, day))}
             )
-        ])
-        overview_chart.update_layout(
-            title='Financial Overview',
-            yaxis_title='Amount (₹)',
-            font=dict(size=12),
-            height=400
-        )
-        charts['overview'] = json.loads(json.dumps(overview_chart, cls=plotly.utils.PlotlyJSONEncoder))
         
-        # 2. Category Pie Chart (expenses only)
-        expense_categories = {}
-        for t in transactions:
-            if t.amount < 0:  # Expenses only
-                category = t.category
-                if category not in expense_categories:
-                    expense_categories[category] = 0
-                expense_categories[category] += abs(t.amount)
+        start_date = parse_date(args['start_date'], 'start_date') if args['start_date'] else None
+        end_date = parse_date(args['end_date'], 'end_date') if args['end_date'] else None
+        if start_date and end_date and start_date > end_date:
+            api.abort(400, 'start_date must not be after end_date')
         
-        if expense_categories:
-            pie_chart = go.Figure(data=[
-                go.Pie(
-                    labels=list(expense_categories.keys()),
-                    values=list(expense_categories.values()),
-                    hovertemplate='<b>%{label}</b><br>Amount: ₹%{value:.2f}<br>Percentage: %{percent}<extra></extra>',
-                )
-            ])
-            pie_chart.update_layout(
-                title='Expense Categories',
-                font=dict(size=12),
-                height=400
-            )
-            charts['categories'] = json.loads(json.dumps(pie_chart, cls=plotly.utils.PlotlyJSONEncoder))
+        # The default end moves with the calendar, so it is part of the key
+        params = {'start_date': start_date, 'end_date': end_date or date.today(), 'granularity': args['granularity'],
+                  'max_points': max_points}
+        return cache.conditional_json(
+            'reports.balance', current_user_id, params,
+            lambda: balance_report(current_user_id, start_date, params['end_date'], args['granularity'], max_points)
+        )
+
+def timeseries_report(user_id, start_date=None, end_date=None, granularity='month', group_by=None, max_points=None):
+    """Income, expenses, net and count per period, overall or split by group_by.
+
+    The range defaults to the user's first through last day with transactions.
+    With max_points, runs of consecutive periods are summed into at most that
+    many points, each labelled by its first period, so totals are unchanged.
+    """
+    first, last = timeseries.data_range(user_id)
+    start_date = start_date or first
+    end_date = end_date or last
+    if start_date is None or end_date is None or start_date > end_date:
+        return {'granularity': granularity, 'group_by': group_by, 'periods': [], 'series': []}
+    
+    starts, series = timeseries.series(user_id, start_date, end_date, granularity, group_by)
+    if max_points:
+        runs = downsample.bucket_starts(len(starts), max_points)
+        starts = [starts[i] for i in runs]
+        series = {
+            key: {measure: downsample.bucket_sums(column, runs) for measure, column in values.items()}
+            for key, values in series.items()
+        }
+    
+    return {
+        'granularity': granularity,
+        'group_by': group_by,
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'periods': [start.isoformat() for start in starts],
+        'series': [
+            {
+                'key': 'all' if key is None else key,
+                'income': [to_rupees(paise) for paise in values['income']],
+                'expenses': [to_rupees(paise) for paise in values['expenses']],
+                'net': [to_rupees(paise) for paise in values['net']],
+                'count': values['count']
+            }
+            for key, values in series.items()
+        ]
+    }
+
+@api.route('/timeseries')
+class ReportTimeseries(Resource):
+    @jwt_required()
+    def get(self):
+        """Get income, expenses, net and count per day, week, month, quarter or year"""
+        current_user_id = get_jwt_identity()
         
-        # 3. Monthly Trend Chart
-        monthly_data = {}
-        for t in transactions:
-            month_key = t.date.strftime('%Y-%m')
-            if month_key not in monthly_data:
-                monthly_data[month_key] = 0
-            monthly_data[month_key] += t.amount
+        parser = api.parser()
+        parser.add_argument('granularity', type=str, choices=UNITS, default='month',
+                            help='Period length: ' + ', '.join(UNITS))
+        parser.add_argument('group_by', type=str, choices=tuple(timeseries.GROUPINGS),
+                            help='Split into one series per value of this field')
+        parser.add_argument('start_date', type=str, help='Start date (YYYY-MM-DD, default first transaction)')
+        parser.add_argument('end_date', type=str, help='End date (YYYY-MM-DD, default last transaction)')
+        add_max_points_argument(parser)
+        args = parser.parse_args()
+        max_points = parse_max_points(args)
         
-        if monthly_data:
-            sorted_months = sorted(monthly_data.keys())
-            totals = [monthly_data[month] for month in sorted_months]
-            
-            monthly_chart = go.Figure(data=[
-                go.Bar(
-                    x=sorted_months,
-                    y=totals,
-                    marker_color=['green' if total >= 0 else 'red' for total in totals],
-                    hovertemplate='<b>%{x}</b><br>Total: ₹%{y:.2f}<extra></extra>',
-                    text=[f'₹{total:.2f}' for total in totals],
-                    textposition='auto'
-                )
-            ])
-            monthly_chart.update_layout(
-                title='Monthly Financial Summary',
-                xaxis_title='Month',
-                yaxis_title='Amount (₹)',
-                font=dict(size=12),
-                height=400
-            )
-            charts['monthly'] = json.loads(json.dumps(monthly_chart, cls=plotly.utils.PlotlyJSONEncoder))
+        start_date = parse_date(args['start_date'], 'start_date') if args['start_date'] else None
+        end_date = parse_date(args['end_date'], 'end_date') if args['end_date'] else None
+        if start_date and end_date and start_date > end_date:
+            api.abort(400, 'start_date must not be after end_date')
         
-        return {'charts': charts}
+        params = {'start_date': start_date, 'end_date': end_date,
+                  'granularity': args['granularity'], 'group_by': args['group_by'], 'max_points': max_points}
+        return cache.conditional_json(
+            'reports.timeseries', current_user_id, params,
+            lambda: timeseries_report(current_user_id, start_date, end_date, args['granularity'], args['group_by'],
+                                      max_points)
+        )
+
+@api.route('/cache')
+class ReportCache(Resource):
+    @jwt_required()
+    def get(self):
+        """Get hit/miss counters of the report cache in the worker serving this request"""
+        return cache.get_backend().stats()
 
 @api.route('/pdf')
 class ReportPDF(Resource):
     @jwt_required()
+    @api.expect(pdf_request_model)
     def post(self):
-        """Generate and download PDF report"""
+        """Generate a PDF report: small ones download right away, larger ones are queued as a job"""
         current_user_id = get_jwt_identity()
         user = User.query.get(current_user_id)
+        body = request.get_json(silent=True) or {}
         
-        # Generate PDF using ReportLab
-        from reportlab.lib.pagesizes import A4
-        from reportlab.lib import colors
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-        from reportlab.lib.units import inch
+        start_date = parse_date(body['start_date'], 'start_date') if body.get('start_date') else None
+        end_date = parse_date(body['end_date'], 'end_date') if body.get('end_date') else None
+        if start_date and end_date and start_date > end_date:
+            api.abort(400, 'start_date must not be after end_date')
         
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4)
-        elements = []
-        styles = getSampleStyleSheet()
+        detail_rows = body.get('detail_rows') or 0
+        max_detail_rows = current_app.config['PDF_MAX_DETAIL_ROWS']
+        if not isinstance(detail_rows, int) or not 0 <= detail_rows <= max_detail_rows:
+            api.abort(400, f'detail_rows must be an integer between 0 and {max_detail_rows}')
         
-        # Title
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            spaceAfter=30,
-            alignment=1  # Center alignment
-        )
-        elements.append(Paragraph("Personal Finance Report", title_style))
-        elements.append(Paragraph(f"Generated for: {user.username}", styles['Normal']))
-        elements.append(Paragraph(f"Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", styles['Normal']))
-        elements.append(Spacer(1, 20))
+        # Render in the request unless it would lay out more than PDF_SYNC_MAX_ROWS rows
+        # (fetching one row past the limit tells) or ?async=true asks for a job
+        sync_max_rows = current_app.config['PDF_SYNC_MAX_ROWS']
+        if request.args.get('async', '').lower() not in ['true', '1']:
+            data = pdfs.report_data(user, 'summary', start_date, end_date, min(detail_rows, sync_max_rows + 1))
+            if pdfs.table_rows(data) <= sync_max_rows:
+                return send_file(
+                    BytesIO(pdfs.render('summary', data)),
+                    as_attachment=True,
+                    download_name=pdfs.filename(data),
+                    mimetype='application/pdf'
+                )
         
-        # Get transactions
-        transactions = Transaction.query.filter_by(user_id=current_user_id)\
-                                      .order_by(Transaction.date.desc())\
-                                      .all()
+        job = jobs.start_report_job(current_user_id, 'summary', start_date, end_date, detail_rows)
+        status_url = f"{request.path.rstrip('/')}/{job.id}"
         
-        if not transactions:
-            elements.append(Paragraph("No transactions found.", styles['Normal']))
-        else:
-            # Summary
-            total_income = sum(t.amount for t in transactions if t.amount > 0)
-            total_expenses = sum(abs(t.amount) for t in transactions if t.amount < 0)
-            net_balance = total_income - total_expenses
-            
-            summary_data = [
-                ['Metric', 'Amount'],
-                ['Total Income', f'₹{total_income:,.2f}'],
-                ['Total Expenses', f'₹{total_expenses:,.2f}'],
-                ['Net Balance', f'₹{net_balance:,.2f}'],
-                ['Total Transactions', str(len(transactions))]
-            ]
-            
-            summary_table = Table(summary_data, colWidths=[2*inch, 2*inch])
-            summary_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 14),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            
-            elements.append(Paragraph("Financial Summary", styles['Heading2']))
-            elements.append(summary_table)
-            elements.append(Spacer(1, 20))
+        return {
+            'message': 'Report queued',
+            'job_id': job.id,
+            'status_url': status_url,
+            'download_url': f'{status_url}/download'
+        }, 202
+
+def find_report_job(job_id, user_id):
+    """The user's PDF report job, or a 404"""
+    job = ReportJob.query.filter_by(id=job_id, user_id=user_id).first()
+    if not job:
+        api.abort(404, 'Report job not found')
+    return jobs.check_interrupted(job)
+
+@api.route('/pdf/<string:job_id>')
+class ReportPDFJob(Resource):
+    @jwt_required()
+    def get(self, job_id):
+        """Get the status of a background PDF report"""
+        job = find_report_job(job_id, get_jwt_identity())
         
-        # Build PDF
-        doc.build(elements)
-        buffer.seek(0)
+        payload = job.to_dict()
+        if payload['status'] == 'finished':
+            payload['download_url'] = f"{request.path.rstrip('/')}/download"
+        return payload
+
+@api.route('/pdf/<string:job_id>/download')
+class ReportPDFDownload(Resource):
+    @jwt_required()
+    def get(self, job_id):
+        """Download a rendered PDF report until it expires"""
+        job = find_report_job(job_id, get_jwt_identity())
         
-        return send_file(
-            buffer,
-            as_attachment=True,
-            download_name=f'financial_report_{user.username}_{datetime.now().strftime("%Y%m%d")}.pdf',
-            mimetype='application/pdf'
-        )
+        path = jobs.report_path(job)
+        if path is None:
+            if job.status == 'expired':
+                api.abort(410, 'Report has expired; request it again')
+            if job.status == 'failed':
+                api.abort(409, f'Report failed: {job.message}')
+            api.abort(409, 'Report is not ready yet')
+        
+        return send_file(path, as_attachment=True, download_name=job.filename, mimetype='application/pdf')
@@ -1,13 +1,15 @@
 """
 Transactions API endpoints
 """
-from flask import request
+from flask import request, current_app, Response, stream_with_context
 from flask_restx import Namespace, Resource, fields
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
-import pandas as pd
+import math
 
-from app.models import Transaction, User, db
+from app import aggregates, cache, exporter, importer, jobs, pagination, rollups
+from app.lazy import pd
+from app.models import Transaction, User, ImportJob, db, to_rupees
 
 api = Namespace('transactions', description='Transaction operations')
 
@@ -28,52 +30,98 @@ transaction_response_model = api.model('TransactionResponse', {
     'created_at': fields.String(description='Created timestamp')
 })
 
+transaction_page_model = api.model('TransactionPage', {
+    'transactions': fields.List(fields.Nested(transaction_response_model)),
+    'next_cursor': fields.String(description='Cursor for the next page, null on the last page')
+})
+
+def filter_parser():
+    """Request parser with the category and date filters shared by listing and export"""
+    parser = api.parser()
+    parser.add_argument('category', type=str, help='Filter by category')
+    parser.add_argument('start_date', type=str, help='Start date (YYYY-MM-DD)')
+    parser.add_argument('end_date', type=str, help='End date (YYYY-MM-DD)')
+    return parser
+
+def apply_filters(query, args):
+    """Apply the parsed category and date filters to a query or select()"""
+    if args['category']:
+        query = query.filter(Transaction.category.ilike(f"%{args['category']}%"))
+    
+    if args['start_date']:
+        start_date = datetime.strptime(args['start_date'], '%Y-%m-%d').date()
+        query = query.filter(Transaction.date >= start_date)
+    
+    if args['end_date']:
+        end_date = datetime.strptime(args['end_date'], '%Y-%m-%d').date()
+        query = query.filter(Transaction.date <= end_date)
+    
+    return query
+
+def parse_amount(value):
+    """A rupee amount from a request body, or a 400 unless it is a finite number the importer would accept"""
+    try:
+        amount = float(value)
+    except (TypeError, ValueError):
+        api.abort(400, 'Invalid amount. Use a number')
+    if not math.isfinite(amount) or abs(amount) >= importer.MAX_AMOUNT:
+        api.abort(400, f'Amount must be a finite number smaller than {importer.MAX_AMOUNT:,} in absolute value')
+    return amount
+
 @api.route('/')
 class TransactionList(Resource):
     @jwt_required()
-    @api.marshal_list_with(transaction_response_model)
+    @api.response(200, 'Success', [transaction_response_model])
     def get(self):
-        """Get all transactions for current user"""
+        """Get transactions for current user, newest first.
+
+        Pass ``cursor`` (empty for the first page) to page by the returned
+        ``next_cursor``; ``limit``/``offset`` paging still returns a bare list.
+        """
         current_user_id = get_jwt_identity()
         
         # Query parameters for filtering
-        parser = api.parser()
-        parser.add_argument('category', type=str, help='Filter by category')
-        parser.add_argument('start_date', type=str, help='Start date (YYYY-MM-DD)')
-        parser.add_argument('end_date', type=str, help='End date (YYYY-MM-DD)')
+        parser = filter_parser()
         parser.add_argument('limit', type=int, default=100, help='Number of transactions to return')
         parser.add_argument('offset', type=int, default=0, help='Offset for pagination')
+        parser.add_argument('cursor', type=str, help='next_cursor from the previous page; empty for the first page')
         
         args = parser.parse_args()
         
-        query = Transaction.query.filter_by(user_id=current_user_id)
-        
-        # Apply filters
-        if args['category']:
-            query = query.filter(Transaction.category.ilike(f"%{args['category']}%"))
+        if args['limit'] < 1 or args['offset'] < 0:
+            api.abort(400, 'limit must be positive and offset must not be negative')
         
-        if args['start_date']:
-            start_date = datetime.strptime(args['start_date'], '%Y-%m-%d').date()
-            query = query.filter(Transaction.date >= start_date)
+        # Unchanged data and arguments: the client's copy is current, skip the query
+        tag = cache.etag('transactions.list', current_user_id, cache.data_version(current_user_id), args)
+        if cache.is_fresh(tag):
+            return cache.not_modified(tag)
         
-        if args['end_date']:
-            end_date = datetime.strptime(args['end_date'], '%Y-%m-%d').date()
-            query = query.filter(Transaction.date <= end_date)
+        # Apply filters
+        query = apply_filters(Transaction.query.filter_by(user_id=current_user_id), args)
         
         # Apply pagination and ordering
-        transactions = query.order_by(Transaction.date.desc())\
-                          .offset(args['offset'])\
-                          .limit(args['limit'])\
-                          .all()
+        try:
+            transactions, next_cursor = pagination.paginate(query, args['limit'],
+                                                            cursor=args['cursor'], offset=args['offset'])
+        except ValueError:
+            api.abort(400, 'Invalid cursor')
         
-        return [{
+        items = api.marshal([{
             'id': t.id,
             'date': t.date.strftime('%Y-%m-%d'),
             'category': t.category,
             'amount': t.amount,
             'description': t.description,
             'created_at': t.created_at.isoformat()
-        } for t in transactions]
+        } for t in transactions], transaction_response_model)
+        
+        # Offset clients keep getting a plain list; the cursor is also sent as a header
+        headers = cache.validator_headers(tag)
+        if next_cursor:
+            headers['X-Next-Cursor'] = next_cursor
+        if args['cursor'] is None:
+            return items, 200, headers
+        return {'transactions': items, 'next_cursor': next_cursor}, 200, headers
     
     @jwt_required()
     @api.expect(transaction_model)
@@ -82,6 +130,7 @@ class TransactionList(Resource):
         """Create a new transaction"""
         current_user_id = get_jwt_identity()
         data = request.get_json()
+        amount = parse_amount(data.get('amount'))
         
         try:
             transaction_date = datetime.strptime(data['date'], '%Y-%m-%d').date()
@@ -91,12 +140,15 @@ class TransactionList(Resource):
         transaction = Transaction(
             date=transaction_date,
             category=data['category'],
-            amount=float(data['amount']),
+            amount=amount,
             description=data.get('description', ''),
             user_id=current_user_id
         )
+        transaction.refresh_fingerprint()
         
         db.session.add(transaction)
+        rollups.add_transaction(transaction)
+        cache.bump_version(transaction.user_id)
         db.session.commit()
         
         return {
@@ -108,6 +160,28 @@ class TransactionList(Resource):
             'created_at': transaction.created_at.isoformat()
         }, 201
 
+@api.route('/export')
+class TransactionExport(Resource):
+    @jwt_required()
+    def get(self):
+        """Stream all matching transactions as CSV or NDJSON, newest first"""
+        current_user_id = get_jwt_identity()
+        
+        parser = filter_parser()
+        parser.add_argument('format', type=str, default='csv', choices=list(exporter.FORMATS),
+                            help='csv or ndjson')
+        args = parser.parse_args()
+        
+        statement = apply_filters(exporter.export_statement(current_user_id), args)
+        mimetype, extension = exporter.FORMATS[args['format']]
+        
+        # stream_with_context keeps the app context, and with it the DB session, alive while streaming
+        return Response(
+            stream_with_context(exporter.stream(statement, args['format'])),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename=transactions.{extension}'}
+        )
+
 @api.route('/<int:transaction_id>')
 class TransactionItem(Resource):
     @jwt_required()
@@ -138,15 +212,18 @@ class TransactionItem(Resource):
     def put(self, transaction_id):
         """Update a transaction"""
         current_user_id = get_jwt_identity()
+        # Locked until commit so a concurrent edit cannot take the same old amount out of the rollups
         transaction = Transaction.query.filter_by(
             id=transaction_id, 
             user_id=current_user_id
-        ).first()
+        ).with_for_update().first()
         
         if not transaction:
             api.abort(404, 'Transaction not found')
         
         data = request.get_json()
+        amount = parse_amount(data.get('amount'))
+        old_row = rollups.row_of(transaction)
         
         try:
             transaction.date = datetime.strptime(data['date'], '%Y-%m-%d').date()
@@ -154,9 +231,13 @@ class TransactionItem(Resource):
             api.abort(400, 'Invalid date format. Use YYYY-MM-DD')
         
         transaction.category = data['category']
-        transaction.amount = float(data['amount'])
+        transaction.amount = amount
         transaction.description = data.get('description', '')
+        transaction.refresh_fingerprint()
         
+        # The transaction may have moved to another month or category
+        rollups.apply_rows(transaction.user_id, added=[rollups.row_of(transaction)], removed=[old_row])
+        cache.bump_version(transaction.user_id)
         db.session.commit()
         
         return {
@@ -175,72 +256,146 @@ class TransactionItem(Resource):
         transaction = Transaction.query.filter_by(
             id=transaction_id, 
             user_id=current_user_id
-        ).first()
+        ).with_for_update().first()
         
         if not transaction:
             api.abort(404, 'Transaction not found')
         
         db.session.delete(transaction)
+        rollups.apply_rows(transaction.user_id, removed=[rollups.row_of(transaction)])
+        cache.bump_version(transaction.user_id)
         db.session.commit()
         
         return {'message': 'Transaction deleted successfully'}
 
+@api.route('/bulk')
+class TransactionBulk(Resource):
+    @jwt_required()
+    @api.expect([transaction_model])
+    def post(self):
+        """Create many transactions in one request"""
+        current_user_id = get_jwt_identity()
+        data = request.get_json()
+        
+        if not isinstance(data, list) or not data:
+            api.abort(400, 'Expected a non-empty list of transactions')
+        
+        df = pd.DataFrame.from_records(data)
+        if importer.missing_columns(df):
+            api.abort(400, f'Each transaction must contain: {", ".join(importer.REQUIRED_COLUMNS)}')
+        
+        # Same validation and bulk writer as CSV imports
+        result = importer.import_dataframe(df, current_user_id)
+        db.session.commit()
+        
+        return {
+            'message': f'Successfully imported {result.created} transactions',
+            'transactions_created': result.created,
+            'transactions_skipped': result.skipped,
+            'rows_failed': result.failed,
+            'errors': result.errors
+        }, 201
+
 @api.route('/upload')
 class TransactionUpload(Resource):
     @jwt_required()
     def post(self):
-        """Upload transactions from CSV"""
+        """Upload transactions from one or more CSV files or zip archives as a background import job"""
         current_user_id = get_jwt_identity()
         
         # Check if file is present
         if 'file' not in request.files:
             api.abort(400, 'No file provided')
         
-        file = request.files['file']
-        if file.filename == '':
+        files = request.files.getlist('file')
+        if any(file.filename == '' for file in files):
             api.abort(400, 'No file selected')
         
+        # Several files or zip archives are split up and parsed in parallel
+        parallel = (len(files) > 1
+                    or any(file.filename.lower().endswith('.zip') for file in files)
+                    or request.args.get('parallel', '').lower() in ['true', '1'])
+        
+        # ?sync=true keeps the old behaviour of importing inside the request
+        if request.args.get('sync', '').lower() in ['true', '1']:
+            if len(files) > 1 or files[0].filename.lower().endswith('.zip'):
+                api.abort(400, 'Synchronous imports take a single CSV file')
+            return self.import_now(files[0], current_user_id)
+        
+        job = jobs.start_import_job(files, current_user_id, parallel=parallel)
+        
+        return {
+            'message': 'Import queued',
+            'job_id': job.id,
+            'status_url': f"{request.path.rstrip('/')}/{job.id}"
+        }, 202
+    
+    def import_now(self, file, current_user_id):
+        """Import the CSV synchronously and return the final counts"""
         try:
-            # Read CSV file
-            df = pd.read_csv(file)
-            
-            # Validate required columns
-            required_columns = ['date', 'category', 'amount']
-            if not all(col in df.columns for col in required_columns):
-                api.abort(400, f'CSV must contain columns: {", ".join(required_columns)}')
-            
-            transactions_created = 0
-            errors = []
-            
-            for index, row in df.iterrows():
-                try:
-                    transaction_date = pd.to_datetime(row['date']).date()
-                    
-                    transaction = Transaction(
-                        date=transaction_date,
-                        category=str(row['category']),
-                        amount=float(row['amount']),
-                        description=str(row.get('description', '')),
-                        user_id=current_user_id
-                    )
-                    
-                    db.session.add(transaction)
-                    transactions_created += 1
-                    
-                except Exception as e:
-                    errors.append(f'Row {index + 1}: {str(e)}')
-            
-            db.session.commit()
+            # Stream the CSV in chunks, committing each one as it is imported
+            result = importer.import_csv(file.stream, current_user_id,
+                                         chunk_size=current_app.config['IMPORT_CHUNK_SIZE'])
             
             return {
-                'message': f'Successfully imported {transactions_created} transactions',
-                'transactions_created': transactions_created,
-                'errors': errors
+                'message': f'Successfully imported {result.created} transactions',
+                'transactions_created': result.created,
+                'transactions_skipped': result.skipped,
+                'rows_processed': result.rows,
+                'rows_failed': result.failed,
+                'chunks_committed': result.chunks,
+                'errors': result.errors
             }, 201
             
+        except importer.ImportFormatError as e:
+            api.abort(400, str(e))
         except Exception as e:
+            db.session.rollback()
             api.abort(400, f'Error processing CSV: {str(e)}')
 
+@api.route('/upload/<string:job_id>')
+class TransactionUploadJob(Resource):
+    @jwt_required()
+    def get(self, job_id):
+        """Get progress of a background CSV import"""
+        current_user_id = get_jwt_identity()
+        job = ImportJob.query.filter_by(id=job_id, user_id=current_user_id).first()
+        
+        if not job:
+            api.abort(404, 'Import job not found')
+        
+        return jobs.check_interrupted(job).to_dict()
+
+def summary_payload(user_id):
+    """Income, expense and net totals with the per-category breakdown"""
+    summary = aggregates.totals(user_id)
+    
+    if not summary['transaction_count']:
+        return {
+            'total_income': 0,
+            'total_expenses': 0,
+            'net_balance': 0,
+            'transaction_count': 0,
+            'categories': []
+        }
+    
+    # Calculate totals
+    total_income = summary['total_income']
+    total_expenses = summary['total_expenses']
+    
+    # Category breakdown
+    category_list = [
+        dict(category, total=to_rupees(category['total'])) for category in aggregates.category_totals(user_id)
+    ]
+    
+    return {
+        'total_income': to_rupees(total_income),
+        'total_expenses': to_rupees(total_expenses),
+        'net_balance': to_rupees(total_income - total_expenses),
+        'transaction_count': summary['transaction_count'],
+        'categories': category_list
+    }
+
 @api.route('/summary')
 class TransactionSummary(Resource):
     @jwt_required()
@@ -248,43 +403,6 @@ class TransactionSummary(Resource):
         """Get financial summary for current user"""
         current_user_id = get_jwt_identity()
         
-        transactions = Transaction.query.filter_by(user_id=current_user_id).all()
-        
-        if not transactions:
-            return {
-                'total_income': 0,
-                'total_expenses': 0,
-                'net_balance': 0,
-                'transaction_count': 0,
-                'categories': []
-            }
-        
-        # Calculate totals
-        total_income = sum(t.amount for t in transactions if t.amount > 0)
-        total_expenses = sum(abs(t.amount) for t in transactions if t.amount < 0)
-        net_balance = total_income - total_expenses
-        
-        # Category breakdown
-        categories = {}
-        for t in transactions:
-            if t.category not in categories:
-                categories[t.category] = {'total': 0, 'count': 0}
-            categories[t.category]['total'] += t.amount
-            categories[t.category]['count'] += 1
-        
-        category_list = [
-            {
-                'category': cat,
-                'total': data['total'],
-                'count': data['count']
-            }
-            for cat, data in categories.items()
-        ]
-        
-        return {
-            'total_income': total_income,
-            'total_expenses': total_expenses,
-            'net_balance': net_balance,
-            'transaction_count': len(transactions),
-            'categories': category_list
-        }
+        return cache.conditional_json(
+            'transactions.summary', current_user_id, None, lambda: summary_payload(current_user_id)
+        )
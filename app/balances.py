@@ -0,0 +1,71 @@
+"""
+Running balance as of any date, from the monthly rollup as checkpoints
+
+The rollups already hold each month's and each day's net change per
+category, kept current on every write. The balance at the end of a day
+is the sum of the monthly rollup rows of all earlier months plus the
+daily rollup rows from the first of that month up to the day (both range
+reads on the rollups' primary keys), so an as-of query never touches
+more than a month of daily rows, and a series buckets daily rows instead
+of transactions. Balances are integer paise; callers convert with
+to_rupees.
+"""
+from datetime import timedelta
+
+from app.models import db, DailyRollup, TransactionRollup, sum_paise
+from app.periods import period_start, python_period_end, python_period_start
+from app.rollups import month_of
+
+
+def balance_as_of(user_id, day):
+    """Balance in paise at the end of a day"""
+    before = db.session.query(sum_paise(TransactionRollup.total_paise)).filter(
+        TransactionRollup.user_id == user_id, TransactionRollup.month < month_of(day)
+    ).scalar() or 0
+    tail = db.session.query(sum_paise(DailyRollup.total_paise)).filter(
+        DailyRollup.user_id == user_id, DailyRollup.day >= day.replace(day=1), DailyRollup.day <= day
+    ).scalar() or 0
+    return before + tail
+
+
+def balance_series(user_id, start_date, end_date, granularity='day'):
+    """(date, balance in paise) at the end of every period from start_date to end_date.
+
+    Each period contributes a point, including periods without transactions;
+    the last one is clipped to end_date. The opening balance is one as-of
+    query and the changes in the range come from a single GROUP BY over
+    the daily rollup.
+    """
+    if start_date > end_date:
+        return []
+
+    bucket = period_start(granularity, DailyRollup.day)
+    changes = dict(db.session.query(bucket, sum_paise(DailyRollup.total_paise)).filter(
+        DailyRollup.user_id == user_id, DailyRollup.day >= start_date, DailyRollup.day <= end_date
+    ).group_by(bucket).all())
+
+    balance = balance_as_of(user_id, start_date - timedelta(days=1))
+    points = []
+    current = python_period_start(granularity, start_date)
+    while current <= end_date:
+        balance += changes.get(current, 0)
+        last_day = python_period_end(granularity, current)
+        points.append((min(last_day, end_date), balance))
+        current = last_day + timedelta(days=1)
+    return points
+
+
+def monthly_balances(user_id):
+    """(YYYY-MM, closing balance in paise) for every month with transactions, oldest first"""
+    rows = db.session.query(TransactionRollup.month, sum_paise(TransactionRollup.total_paise))\
+        .filter(TransactionRollup.user_id == user_id)\
+        .group_by(TransactionRollup.month)\
+        .order_by(TransactionRollup.month)\
+        .all()
+
+    balance = 0
+    closing = []
+    for month, total in rows:
+        balance += total
+        closing.append((month, balance))
+    return closing
@@ -0,0 +1,74 @@
+"""
+Dialect-aware bulk writer for ingesting many rows at once
+
+On PostgreSQL with psycopg2 rows are streamed through COPY ... FROM STDIN;
+everywhere else they go through a single executemany INSERT.
+"""
+import io
+
+from sqlalchemy import insert
+
+from app.models import db
+
+# Written (unquoted) for NULL in the CSV sent to COPY. COPY only treats an
+# unquoted field as NULL, so every other value is quoted and even a literal
+# '\N' or empty string arrives as text
+COPY_NULL = r'\N'
+
+
+def copy_supported(connection):
+    """True when the connection can use COPY FROM STDIN"""
+    dialect = connection.dialect
+    return dialect.name == 'postgresql' and dialect.driver == 'psycopg2'
+
+
+def _copy_field(value):
+    """One CSV field for COPY: the NULL marker for None, anything else quoted"""
+    if value is None:
+        return COPY_NULL
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def rows_to_csv(rows, columns):
+    """Render rows as an in-memory CSV file for COPY"""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write(','.join(_copy_field(row[col]) for col in columns))
+        buffer.write('\n')
+    buffer.seek(0)
+    return buffer
+
+
+def copy_rows(connection, table, rows):
+    """Stream rows into a table with COPY ... FROM STDIN on psycopg2"""
+    columns = list(rows[0].keys())
+    preparer = connection.dialect.identifier_preparer
+    statement = (
+        f'COPY {preparer.format_table(table)} ({", ".join(preparer.quote(col) for col in columns)}) '
+        f"FROM STDIN WITH (FORMAT csv, NULL '{COPY_NULL}')"
+    )
+
+    # The DBAPI connection is the one the session's transaction is running on
+    with connection.connection.dbapi_connection.cursor() as cursor:
+        cursor.copy_expert(statement, rows_to_csv(rows, columns))
+
+
+def insert_rows(table, rows, method=None):
+    """Bulk insert dict rows (all with the same keys) into a table.
+
+    ``method`` forces 'copy' or 'executemany'; by default COPY is used
+    whenever the database supports it. Runs inside the current session
+    transaction, so the caller commits.
+    """
+    if not rows:
+        return 0
+
+    connection = db.session.connection()
+    method = method or ('copy' if copy_supported(connection) else 'executemany')
+
+    if method == 'copy':
+        copy_rows(connection, table, rows)
+    else:
+        connection.execute(insert(table), rows)
+
+    return len(rows)
@@ -0,0 +1,282 @@
+"""
+Versioned cache for per-user summary, chart and dashboard payloads
+
+Every key embeds the user's data_version, which each write to their
+transactions bumps inside the same database transaction, so an entry is
+never served after the data behind it has changed; entries for old
+versions are simply never asked for again and age out of the backend.
+
+Payloads are stored as JSON text. CACHE_BACKEND selects where:
+
+- 'memory': an LRU dict per worker process, bounded by CACHE_MAX_BYTES
+- 'sqlite': a file shared by all workers on one host (CACHE_URL is its
+  path), a local stand-in for Redis
+- 'redis': a Redis server shared by every host (CACHE_URL), needs the
+  ``redis`` package
+- 'none': caching disabled
+
+The same version and parameters give strong ETags, so a client polling
+with If-None-Match gets a 304 without any query being run.
+"""
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, request
+from sqlalchemy import update
+
+from app.models import db, User
+
+_backend_lock = threading.Lock()
+
+# Chance that a write to the SQLite backend also purges expired entries
+PURGE_PROBABILITY = 0.01
+
+
+class Backend:
+    """Cache storage with per-process hit/miss counters by payload name"""
+    name = 'none'
+
+    def __init__(self):
+        self._counter_lock = threading.Lock()
+        self.hits = {}
+        self.misses = {}
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def count(self, name, hit):
+        counter = self.hits if hit else self.misses
+        with self._counter_lock:
+            counter[name] = counter.get(name, 0) + 1
+
+    def stats(self):
+        with self._counter_lock:
+            hits, misses = sum(self.hits.values()), sum(self.misses.values())
+            return {
+                'backend': self.name,
+                'hits': hits,
+                'misses': misses,
+                'hit_ratio': hits / (hits + misses) if hits + misses else 0,
+                'by_payload': {
+                    name: {'hits': self.hits.get(name, 0), 'misses': self.misses.get(name, 0)}
+                    for name in sorted(set(self.hits) | set(self.misses))
+                }
+            }
+
+
+class LRUBackend(Backend):
+    """In-process cache evicting least recently used entries beyond max_bytes"""
+    name = 'memory'
+
+    def __init__(self, max_bytes):
+        super().__init__()
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self._entries[key] = value
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def stats(self):
+        stats = super().stats()
+        with self._lock:
+            stats.update(entries=len(self._entries), bytes=self.size, max_bytes=self.max_bytes)
+        return stats
+
+
+class SQLiteBackend(Backend):
+    """Cache file shared by the worker processes of one host"""
+    name = 'sqlite'
+
+    def __init__(self, path, ttl):
+        super().__init__()
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('CREATE TABLE IF NOT EXISTS cache '
+                               '(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)')
+            self._local.connection = connection
+        return connection
+
+    def get(self, key):
+        try:
+            row = self._connection().execute(
+                'SELECT value FROM cache WHERE key = ? AND expires > ?', (key, time.time())
+            ).fetchone()
+        except sqlite3.Error as e:
+            current_app.logger.warning('Cache read failed: %s', e)
+            return None
+        return row[0] if row else None
+
+    def set(self, key, value):
+        now = time.time()
+        try:
+            connection = self._connection()
+            connection.execute('INSERT OR REPLACE INTO cache VALUES (?, ?, ?)', (key, value, now + self.ttl))
+            if random.random() < PURGE_PROBABILITY:
+                connection.execute('DELETE FROM cache WHERE expires <= ?', (now,))
+        except sqlite3.Error as e:
+            current_app.logger.warning('Cache write failed: %s', e)
+
+
+class RedisBackend(Backend):
+    """Cache shared by every worker through a Redis server"""
+    name = 'redis'
+
+    def __init__(self, url, ttl):
+        super().__init__()
+        import redis
+
+        self._errors = redis.RedisError
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+
+    def get(self, key):
+        try:
+            value = self.client.get(key)
+        except self._errors as e:
+            current_app.logger.warning('Cache read failed: %s', e)
+            return None
+        return value.decode('utf-8') if value is not None else None
+
+    def set(self, key, value):
+        try:
+            self.client.set(key, value, ex=self.ttl)
+        except self._errors as e:
+            current_app.logger.warning('Cache write failed: %s', e)
+
+
+def create_backend(config):
+    """Build the backend selected by CACHE_BACKEND"""
+    kind = config['CACHE_BACKEND']
+    if kind == 'memory':
+        return LRUBackend(config['CACHE_MAX_BYTES'])
+    if kind == 'sqlite':
+        path = config['CACHE_URL'] or os.path.join(tempfile.gettempdir(), 'finance_tracker_cache.db')
+        return SQLiteBackend(path, config['CACHE_TTL'])
+    if kind == 'redis':
+        return RedisBackend(config['CACHE_URL'] or 'redis://localhost:6379/0', config['CACHE_TTL'])
+    if kind == 'none':
+        return Backend()
+    raise ValueError(f'Unknown CACHE_BACKEND {kind!r}')
+
+
+def get_backend():
+    """The app's cache backend, created on first use so forked workers each get their own"""
+    extensions = current_app.extensions
+    with _backend_lock:
+        if 'cache' not in extensions:
+            extensions['cache'] = create_backend(current_app.config)
+    return extensions['cache']
+
+
+def data_version(user_id):
+    """Current version of a user's transaction data"""
+    return db.session.query(User.data_version).filter(User.id == user_id).scalar() or 0
+
+
+def bump_version(user_id=None):
+    """Invalidate cached payloads of one user (or everyone) as part of the current transaction"""
+    statement = update(User.__table__).values(data_version=User.__table__.c.data_version + 1)
+    if user_id is not None:
+        statement = statement.where(User.__table__.c.id == user_id)
+    db.session.execute(statement)
+
+
+def cache_key(name, user_id, version, params=None):
+    """Key of a payload for one user, data version and set of request parameters"""
+    digest = hashlib.sha1(json.dumps(params or {}, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    return f'{name}:{user_id}:{version}:{digest}'
+
+
+def cached_json(name, user_id, params, compute, version=None):
+    """JSON text of compute() for the user's current data, computed only on a cache miss"""
+    backend = get_backend()
+    if version is None:
+        version = data_version(user_id)
+    key = cache_key(name, user_id, version, params)
+
+    text = backend.get(key)
+    if text is not None:
+        backend.count(name, hit=True)
+        return text
+
+    backend.count(name, hit=False)
+    text = json.dumps(compute())
+    backend.set(key, text)
+    return text
+
+
+def json_response(text):
+    """Serve cached JSON text as-is, skipping another serialization pass"""
+    return current_app.response_class(text, mimetype='application/json')
+
+
+def etag(name, user_id, version, params=None):
+    """Strong ETag of a response built from one version of a user's data"""
+    return hashlib.sha1(cache_key(name, user_id, version, params).encode('utf-8')).hexdigest()
+
+
+def validator_headers(tag):
+    """ETag plus a Cache-Control that keeps per-user responses private and revalidated"""
+    return {'ETag': f'"{tag}"', 'Cache-Control': 'private, no-cache'}
+
+
+def is_fresh(tag):
+    """Whether the request's If-None-Match already names this ETag.
+
+    If-None-Match uses weak comparison (RFC 9110), so W/"tag" also matches,
+    e.g. after a proxy weakened the ETag when it compressed the response.
+    """
+    return request.if_none_match.contains_weak(tag)
+
+
+def not_modified(tag):
+    """Empty 304 response for a client whose copy is still current"""
+    return current_app.response_class(status=304, headers=validator_headers(tag))
+
+
+def conditional_json(name, user_id, params, compute):
+    """Cached JSON response with a strong ETag, or a 304 if the client already has it"""
+    version = data_version(user_id)
+    tag = etag(name, user_id, version, params)
+    if is_fresh(tag):
+        return not_modified(tag)
+
+    response = json_response(cached_json(name, user_id, params, compute, version))
+    response.headers.extend(validator_headers(tag))
+    return response
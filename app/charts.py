@@ -0,0 +1,73 @@
+"""
+Plotly chart specs built directly as JSON-ready dicts
+
+The reports only ever draw a few fixed chart shapes, yet go.Figure runs
+Plotly's property validators on every trace and PlotlyJSONEncoder then
+walks the whole figure again. The builders here return the same
+{'data': [...], 'layout': {...}} JSON that
+json.dumps(go.Figure(...), cls=PlotlyJSONEncoder) produced, from plain
+lists. Layouts, including the default Plotly template (the only part that
+needs plotly itself), are compiled once per process and shared by
+reference, so a payload is encoded exactly once, by whoever serializes
+it. Callers must not mutate the specs they get back.
+"""
+from functools import lru_cache
+
+from app.lazy import plotly_io
+
+# Every chart is drawn this tall, in pixels
+CHART_HEIGHT = 400
+
+FONT_SIZE = 12
+
+
+@lru_cache(maxsize=None)
+def plotly_template():
+    """The default Plotly template as JSON, which go.Figure embeds in every layout"""
+    return plotly_io.templates[plotly_io.templates.default].to_plotly_json()
+
+
+@lru_cache(maxsize=None)
+def layout(title, xaxis_title=None, yaxis_title=None):
+    """Shared layout of a chart with the given titles"""
+    spec = {
+        'template': plotly_template(),
+        'title': {'text': title},
+        'font': {'size': FONT_SIZE},
+        'height': CHART_HEIGHT
+    }
+    if xaxis_title:
+        spec['xaxis'] = {'title': {'text': xaxis_title}}
+    if yaxis_title:
+        spec['yaxis'] = {'title': {'text': yaxis_title}}
+    return spec
+
+
+def figure(layout_spec, *traces):
+    """A Plotly figure of the traces, as go.Figure would serialize it"""
+    return {'data': list(traces), 'layout': layout_spec}
+
+
+def bar(x, y, colors, hovertemplate, text=None):
+    """Bar trace with one colour and an optional text label per bar"""
+    trace = {'type': 'bar', 'x': list(x), 'y': list(y), 'marker': {'color': list(colors)},
+             'hovertemplate': hovertemplate}
+    if text is not None:
+        trace['text'] = list(text)
+        trace['textposition'] = 'auto'
+    return trace
+
+
+def pie(labels, values, hovertemplate, textinfo=None):
+    """Pie trace; textinfo (e.g. 'label+percent') also lets Plotly place the labels"""
+    trace = {'type': 'pie', 'labels': list(labels), 'values': list(values), 'hovertemplate': hovertemplate}
+    if textinfo:
+        trace['textinfo'] = textinfo
+        trace['textposition'] = 'auto'
+    return trace
+
+
+def line(x, y, color, hovertemplate):
+    """Line trace with a marker on every point"""
+    return {'type': 'scatter', 'x': list(x), 'y': list(y), 'mode': 'lines+markers', 'line': {'color': color},
+            'hovertemplate': hovertemplate}
@@ -0,0 +1,193 @@
+"""
+Columnar in-memory analytics over one user's transactions
+
+``load`` pulls the rows of a date range once, in batches, into typed NumPy
+columns: dates as int32 days since 1970-01-01, amounts as int64 paise and
+categories dictionary-encoded as int32 codes. Every breakdown is then a
+vectorized pass over those arrays. A sparse (category x month) cube of
+the occupied cells is built with one sort and exact int64 sums, each
+breakdown reads from it, and top-N uses argpartition instead of sorting
+everything. Money comes back as integer paise, like the rest of
+app.aggregates.
+
+Reports use it for date ranges the monthly rollup cannot answer (ranges
+that split a month), where it replaces several GROUP BY scans with one.
+"""
+from flask import g
+from sqlalchemy import select
+
+from app.lazy import np
+from app.models import db, Transaction
+from app.periods import epoch_days
+
+# Rows fetched from the cursor per batch while building the columns
+LOAD_BATCH_SIZE = 50000
+
+
+class Columns:
+    """A user's transactions in a date range as parallel NumPy arrays"""
+
+    def __init__(self, ids, days, paise, codes, categories):
+        self.ids = ids
+        self.days = days
+        self.paise = paise
+        self.codes = codes
+        self.categories = categories
+        self._cube = None
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def months(self):
+        """Month of each row as a count of months since 1970-01"""
+        return self.days.astype('datetime64[D]').astype('datetime64[M]').astype(np.int32)
+
+    def cube(self):
+        """Sums and counts per occupied (category, month) cell, computed once.
+
+        Returns (codes, months, totals, income, expenses, counts) as parallel
+        int64 arrays with one entry per cell that has rows, ordered by category
+        code then month. Only occupied cells are kept, so the cube grows with
+        the rows rather than with categories times months spanned.
+        """
+        if self._cube is None:
+            months = self.months.astype(np.int64)
+            first = int(months.min()) if len(months) else 0
+            width = int(months.max()) - first + 1 if len(months) else 1
+            cells = self.codes.astype(np.int64) * width + (months - first)
+            keys, (totals, income, expenses, counts) = _grouped(
+                cells, self.paise, np.maximum(self.paise, 0), np.maximum(-self.paise, 0),
+                np.ones(len(cells), dtype=np.int64))
+            codes, offsets = np.divmod(keys, width)
+            self._cube = (codes, offsets + first, totals, income, expenses, counts)
+        return self._cube
+
+    def totals(self):
+        """Total income, total expenses (positive) and transaction count"""
+        return {
+            'total_income': int(self.paise[self.paise > 0].sum()),
+            'total_expenses': -int(self.paise[self.paise < 0].sum()),
+            'transaction_count': len(self)
+        }
+
+    def category_totals(self):
+        """Net total and count per category, by the month each category first appears, then name"""
+        codes, months, totals, _, _, counts = self.cube()
+        starts = _starts(codes)
+        # Cells are ordered by month within a category, so its first cell holds its first month
+        first_month = dict(zip(codes[starts].tolist(), months[starts].tolist()))
+        by_code = dict(zip(codes[starts].tolist(), zip(_sums(totals, starts), _sums(counts, starts))))
+        order = sorted(by_code, key=lambda code: (first_month[code], self.categories[code]))
+        return [
+            {'category': self.categories[code], 'total': by_code[code][0], 'count': by_code[code][1]}
+            for code in order
+        ]
+
+    def expense_categories(self):
+        """Expense total (positive) per category, by the latest month with an expense, then name"""
+        codes, months, _, _, expenses, _ = self.cube()
+        spent = expenses > 0
+        codes, months, expenses = codes[spent], months[spent], expenses[spent]
+        starts = _starts(codes)
+        ends = np.append(starts[1:], len(codes)) - 1
+        last_month = dict(zip(codes[starts].tolist(), months[ends].tolist()))
+        spent_by_code = dict(zip(codes[starts].tolist(), _sums(expenses, starts)))
+        order = sorted(spent_by_code, key=lambda code: (-last_month[code], self.categories[code]))
+        return [(self.categories[code], spent_by_code[code]) for code in order]
+
+    def monthly_totals(self):
+        """Income, expenses (positive) and net total per YYYY-MM month, oldest first"""
+        _, months, totals, income, expenses, _ = self.cube()
+        keys, (income, expenses, totals) = _grouped(months, income, expenses, totals)
+        epoch = np.datetime64('1970-01', 'M')
+        return [
+            {'month': str(epoch + month), 'income': month_income, 'expenses': month_expenses, 'total': month_total}
+            for month, month_income, month_expenses, month_total
+            in zip(keys.tolist(), income.tolist(), expenses.tolist(), totals.tolist())
+        ]
+
+    def top_ids(self, expenses=True, limit=10):
+        """Ids of the largest expenses (or incomes), biggest first, ties by id"""
+        mask = self.paise < 0 if expenses else self.paise > 0
+        ids = self.ids[mask]
+        # Biggest first means most negative expense or most positive income
+        keys = self.paise[mask] if expenses else -self.paise[mask]
+        if len(keys) > limit:
+            # Keep every row tied with the limit-th key so ties still resolve by id
+            threshold = np.partition(keys, limit - 1)[limit - 1]
+            keep = keys <= threshold
+            ids, keys = ids[keep], keys[keep]
+        order = np.lexsort((ids, keys))[:limit]
+        return ids[order].tolist()
+
+    def top_transactions(self, expenses=True, limit=10):
+        """The top_ids rows as Transaction objects, in the same order"""
+        ids = self.top_ids(expenses, limit)
+        if not ids:
+            return []
+        rows = {t.id: t for t in Transaction.query.filter(Transaction.id.in_(ids))}
+        return [rows[i] for i in ids]
+
+
+def _starts(keys):
+    """Index of the first element of each run of equal values in sorted keys"""
+    return np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.empty(0, dtype=np.int64)
+
+
+def _sums(values, starts):
+    """int64 sum of each run of values beginning at starts, as Python ints"""
+    return np.add.reduceat(values, starts).tolist() if len(starts) else []
+
+
+def _grouped(keys, *values):
+    """The distinct keys in ascending order and each int64 value array summed per key"""
+    order = np.argsort(keys, kind='stable')
+    keys = keys[order]
+    starts = _starts(keys)
+    return keys[starts], [np.add.reduceat(v[order], starts) if len(starts) else np.empty(0, dtype=np.int64)
+                          for v in values]
+
+
+def load(user_id, start_date=None, end_date=None, batch_size=LOAD_BATCH_SIZE):
+    """Read one user's transactions in a date range into Columns"""
+    statement = select(Transaction.id, epoch_days(Transaction.date), Transaction.amount_paise, Transaction.category)\
+        .where(Transaction.user_id == user_id)
+    if start_date:
+        statement = statement.where(Transaction.date >= start_date)
+    if end_date:
+        statement = statement.where(Transaction.date <= end_date)
+
+    categories = {}
+    ids, days, paise, codes = [], [], [], []
+    # A Core execute on the session's connection skips ORM result processing, which
+    # costs more than the query itself; stream_results keeps PostgreSQL server-side
+    result = db.session.connection().execute(statement, execution_options={'stream_results': True})
+    try:
+        while True:
+            batch = result.fetchmany(batch_size)
+            if not batch:
+                break
+            batch_ids, batch_days, batch_paise, batch_categories = zip(*batch)
+            ids.append(np.array(batch_ids, dtype=np.int64))
+            days.append(np.array(batch_days, dtype=np.int32))
+            paise.append(np.array(batch_paise, dtype=np.int64))
+            codes.append(np.fromiter((categories.setdefault(c, len(categories)) for c in batch_categories),
+                                     dtype=np.int32, count=len(batch_categories)))
+    finally:
+        result.close()
+
+    def joined(parts, dtype):
+        return np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+
+    return Columns(joined(ids, np.int64), joined(days, np.int32), joined(paise, np.int64),
+                   joined(codes, np.int32), list(categories))
+
+
+def for_request(user_id, start_date=None, end_date=None):
+    """load() memoized for the current request, so several breakdowns share one read"""
+    cache = g.setdefault('columnar', {})
+    key = (user_id, start_date, end_date)
+    if key not in cache:
+        cache[key] = load(user_id, start_date, end_date)
+    return cache[key]
@@ -61,8 +61,38 @@ class Config:
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD', 'demo_password')
     
     # File Upload Configuration
-    MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+    MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH', 16 * 1024 * 1024))  # 16MB max file size by default
     UPLOAD_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uploads')
+    
+    # CSV Import Configuration
+    IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', 50000))  # Rows read and committed per chunk
+    IMPORT_PROCESSES = int(os.environ.get('IMPORT_PROCESSES', os.cpu_count() or 1))  # Parsers for multi-file/zip imports
+    IMPORT_ZIP_MAX_RATIO = int(os.environ.get('IMPORT_ZIP_MAX_RATIO', 20))  # Zip uploads may expand to this many MAX_CONTENT_LENGTHs
+    
+    # Background Job Configuration
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))  # Threads per worker process; 0 runs jobs inline
+    JOB_HEARTBEAT = int(os.environ.get('JOB_HEARTBEAT', 30))  # Seconds between refreshes of a queued or running job
+    JOB_STALE_AFTER = int(os.environ.get('JOB_STALE_AFTER', 5 * 60))  # Seconds without a refresh before a job counts as interrupted
+    
+    # Cache Configuration
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memory')  # memory, sqlite, redis or none
+    CACHE_URL = os.environ.get('CACHE_URL', '')  # SQLite cache file or Redis URL for the shared backends
+    CACHE_MAX_BYTES = int(os.environ.get('CACHE_MAX_BYTES', 64 * 1024 * 1024))  # Per-process bound of the memory backend
+    CACHE_TTL = int(os.environ.get('CACHE_TTL', 24 * 60 * 60))  # Seconds before shared entries expire
+    
+    # Boot Configuration
+    AUTO_CREATE_SCHEMA = os.environ.get('AUTO_CREATE_SCHEMA', 'true').lower() in ['true', 'on', '1']  # Build an empty database in create_app
+    
+    # Report Configuration
+    REPORT_TOP_N = int(os.environ.get('REPORT_TOP_N', 10))  # Top expenses / income sources in a summary report
+    REPORT_TOP_N_MAX = int(os.environ.get('REPORT_TOP_N_MAX', 100))  # Largest top_n a client may ask for
+    
+    # PDF Report Configuration
+    PDF_SYNC_MAX_ROWS = int(os.environ.get('PDF_SYNC_MAX_ROWS', 500))  # Larger reports render as background jobs
+    PDF_MAX_DETAIL_ROWS = int(os.environ.get('PDF_MAX_DETAIL_ROWS', 100000))  # Most transactions one PDF may list
+    PDF_PROCESSES = int(os.environ.get('PDF_PROCESSES', 2))  # Renderers on the process pool; 0 renders on the job thread
+    PDF_FOLDER = os.environ.get('PDF_FOLDER', os.path.join(UPLOAD_FOLDER, 'reports'))  # Rendered PDFs awaiting download
+    PDF_TTL = int(os.environ.get('PDF_TTL', 60 * 60))  # Seconds a rendered PDF can be downloaded
 
 class DevelopmentConfig(Config):
     """Development configuration"""
@@ -73,12 +103,15 @@ class ProductionConfig(Config):
     """Production configuration"""
     DEBUG = False
     SQLALCHEMY_DATABASE_URI = get_database_uri()
+    # Run `flask init-db` (or `flask db upgrade`) once per deploy instead of in every worker
+    AUTO_CREATE_SCHEMA = os.environ.get('AUTO_CREATE_SCHEMA', 'false').lower() in ['true', 'on', '1']
     
 class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
+    JOB_WORKERS = 0  # In-memory SQLite is per-connection, so run jobs inline
 
 # Configuration mapping
 config = {
@@ -0,0 +1,65 @@
+"""
+Server-side downsampling of long chart series
+
+A chart a few hundred pixels wide cannot show thousands of points, so the
+chart endpoints accept ``max_points`` and thin their series here before
+sending them. Levels such as a running balance keep the points
+Largest-Triangle-Three-Buckets picks, which preserves peaks, troughs and
+the overall shape. Flows such as income per day are summed over runs of
+consecutive periods instead, so totals stay exact. Both work on NumPy
+arrays: bucket averages and sums come from cumulative sums and reduceat,
+and LTTB only loops over the output buckets.
+"""
+from app.lazy import np
+
+# LTTB always keeps the first and last point, plus at least one in between
+MIN_POINTS = 3
+
+
+def lttb_indices(x, y, max_points):
+    """Indices of the points LTTB keeps out of (x, y), oldest first, at most max_points of them"""
+    count = len(x)
+    if max_points >= count:
+        return np.arange(count)
+    if max_points < MIN_POINTS:
+        raise ValueError(f'max_points must be at least {MIN_POINTS}')
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # max_points - 2 buckets over every point but the first and the last
+    edges = np.linspace(1, count - 1, max_points - 1).astype(np.int64)
+    starts, ends = edges[:-1], edges[1:]
+    sum_x = np.concatenate(([0.0], np.cumsum(x)))
+    sum_y = np.concatenate(([0.0], np.cumsum(y)))
+    widths = ends - starts
+    # Each bucket's third triangle corner is the average of the next bucket (the last point for the last one)
+    next_x = np.append(((sum_x[ends] - sum_x[starts]) / widths)[1:], x[-1])
+    next_y = np.append(((sum_y[ends] - sum_y[starts]) / widths)[1:], y[-1])
+
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0], selected[-1] = 0, count - 1
+    previous = 0
+    for bucket, (start, end) in enumerate(zip(starts, ends)):
+        # Twice the area of the triangle (previous pick, candidate, next average) for every candidate
+        areas = np.abs((x[previous] - next_x[bucket]) * (y[start:end] - y[previous])
+                       - (x[previous] - x[start:end]) * (next_y[bucket] - y[previous]))
+        previous = start + int(np.argmax(areas))
+        selected[bucket + 1] = previous
+    return selected
+
+
+def bucket_starts(count, max_points):
+    """First index of each run of consecutive points when count points are merged into at most max_points"""
+    if max_points >= count:
+        return np.arange(count)
+    if max_points < 1:
+        raise ValueError('max_points must be at least 1')
+    return np.unique(np.linspace(0, count, max_points, endpoint=False).astype(np.int64))
+
+
+def bucket_sums(values, starts):
+    """Sum values over the runs beginning at starts, as Python ints"""
+    if not len(values):
+        return []
+    return np.add.reduceat(np.asarray(values, dtype=np.int64), starts).tolist()
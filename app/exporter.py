@@ -0,0 +1,78 @@
+"""
+Streaming CSV / NDJSON export of a user's transactions
+
+Rows are read from a server-side cursor in batches of EXPORT_BATCH_SIZE and
+serialized one batch at a time, so memory stays constant whatever the
+number of transactions and the first bytes go out before the query is done.
+"""
+import csv
+import io
+import json
+
+from sqlalchemy import select
+
+from app.models import db, Transaction, to_rupees
+
+# Rows fetched from the cursor and written to the response per chunk
+EXPORT_BATCH_SIZE = 1000
+
+# Same fields, in the same order, as the transaction list endpoint; the
+# CSV can be uploaded again as-is because the importer ignores extra columns
+EXPORT_COLUMNS = ['id', 'date', 'category', 'amount', 'description', 'created_at']
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+
+def export_statement(user_id):
+    """Newest-first SELECT of the exported columns, ready for extra filters"""
+    return select(
+        Transaction.id, Transaction.date, Transaction.category, Transaction.amount_paise,
+        Transaction.description, Transaction.created_at
+    ).where(Transaction.user_id == user_id)\
+     .order_by(Transaction.date.desc(), Transaction.id.desc())
+
+
+def _batches(statement, batch_size):
+    """Yield lists of rows, keeping at most one batch in memory"""
+    result = db.session.execute(statement.execution_options(yield_per=batch_size))
+    try:
+        yield from result.partitions()
+    finally:
+        result.close()
+
+
+def _values(row):
+    return (row.id, row.date.strftime('%Y-%m-%d'), row.category, to_rupees(row.amount_paise), row.description,
+            row.created_at.isoformat() if row.created_at else None)
+
+
+def stream_csv(statement, batch_size=EXPORT_BATCH_SIZE):
+    """Yield the export as CSV text, header first"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue()
+
+    for batch in _batches(statement, batch_size):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(_values(row) for row in batch)
+        yield buffer.getvalue()
+
+
+def stream_ndjson(statement, batch_size=EXPORT_BATCH_SIZE):
+    """Yield the export as newline-delimited JSON objects"""
+    for batch in _batches(statement, batch_size):
+        yield ''.join(json.dumps(dict(zip(EXPORT_COLUMNS, _values(row))), ensure_ascii=False) + '\n'
+                      for row in batch)
+
+
+def stream(statement, format, batch_size=EXPORT_BATCH_SIZE):
+    """Generator for the export in the given format ('csv' or 'ndjson')"""
+    if format == 'ndjson':
+        return stream_ndjson(statement, batch_size)
+    return stream_csv(statement, batch_size)
@@ -0,0 +1,438 @@
+"""
+Vectorized CSV import engine shared by the web and API upload paths
+"""
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime
+import io
+import os
+import zipfile
+
+from sqlalchemy import func, select
+
+from app import bulk, cache, rollups
+from app.lazy import np, pd
+from app.models import db, Transaction, to_rupees, transaction_fingerprint
+
+# Columns every import needs; the web form additionally insists on 'description'
+REQUIRED_COLUMNS = ['date', 'category', 'amount']
+
+# Rows per COPY / executemany round-trip
+BATCH_SIZE = 5000
+
+# Rows read from the upload and committed at a time in streaming mode
+CHUNK_SIZE = 50000
+
+# Row error messages kept per import; further failures are only counted
+MAX_ERRORS = 1000
+
+# Largest accepted |amount| in rupees, well inside a BIGINT of paise
+MAX_AMOUNT = 10 ** 15
+
+# Most CSV members extracted from one zip archive
+MAX_ZIP_MEMBERS = 1000
+
+# Target size of the line-aligned byte ranges a file is split into for parallel parsing,
+# kept near IMPORT_CHUNK_SIZE rows so each committed write stays short
+PIECE_BYTES = 2 * 1024 * 1024
+
+
+class ImportFormatError(ValueError):
+    """Raised when an upload is not a usable transactions CSV"""
+
+
+@dataclass
+class ImportResult:
+    """Outcome of an import run, updated chunk by chunk while streaming"""
+    rows: int = 0
+    created: int = 0
+    skipped: int = 0
+    failed: int = 0
+    chunks: int = 0
+    errors: list = field(default_factory=list)
+    preview: object = None
+
+    def add_errors(self, errors):
+        """Count row errors, keeping at most MAX_ERRORS messages"""
+        self.failed += len(errors)
+        room = MAX_ERRORS - len(self.errors)
+        if room > 0:
+            self.errors.extend(errors[:room])
+
+
+def missing_columns(df, required_columns=REQUIRED_COLUMNS):
+    """Return the required columns that are absent from the frame"""
+    return [col for col in required_columns if col not in df.columns]
+
+
+def parse_dates(values):
+    """Convert a column of date strings to datetimes, NaT where unparseable"""
+    # Fast path: ISO dates, which is what bank exports and our sample use
+    dates = pd.to_datetime(values, format='ISO8601', errors='coerce')
+
+    # Fall back to per-value inference only for the rows the fast path rejected
+    retry = dates.isna() & values.notna()
+    if retry.any():
+        dates[retry] = pd.to_datetime(values[retry], format='mixed', errors='coerce')
+
+    return dates
+
+
+def validate_frame(df):
+    """Validate and convert whole columns at once.
+
+    Returns a frame of insertable columns (date, category, amount_paise,
+    description) holding only the valid rows, the 0-based positions of the
+    invalid rows and a description of what is wrong with each of them.
+    """
+    dates = parse_dates(df['date'])
+    amounts = pd.to_numeric(df['amount'], errors='coerce')
+    categories = df['category'].astype('string').str.strip()
+
+    if 'description' in df.columns:
+        descriptions = df['description'].astype('string').fillna('')
+    else:
+        descriptions = pd.Series('', index=df.index, dtype='string')
+
+    bad_date = dates.isna().to_numpy(dtype=bool)
+    bad_amount = (amounts.isna() | ~(amounts.fillna(0).abs() < MAX_AMOUNT)).to_numpy(dtype=bool)
+    bad_category = (categories.isna() | (categories == '')).fillna(True).to_numpy(dtype=bool)
+    invalid = bad_date | bad_amount | bad_category
+
+    positions = np.flatnonzero(invalid).tolist()
+    problems = []
+    if positions:
+        raw_dates = df['date'].to_numpy()
+        raw_amounts = df['amount'].to_numpy()
+        for pos in positions:
+            row_problems = []
+            if bad_date[pos]:
+                row_problems.append(f"invalid date '{raw_dates[pos]}'")
+            if bad_amount[pos]:
+                row_problems.append(f"invalid amount '{raw_amounts[pos]}'")
+            if bad_category[pos]:
+                row_problems.append('missing category')
+            problems.append(', '.join(row_problems))
+
+    valid = ~invalid
+    frame = pd.DataFrame({
+        'date': dates[valid].dt.date,
+        'category': categories[valid],
+        'amount_paise': to_paise_array(amounts[valid].to_numpy(dtype='float64')),
+        'description': descriptions[valid],
+    })
+
+    return frame, positions, problems
+
+
+def to_paise_array(amounts):
+    """Vectorized to_paise: rupee floats to int64 paise, rounding half away from zero"""
+    # Rounding to 6 places first drops binary noise, e.g. 1.005 * 100 == 100.49999999999999
+    paise = np.round(amounts * 100, 6)
+    return (np.sign(paise) * np.floor(np.abs(paise) + 0.5)).astype(np.int64)
+
+
+def format_errors(positions, problems, start_row=1, label=''):
+    """Render row problems as messages numbered from ``start_row``"""
+    prefix = f'{label}: ' if label else ''
+    return [f'{prefix}Row {start_row + pos}: {problem}' for pos, problem in zip(positions, problems)]
+
+
+def prepare_frame(df, start_row=1):
+    """Validate a frame and return its valid rows plus per-row error messages.
+
+    ``start_row`` is the 1-based row number of the frame's first row.
+    """
+    frame, positions, problems = validate_frame(df)
+    return frame, format_errors(positions, problems, start_row)
+
+
+def frame_to_rows(frame, user_id):
+    """Turn a prepared frame into parameter dicts for a bulk INSERT"""
+    created_at = datetime.utcnow()
+    return [
+        {
+            'date': date,
+            'category': category,
+            'amount_paise': paise,
+            'description': description,
+            'fingerprint': transaction_fingerprint(user_id, date, to_rupees(paise), category, description),
+            'user_id': user_id,
+            'created_at': created_at
+        }
+        for date, category, paise, description in zip(
+            frame['date'].tolist(),
+            frame['category'].tolist(),
+            frame['amount_paise'].tolist(),
+            frame['description'].tolist()
+        )
+    ]
+
+
+def last_transaction_id():
+    """Highest transaction id stored so far, used to mark where an import starts"""
+    return db.session.query(func.max(Transaction.id)).scalar() or 0
+
+
+def existing_fingerprints(user_id, fingerprints, up_to_id):
+    """Return the subset of fingerprints already stored for the user.
+
+    Only rows with ids up to ``up_to_id`` count, so identical rows that
+    appear more than once within the file being imported are all kept.
+    """
+    if not fingerprints:
+        return set()
+    return set(db.session.execute(
+        select(Transaction.fingerprint).where(
+            Transaction.user_id == user_id,
+            Transaction.fingerprint.in_(fingerprints),
+            Transaction.id <= up_to_id
+        )
+    ).scalars())
+
+
+def write_rows(rows, user_id, skip_up_to_id=None, batch_size=BATCH_SIZE):
+    """Insert transaction rows in fixed-size batches through the bulk writer.
+
+    When ``skip_up_to_id`` is given, rows whose fingerprint matches a
+    transaction stored at or below that id are dropped, using one set-based
+    lookup per batch. The monthly rollup and the user's data version are
+    updated in the same transaction.
+    Returns the number of rows inserted.
+    """
+    inserted = 0
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+
+        if skip_up_to_id is not None:
+            seen = existing_fingerprints(user_id, {row['fingerprint'] for row in batch}, skip_up_to_id)
+            if seen:
+                batch = [row for row in batch if row['fingerprint'] not in seen]
+
+        inserted += bulk.insert_rows(Transaction.__table__, batch)
+        rollups.add_rows(user_id, ((row['date'], row['category'], row['amount_paise']) for row in batch))
+        cache.bump_version(user_id)
+
+    return inserted
+
+
+def import_dataframe(df, user_id, skip_duplicates=True, batch_size=BATCH_SIZE):
+    """Validate a DataFrame and bulk insert its valid rows for a user.
+
+    The caller owns the transaction and is expected to commit.
+    """
+    skip_up_to_id = last_transaction_id() if skip_duplicates else None
+
+    frame, errors = prepare_frame(df)
+    rows = frame_to_rows(frame, user_id)
+    created = write_rows(rows, user_id, skip_up_to_id, batch_size)
+
+    result = ImportResult(rows=len(df), created=created, skipped=len(rows) - created, chunks=1)
+    result.add_errors(errors)
+    return result
+
+
+def import_csv(source, user_id, required_columns=REQUIRED_COLUMNS, chunk_size=CHUNK_SIZE,
+               skip_duplicates=True, preview_rows=0, on_progress=None):
+    """Stream a CSV into the transaction table in fixed-size chunks.
+
+    ``source`` is a path or binary file object (e.g. ``FileStorage.stream``)
+    and is never loaded whole: each chunk is validated, inserted and
+    committed before the next one is read, so peak memory depends on
+    ``chunk_size`` rather than the size of the upload. ``on_progress`` is
+    called with the running ImportResult after every committed chunk, and
+    the first ``preview_rows`` raw rows are kept on ``result.preview``.
+    With ``skip_duplicates`` rows already stored before the import started
+    are skipped and counted on ``result.skipped``.
+    """
+    result = ImportResult()
+    skip_up_to_id = last_transaction_id() if skip_duplicates else None
+
+    try:
+        reader = pd.read_csv(source, chunksize=chunk_size)
+    except pd.errors.EmptyDataError:
+        raise ImportFormatError('CSV file is empty')
+
+    with reader:
+        for chunk in reader:
+            if result.chunks == 0:
+                missing = missing_columns(chunk, required_columns)
+                if missing:
+                    raise ImportFormatError(f'CSV must contain columns: {", ".join(required_columns)}')
+                if preview_rows:
+                    result.preview = chunk.head(preview_rows)
+
+            frame, errors = prepare_frame(chunk, start_row=result.rows + 1)
+            created = write_rows(frame_to_rows(frame, user_id), user_id, skip_up_to_id)
+            db.session.commit()
+
+            result.rows += len(chunk)
+            result.created += created
+            result.skipped += len(frame) - created
+            result.chunks += 1
+            result.add_errors(errors)
+
+            if on_progress:
+                on_progress(result)
+
+    return result
+
+
+def extract_csvs(zip_path, dest_dir, prefix, max_bytes, max_members=MAX_ZIP_MEMBERS):
+    """Extract the CSV members of a zip archive, returning (name, path) pairs in archive order.
+
+    Members are written under generated names, so paths inside the
+    archive can never point outside ``dest_dir``. An archive with more than
+    ``max_members`` CSVs or more than ``max_bytes`` of them uncompressed is
+    refused before anything is written, and since the sizes in the archive
+    can lie, extraction also stops once ``max_bytes`` have been written.
+    """
+    name = os.path.basename(zip_path)
+    extracted = []
+    try:
+        with zipfile.ZipFile(zip_path) as archive:
+            members = [info for info in archive.infolist()
+                       if not info.is_dir() and info.filename.lower().endswith('.csv')]
+            if len(members) > max_members:
+                raise ImportFormatError(f'{name} has {len(members)} CSV files; at most {max_members} are accepted')
+            if sum(info.file_size for info in members) > max_bytes:
+                raise ImportFormatError(f'{name} expands to more than {max_bytes} bytes')
+
+            written = 0
+            for info in members:
+                path = os.path.join(dest_dir, f'{prefix}_{len(extracted)}.csv')
+                extracted.append((info.filename, path))
+                with archive.open(info) as src, open(path, 'wb') as dst:
+                    while chunk := src.read(1024 * 1024):
+                        written += len(chunk)
+                        if written > max_bytes:
+                            raise ImportFormatError(f'{name} expands to more than {max_bytes} bytes')
+                        dst.write(chunk)
+    except Exception:
+        for _, path in extracted:
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+
+    if not extracted:
+        raise ImportFormatError(f'{name} contains no CSV files')
+    return extracted
+
+
+def split_csv(path, piece_bytes=PIECE_BYTES):
+    """Split a CSV file into byte ranges that start and end on record boundaries.
+
+    Returns the header line and a list of (start, end) offsets covering the
+    data rows. A piece ends at the first newline past ``piece_bytes`` that
+    is outside quotes (an even number of '"' since the header), so a quoted
+    field spanning several lines stays in one piece.
+    """
+    size = os.path.getsize(path)
+    ranges = []
+    with open(path, 'rb') as f:
+        header = f.readline()
+        start = position = f.tell()
+        quoted = False
+        while position < size:
+            block = f.read(piece_bytes)
+            block_start, position = position, position + len(block)
+            # Offset in this block from which a newline may end the current piece
+            cursor = 0
+            while True:
+                target = max(start + piece_bytes - block_start, cursor)
+                if target >= len(block):
+                    quoted ^= block.count(b'"', cursor) % 2 == 1
+                    break
+                newline = block.find(b'\n', target)
+                if newline < 0:
+                    quoted ^= block.count(b'"', cursor) % 2 == 1
+                    break
+                quoted ^= block.count(b'"', cursor, newline) % 2 == 1
+                cursor = newline + 1
+                if not quoted:
+                    ranges.append((start, block_start + cursor))
+                    start = block_start + cursor
+        if start < size:
+            ranges.append((start, size))
+
+    return header, ranges
+
+
+def parse_piece(path, header, start, end):
+    """Parse and validate one byte range of a CSV; runs in a worker process"""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+
+    df = pd.read_csv(io.BytesIO(header + data))
+    frame, positions, problems = validate_frame(df)
+    return frame, positions, problems, len(df)
+
+
+def import_files(files, user_id, executor, required_columns=REQUIRED_COLUMNS, skip_duplicates=True,
+                 piece_bytes=PIECE_BYTES, on_progress=None, max_in_flight=None):
+    """Import several CSV files, parsing them in parallel on ``executor``.
+
+    ``files`` is a list of (name, path) pairs. Every file is split into
+    line-aligned pieces that worker processes parse and validate
+    concurrently, while this process writes the results back in file and
+    row order through the bulk writer, committing after each piece. At most
+    ``max_in_flight`` pieces (default twice the executor's workers) are
+    submitted or parsed but not yet written at any time.
+    """
+    result = ImportResult()
+    skip_up_to_id = last_transaction_id() if skip_duplicates else None
+
+    # Check every header up front so a bad file fails before anything is written
+    pieces = []
+    for name, path in files:
+        header, ranges = split_csv(path, piece_bytes)
+        if not header.strip():
+            raise ImportFormatError(f'{name} is empty')
+        columns = pd.read_csv(io.BytesIO(header), nrows=0).columns
+        if [col for col in required_columns if col not in columns]:
+            raise ImportFormatError(f'{name}: CSV must contain columns: {", ".join(required_columns)}')
+        pieces.extend((name, path, header, start, end) for start, end in ranges)
+
+    # Keep only a window of pieces in flight: parsed frames wait in this process
+    # until they are written, so an unbounded queue would hold the whole upload
+    if max_in_flight is None:
+        max_in_flight = 2 * getattr(executor, '_max_workers', 1)
+    remaining = iter(pieces)
+    in_flight = deque()
+
+    def submit_next():
+        piece = next(remaining, None)
+        if piece is not None:
+            name, path, header, start, end = piece
+            in_flight.append((piece, executor.submit(parse_piece, path, header, start, end)))
+
+    for _ in range(max(max_in_flight, 1)):
+        submit_next()
+
+    # Consume in submission order so rows are written in file order
+    rows_in_file = {}
+    try:
+        while in_flight:
+            (name, path, *_), future = in_flight.popleft()
+            frame, positions, problems, row_count = future.result()
+            start_row = rows_in_file.get(path, 0) + 1
+            rows_in_file[path] = start_row - 1 + row_count
+
+            created = write_rows(frame_to_rows(frame, user_id), user_id, skip_up_to_id)
+            db.session.commit()
+            submit_next()
+
+            result.rows += row_count
+            result.created += created
+            result.skipped += len(frame) - created
+            result.chunks += 1
+            result.add_errors(format_errors(positions, problems, start_row, label=name if len(files) > 1 else ''))
+
+            if on_progress:
+                on_progress(result)
+    finally:
+        for _, future in in_flight:
+            future.cancel()
+
+    return result
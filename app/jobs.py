@@ -0,0 +1,334 @@
+"""
+Background job execution without an external broker
+
+Jobs run on a thread pool inside the worker process that accepted them and
+record their progress in the database, so a status request can be served
+by any gunicorn worker. CPU-bound work (parsing CSV pieces, laying out
+PDFs) is handed on to a process pool so it does not hold the worker's GIL.
+
+A job records the process that queued it as its owner, and a heartbeat
+thread in that process refreshes ``heartbeat_at`` while the job is queued
+or running. A job whose heartbeat is older than JOB_STALE_AFTER died with
+its worker (a restart, a crash, an OOM kill) and is marked failed.
+"""
+import multiprocessing
+import os
+import socket
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from threading import Lock, Thread
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from app import importer, pdfs
+from app.models import db, ImportJob, ReportJob, User
+from app.schema import ensure_upload_folder
+
+_executor = None
+_executor_lock = Lock()
+_process_pools = {}
+_heartbeat = None
+_active = {}  # id -> model of the jobs this process has queued or is running
+
+
+def get_executor(max_workers):
+    """Create the worker pool on first use so forked workers each get their own"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+    return _executor
+
+
+def get_process_pool(purpose, max_workers):
+    """Create the CPU-bound worker processes for one purpose on first use.
+
+    They are spawned rather than forked so they never inherit the parent's
+    open database connections. Each purpose ('import', 'pdf') gets its own
+    pool, sized by its own setting, so a long PDF cannot hold up an import.
+    """
+    with _executor_lock:
+        pool = _process_pools.get(purpose)
+        if pool is None:
+            pool = _process_pools[purpose] = ProcessPoolExecutor(
+                max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'))
+    return pool
+
+
+def owner():
+    """host:pid identifying this worker process as the owner of the jobs it queues"""
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def _beat(app):
+    """Refresh heartbeat_at of every job this process holds, every JOB_HEARTBEAT seconds"""
+    while True:
+        time.sleep(app.config['JOB_HEARTBEAT'])
+        with _executor_lock:
+            active = dict(_active)
+        if not active:
+            continue
+        with app.app_context():
+            try:
+                now = datetime.utcnow()
+                for model in (ImportJob, ReportJob):
+                    ids = [job_id for job_id, job_model in active.items() if job_model is model]
+                    if ids:
+                        model.query.filter(model.id.in_(ids))\
+                            .update({'heartbeat_at': now}, synchronize_session=False)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                app.logger.exception('Could not refresh job heartbeats')
+            finally:
+                db.session.remove()
+
+
+def _hold(app, job):
+    """Keep job's heartbeat fresh until _release, starting this process's heartbeat thread on first use"""
+    global _heartbeat
+    with _executor_lock:
+        _active[job.id] = type(job)
+        if _heartbeat is None:
+            _heartbeat = Thread(target=_beat, args=(app,), name='job-heartbeat', daemon=True)
+            _heartbeat.start()
+
+
+def _release(job_id):
+    with _executor_lock:
+        _active.pop(job_id, None)
+
+
+def submit(func, *args, job=None):
+    """Run func(*args) inside an app context on the worker pool.
+
+    With JOB_WORKERS set to 0 the job runs inline, which keeps tests and
+    single-threaded setups (e.g. in-memory SQLite) deterministic. A ``job``
+    row passed along is kept alive by the heartbeat until func returns.
+    """
+    app = current_app._get_current_object()
+    max_workers = app.config['JOB_WORKERS']
+
+    def run():
+        try:
+            with app.app_context():
+                func(*args)
+        finally:
+            if job is not None:
+                _release(job.id)
+
+    if max_workers <= 0:
+        run()
+        return None
+    if job is not None:
+        _hold(app, job)
+    return get_executor(max_workers).submit(run)
+
+
+def start_import_job(files, user_id, parallel=False, required_columns=importer.REQUIRED_COLUMNS):
+    """Spool uploaded files to disk and queue them for a background import.
+
+    A single CSV is streamed in chunks; with ``parallel`` (several files or
+    zip archives) the files are split up and parsed on the process pool.
+    """
+    job = ImportJob(id=uuid.uuid4().hex, user_id=user_id, owner=owner(),
+                    filename=', '.join(file.filename for file in files)[:255])
+
+    # The request stream is gone once we respond, so copy uploads to disk first
+    ensure_upload_folder(current_app)
+    uploads = []
+    for index, file in enumerate(files):
+        extension = '.zip' if file.filename.lower().endswith('.zip') else '.csv'
+        path = os.path.join(current_app.config['UPLOAD_FOLDER'], f'import_{job.id}_{index}{extension}')
+        file.save(path)
+        uploads.append((file.filename, path))
+
+    db.session.add(job)
+    db.session.commit()
+
+    submit(run_import_job, job.id, uploads, parallel, required_columns, job=job)
+    return job
+
+
+def run_import_job(job_id, uploads, parallel, required_columns):
+    """Import spooled uploads, recording progress on the job after every chunk"""
+    job = db.session.get(ImportJob, job_id)
+    job.status = 'running'
+    job.started_at = datetime.utcnow()
+    db.session.commit()
+
+    def record_progress(result):
+        job.rows_processed = result.rows
+        job.transactions_created = result.created
+        job.transactions_skipped = result.skipped
+        job.rows_failed = result.failed
+        job.chunks_committed = result.chunks
+        db.session.commit()
+
+    paths = [path for _, path in uploads]
+    try:
+        if parallel:
+            files = []
+            # Caps what an archive may expand to, since MAX_CONTENT_LENGTH only bounds the compressed upload
+            max_bytes = current_app.config['MAX_CONTENT_LENGTH'] * current_app.config['IMPORT_ZIP_MAX_RATIO']
+            for name, path in uploads:
+                if path.endswith('.zip'):
+                    extracted = importer.extract_csvs(path, os.path.dirname(path), f'{os.path.basename(path)}_member',
+                                                      max_bytes)
+                    paths.extend(member_path for _, member_path in extracted)
+                    files.extend(extracted)
+                else:
+                    files.append((name, path))
+
+            executor = get_process_pool('import', current_app.config['IMPORT_PROCESSES'])
+            result = importer.import_files(files, job.user_id, executor, required_columns=required_columns,
+                                           on_progress=record_progress)
+        else:
+            with open(paths[0], 'rb') as f:
+                result = importer.import_csv(f, job.user_id, required_columns=required_columns,
+                                             chunk_size=current_app.config['IMPORT_CHUNK_SIZE'],
+                                             on_progress=record_progress)
+        job.errors = result.errors
+        job.status = 'finished'
+    except Exception as e:
+        db.session.rollback()
+        job.status = 'failed'
+        job.message = str(e)
+    finally:
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+        for path in paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def start_report_job(user_id, layout, start_date=None, end_date=None, detail_rows=None):
+    """Queue a PDF report for rendering in the background; see run_report_job"""
+    purge_expired_reports()
+
+    job = ReportJob(id=uuid.uuid4().hex, user_id=user_id, layout=layout, owner=owner())
+    db.session.add(job)
+    db.session.commit()
+
+    submit(run_report_job, job.id, start_date, end_date, detail_rows, job=job)
+    return job
+
+
+def run_report_job(job_id, start_date, end_date, detail_rows):
+    """Gather a report, lay it out on the process pool and keep the PDF for PDF_TTL seconds"""
+    job = db.session.get(ReportJob, job_id)
+    job.status = 'running'
+    job.started_at = datetime.utcnow()
+    db.session.commit()
+
+    try:
+        data = pdfs.report_data(db.session.get(User, job.user_id), job.layout, start_date, end_date, detail_rows)
+        job.table_rows = pdfs.table_rows(data)
+        job.filename = pdfs.filename(data)
+        db.session.commit()
+
+        processes = current_app.config['PDF_PROCESSES']
+        if processes > 0:
+            pdf = get_process_pool('pdf', processes).submit(pdfs.render, job.layout, data).result()
+        else:
+            pdf = pdfs.render(job.layout, data)
+
+        # Written under a temporary name so a download never sees half a file
+        folder = current_app.config['PDF_FOLDER']
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, f'report_{job.id}.pdf')
+        with open(f'{path}.part', 'wb') as f:
+            f.write(pdf)
+        os.replace(f'{path}.part', path)
+
+        job.path = path
+        job.size_bytes = len(pdf)
+        job.status = 'finished'
+    except Exception as e:
+        db.session.rollback()
+        job.status = 'failed'
+        job.message = str(e)
+    finally:
+        job.finished_at = datetime.utcnow()
+        if job.status == 'finished':
+            job.expires_at = job.finished_at + timedelta(seconds=current_app.config['PDF_TTL'])
+        db.session.commit()
+
+
+def expire_report(job):
+    """Delete an expired job's PDF and mark it expired. The caller commits."""
+    if job.path and os.path.exists(job.path):
+        os.remove(job.path)
+    job.path = None
+    job.status = 'expired'
+
+
+def purge_expired_reports():
+    """Delete every rendered PDF past its expiry"""
+    expired = ReportJob.query.filter(ReportJob.status == 'finished', ReportJob.expires_at <= datetime.utcnow()).all()
+    for job in expired:
+        expire_report(job)
+    if expired:
+        db.session.commit()
+    return len(expired)
+
+
+def report_path(job):
+    """Path of a finished job's PDF, or None if it is not ready, failed or has expired"""
+    if job.status == 'finished' and job.expired:
+        expire_report(job)
+        db.session.commit()
+    if job.status != 'finished' or not job.path or not os.path.exists(job.path):
+        return None
+    return job.path
+
+
+def _interrupted(model):
+    """Condition matching unfinished jobs whose owner stopped refreshing their heartbeat"""
+    cutoff = datetime.utcnow() - timedelta(seconds=current_app.config['JOB_STALE_AFTER'])
+    return model.status.in_(['queued', 'running']) & (model.heartbeat_at.is_(None) | (model.heartbeat_at < cutoff))
+
+
+def _interrupted_message(job_owner):
+    return f'Interrupted: worker {job_owner or "unknown"} stopped running the job'
+
+
+def fail_interrupted_jobs():
+    """Mark unfinished jobs without a recent heartbeat as failed; returns how many.
+
+    Jobs still refreshed by a live worker, on this host or another, are
+    left alone, so this is safe to run from any instance at any time.
+    """
+    failed = 0
+    for model in (ImportJob, ReportJob):
+        for job in model.query.filter(_interrupted(model)).all():
+            job.status = 'failed'
+            job.message = _interrupted_message(job.owner)
+            job.finished_at = datetime.utcnow()
+            failed += 1
+    db.session.commit()
+    return failed
+
+
+def check_interrupted(job):
+    """Mark one job failed if its owner stopped refreshing it, as a status request sees it"""
+    if job.status not in ('queued', 'running'):
+        return job
+    stale = type(job).query.filter(type(job).id == job.id, _interrupted(type(job)))\
+        .update({'status': 'failed', 'message': _interrupted_message(job.owner), 'finished_at': datetime.utcnow()},
+                synchronize_session=False)
+    if stale:
+        db.session.commit()
+        db.session.refresh(job)
+    return job
+
+
+@click.command('fail-interrupted-jobs')
+@with_appcontext
+def fail_interrupted_jobs_command():
+    """Mark import and report jobs whose worker stopped refreshing them as failed."""
+    click.echo(f'Marked {fail_interrupted_jobs()} interrupted jobs as failed')
@@ -0,0 +1,47 @@
+"""
+Heavy third-party modules, imported on first use
+
+pandas, NumPy and Plotly account for most of the time it takes to import
+the app, yet most requests (auth, CRUD, cached reports) never touch them.
+The names here are proxies that import the real module the first time an
+attribute is read, so a worker only pays for the ones it actually uses::
+
+    from app.lazy import pd
+
+    def parse(source):
+        return pd.read_csv(source)  # pandas is imported here, once per process
+
+Module-level code and evaluated annotations must not touch a proxy, or the
+import moves back to startup. ReportLab is imported inside the functions
+that render PDFs instead, since those need several of its submodules.
+"""
+import importlib
+
+
+class LazyModule:
+    """Stand-in for a module that imports it on first attribute access"""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        """The real module, imported now if it was not yet"""
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attribute):
+        # Only called for names not cached yet; keep each one so later reads are plain lookups
+        value = getattr(self._load(), attribute)
+        setattr(self, attribute, value)
+        return value
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f'<lazy module {self._name!r} ({state})>'
+
+
+np = LazyModule('numpy')
+pd = LazyModule('pandas')
+plotly_io = LazyModule('plotly.io')
@@ -1,7 +1,13 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import BigInteger, Float, cast, func, type_coerce
+from sqlalchemy.ext.hybrid import hybrid_property
 from datetime import datetime
+from decimal import Decimal, ROUND_HALF_UP
+import hashlib
+
+from app.periods import period_start
 
 db = SQLAlchemy()
 
@@ -12,6 +18,7 @@ class User(UserMixin, db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False, index=True)
     password_hash = db.Column(db.String(255), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    data_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # bumped on every write, keys cached payloads
     
     # Relationship with transactions
     transactions = db.relationship('Transaction', backref='user', lazy=True)
@@ -27,21 +34,73 @@ class User(UserMixin, db.Model):
     def __repr__(self):
         return f'<User {self.username}>'
 
+def normalize_description(description):
+    """Collapse whitespace and case so cosmetic differences don't defeat de-duplication"""
+    return ' '.join((description or '').split()).casefold()
+
+def to_paise(amount):
+    """Rupees (number or numeric string) as integer paise, rounding half away from zero"""
+    value = Decimal(str(amount))
+    if not value.is_finite():
+        raise ValueError(f'Invalid amount {amount!r}')
+    return int((value * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+def to_rupees(paise):
+    """Integer paise as a rupee float, for JSON, charts and display"""
+    return paise / 100
+
+def sum_paise(expression):
+    """SUM of a paise expression as an integer (PostgreSQL widens SUM(bigint) to numeric)"""
+    return cast(func.sum(expression), BigInteger)
+
+def transaction_fingerprint(user_id, date, amount, category, description):
+    """Stable hash identifying a transaction for duplicate detection on re-import"""
+    key = f'{user_id}|{date.isoformat()}|{amount:.2f}|{category.strip().casefold()}|{normalize_description(description)}'
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
 class Transaction(db.Model):
     """Transaction model for storing financial data"""
+    __table_args__ = (
+        db.Index('ix_transaction_user_fingerprint', 'user_id', 'fingerprint'),
+        # Every query is per user: listings and date ranges seek on (user_id, date, id),
+        # category breakdowns group along (user_id, category), top-N reads (user_id, amount_paise) from either end
+        db.Index('ix_transaction_user_date_id', 'user_id', 'date', 'id'),
+        db.Index('ix_transaction_user_category', 'user_id', 'category'),
+        db.Index('ix_transaction_user_amount', 'user_id', 'amount_paise'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
-    date = db.Column(db.Date, nullable=False, index=True)
-    category = db.Column(db.String(100), nullable=False, index=True)
-    amount = db.Column(db.Float, nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    category = db.Column(db.String(100), nullable=False)
+    amount_paise = db.Column(db.BigInteger, nullable=False)  # exact; rupees only via .amount
     description = db.Column(db.Text, nullable=True)
+    fingerprint = db.Column(db.String(40), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Foreign key to user
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     
+    @hybrid_property
+    def amount(self):
+        """Amount in ₹ (negative for expenses)"""
+        return to_rupees(self.amount_paise) if self.amount_paise is not None else None
+    
+    @amount.setter
+    def amount(self, value):
+        self.amount_paise = to_paise(value)
+    
+    @amount.expression
+    def amount(cls):
+        return type_coerce(cls.amount_paise / 100.0, Float)
+    
     def __repr__(self):
         return f'<Transaction {self.id}: {self.date} - {self.category} - ₹{self.amount}>'
     
+    def refresh_fingerprint(self):
+        """Recompute the duplicate-detection fingerprint after a change"""
+        self.fingerprint = transaction_fingerprint(self.user_id, self.date, self.amount,
+                                                   self.category, self.description)
+    
     def to_dict(self):
         """Convert transaction to dictionary for JSON serialization"""
         return {
@@ -52,3 +111,134 @@ class Transaction(db.Model):
             'description': self.description,
             'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S') if self.created_at else None
         }
+
+# Monthly grouping walks this index in (user, month) order instead of sorting rows
+db.Index('ix_transaction_user_month', Transaction.user_id, period_start('month', Transaction.date))
+
+class TransactionRollup(db.Model):
+    """Per-user monthly totals by category, kept in step with every transaction write"""
+    __tablename__ = 'transaction_rollup'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    month = db.Column(db.String(7), primary_key=True)  # YYYY-MM
+    category = db.Column(db.String(100), primary_key=True)
+    total_paise = db.Column(db.BigInteger, nullable=False, default=0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    income_paise = db.Column(db.BigInteger, nullable=False, default=0)
+    expenses_paise = db.Column(db.BigInteger, nullable=False, default=0)  # positive
+    
+    def __repr__(self):
+        return f'<TransactionRollup {self.user_id} {self.month} {self.category}: ₹{to_rupees(self.total_paise)}>'
+
+class DailyRollup(db.Model):
+    """Per-user daily totals by category, the cube time series are bucketed from"""
+    __tablename__ = 'transaction_daily'
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    category = db.Column(db.String(100), primary_key=True)
+    total_paise = db.Column(db.BigInteger, nullable=False, default=0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    income_paise = db.Column(db.BigInteger, nullable=False, default=0)
+    expenses_paise = db.Column(db.BigInteger, nullable=False, default=0)  # positive
+    
+    def __repr__(self):
+        return f'<DailyRollup {self.user_id} {self.day} {self.category}: ₹{to_rupees(self.total_paise)}>'
+
+class ImportJob(db.Model):
+    """Background CSV import job and its progress counters"""
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    filename = db.Column(db.String(255), nullable=True)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, finished, failed
+    rows_processed = db.Column(db.Integer, nullable=False, default=0)
+    transactions_created = db.Column(db.Integer, nullable=False, default=0)
+    transactions_skipped = db.Column(db.Integer, nullable=False, default=0)
+    rows_failed = db.Column(db.Integer, nullable=False, default=0)
+    chunks_committed = db.Column(db.Integer, nullable=False, default=0)
+    errors = db.Column(db.JSON, nullable=True)
+    message = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    owner = db.Column(db.String(255), nullable=True)  # host:pid of the worker process that queued the job
+    heartbeat_at = db.Column(db.DateTime, nullable=True, default=datetime.utcnow)  # Refreshed while the owner runs it
+    
+    __table_args__ = (
+        # Unfinished jobs whose owner stopped refreshing them (see jobs.fail_interrupted_jobs)
+        db.Index('ix_import_job_status_heartbeat', 'status', 'heartbeat_at'),
+    )
+    
+    def __repr__(self):
+        return f'<ImportJob {self.id}: {self.status}>'
+    
+    def to_dict(self):
+        """Convert job to dictionary for JSON serialization"""
+        rows_per_second = 0
+        if self.started_at:
+            elapsed = ((self.finished_at or datetime.utcnow()) - self.started_at).total_seconds()
+            if elapsed > 0:
+                rows_per_second = round(self.rows_processed / elapsed, 1)
+        
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'filename': self.filename,
+            'rows_processed': self.rows_processed,
+            'transactions_created': self.transactions_created,
+            'transactions_skipped': self.transactions_skipped,
+            'rows_failed': self.rows_failed,
+            'chunks_committed': self.chunks_committed,
+            'rows_per_second': rows_per_second,
+            'errors': self.errors or [],
+            'message': self.message,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+class ReportJob(db.Model):
+    """Background PDF report rendering job and the file it produced"""
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    layout = db.Column(db.String(20), nullable=False)  # full, brief or summary (see app.pdfs)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, finished, failed, expired
+    filename = db.Column(db.String(255), nullable=True)  # Download name
+    path = db.Column(db.String(500), nullable=True)  # Rendered PDF on the server
+    table_rows = db.Column(db.Integer, nullable=False, default=0)
+    size_bytes = db.Column(db.Integer, nullable=True)
+    message = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=True, index=True)
+    owner = db.Column(db.String(255), nullable=True)  # host:pid of the worker process that queued the job
+    heartbeat_at = db.Column(db.DateTime, nullable=True, default=datetime.utcnow)  # Refreshed while the owner runs it
+    
+    __table_args__ = (
+        db.Index('ix_report_job_status_heartbeat', 'status', 'heartbeat_at'),
+    )
+    
+    def __repr__(self):
+        return f'<ReportJob {self.id}: {self.status}>'
+    
+    @property
+    def expired(self):
+        """Whether the rendered file is past its expiry (or already removed)"""
+        return self.status == 'expired' or (self.expires_at is not None and self.expires_at <= datetime.utcnow())
+    
+    def to_dict(self):
+        """Convert job to dictionary for JSON serialization"""
+        return {
+            'job_id': self.id,
+            'status': 'expired' if self.status == 'finished' and self.expired else self.status,
+            'layout': self.layout,
+            'filename': self.filename,
+            'table_rows': self.table_rows,
+            'size_bytes': self.size_bytes,
+            'message': self.message,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None
+        }
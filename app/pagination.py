@@ -0,0 +1,62 @@
+"""
+Keyset (cursor) pagination for transaction listings
+
+Pages are ordered newest first by (date, id). A cursor encodes the sort key
+of the last row on a page, so the next page is a range seek on that key
+instead of an OFFSET that makes the database walk every earlier row.
+"""
+import base64
+import json
+from datetime import date
+
+from sqlalchemy import tuple_
+
+from app.models import Transaction
+
+
+def encode_cursor(transaction):
+    """Opaque cursor pointing just past the given transaction"""
+    raw = json.dumps([transaction.date.isoformat(), transaction.id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return the (date, id) a cursor points past, raising ValueError if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        day, transaction_id = json.loads(raw)
+        return date.fromisoformat(day), int(transaction_id)
+    except (TypeError, ValueError):
+        raise ValueError('Invalid cursor')
+
+
+def order_newest_first(query):
+    """Apply the (date desc, id desc) order both pagination styles share"""
+    return query.order_by(Transaction.date.desc(), Transaction.id.desc())
+
+
+def after_cursor(query, cursor):
+    """Restrict an ordered query to the rows that come after ``cursor``"""
+    after_date, after_id = decode_cursor(cursor)
+    return query.filter(tuple_(Transaction.date, Transaction.id) < (after_date, after_id))
+
+
+def paginate(query, limit, cursor=None, offset=0):
+    """Fetch one page newest first, returning (rows, next_cursor).
+
+    With a ``cursor`` the page starts right after it; otherwise ``offset``
+    rows are skipped, as older clients expect. ``next_cursor`` is None on
+    the last page.
+    """
+    query = order_newest_first(query)
+    if cursor:
+        query = after_cursor(query, cursor)
+    elif offset:
+        query = query.offset(offset)
+
+    # One extra row tells us whether there is another page without a COUNT
+    rows = query.limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1])
+    return rows, None
@@ -0,0 +1,233 @@
+"""
+PDF financial reports, split into gathering and rendering
+
+``report_data`` runs the queries a report needs (rollup-backed totals, the
+category breakdown and a bounded page of transactions) and returns plain
+values. ``render`` turns those into PDF bytes with ReportLab and touches
+neither Flask nor the database, so a large report can be laid out on the
+process pool while the request worker moves on (see
+jobs.start_report_job). Small reports are rendered inline.
+
+Layouts:
+
+- ``full``: summary, category breakdown and the latest transactions (web download)
+- ``brief``: summary only (email attachment)
+- ``summary``: summary and optionally the latest transactions (API)
+"""
+from datetime import datetime
+from io import BytesIO
+
+from app import aggregates
+from app.models import db, Transaction, to_rupees
+
+LAYOUTS = ('full', 'brief', 'summary')
+
+# Transactions listed by default in each layout
+DETAIL_ROWS = {'full': 50, 'brief': 0, 'summary': 0}
+
+# Long transaction listings are split into tables of this many rows, so
+# ReportLab re-flows one small table per page break instead of the whole list
+DETAIL_TABLE_ROWS = 200
+
+DESCRIPTION_CHARS = 30
+
+
+def report_data(user, layout, start_date=None, end_date=None, detail_rows=None):
+    """Everything a layout draws, as plain picklable values (amounts in paise)"""
+    if layout not in LAYOUTS:
+        raise ValueError(f'Unknown layout {layout!r}; expected one of {", ".join(LAYOUTS)}')
+    if detail_rows is None:
+        detail_rows = DETAIL_ROWS[layout]
+
+    summary = aggregates.totals(user.id, start_date, end_date)
+    data = {
+        'username': user.username,
+        'generated_at': datetime.now(),
+        'income': summary['total_income'],
+        'expenses': summary['total_expenses'],
+        'count': summary['transaction_count'],
+        'categories': [],
+        'transactions': [],
+        'more': 0
+    }
+    if not data['count']:
+        return data
+
+    if layout == 'full':
+        data['categories'] = sorted(
+            (row['category'], row['total'], row['count'])
+            for row in aggregates.category_totals(user.id, start_date, end_date)
+        )
+
+    if detail_rows:
+        query = db.session.query(Transaction.date, Transaction.category, Transaction.amount_paise,
+                                 Transaction.description)\
+            .filter(Transaction.user_id == user.id)
+        if start_date:
+            query = query.filter(Transaction.date >= start_date)
+        if end_date:
+            query = query.filter(Transaction.date <= end_date)
+        data['transactions'] = [tuple(row) for row in query.order_by(Transaction.date.desc(), Transaction.id.desc())
+                                .limit(detail_rows).all()]
+        data['more'] = data['count'] - len(data['transactions'])
+    return data
+
+
+def table_rows(data):
+    """Category and transaction rows a report lays out, the measure of how long it takes to render"""
+    return len(data['categories']) + len(data['transactions'])
+
+
+def filename(data):
+    """Download name of a rendered report"""
+    return f'financial_report_{data["username"]}_{data["generated_at"].strftime("%Y%m%d")}.pdf'
+
+
+def _rupees(paise):
+    return f'₹{to_rupees(paise):,.2f}'
+
+
+def _short(description):
+    description = description or ''
+    return description[:DESCRIPTION_CHARS] + '...' if len(description) > DESCRIPTION_CHARS else description
+
+
+def _header_style(colors, font_size, align='CENTER'):
+    """Grey header row over beige cells, as every report table is drawn"""
+    return [
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), align),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), font_size),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]
+
+
+def _summary_rows(data):
+    return [
+        ['Total Income', _rupees(data['income'])],
+        ['Total Expenses', _rupees(data['expenses'])],
+        ['Net Balance', _rupees(data['income'] - data['expenses'])],
+        ['Total Transactions', str(data['count'])]
+    ]
+
+
+def _transaction_tables(data):
+    """The transaction listing, in tables of DETAIL_TABLE_ROWS rows that each repeat the header"""
+    from reportlab.lib import colors
+    from reportlab.lib.units import inch
+    from reportlab.platypus import Table, TableStyle
+
+    style = TableStyle(_header_style(colors, 9, 'LEFT') + [
+        ('ALIGN', (2, 0), (2, -1), 'RIGHT'),  # Right align amounts
+        ('FONTSIZE', (0, 1), (-1, -1), 8)
+    ])
+    rows = [[day.strftime('%Y-%m-%d'), category, _rupees(paise), _short(description)]
+            for day, category, paise, description in data['transactions']]
+    if data['more'] > 0:
+        rows.append(['...', f'({data["more"]} more transactions)', '', ''])
+
+    tables = []
+    for start in range(0, max(len(rows), 1), DETAIL_TABLE_ROWS):
+        table = Table([['Date', 'Category', 'Amount', 'Description']] + rows[start:start + DETAIL_TABLE_ROWS],
+                      colWidths=[1.2*inch, 1.5*inch, 1.3*inch, 2.5*inch], repeatRows=1)
+        table.setStyle(style)
+        tables.append(table)
+    return tables
+
+
+def _full_elements(data, styles):
+    from reportlab.lib import colors
+    from reportlab.lib.styles import ParagraphStyle
+    from reportlab.lib.units import inch
+    from reportlab.platypus import PageBreak, Paragraph, Spacer, Table, TableStyle
+
+    title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=24, spaceAfter=30,
+                                 alignment=1, textColor=colors.darkblue)
+    section_style = ParagraphStyle('SummaryHeader', parent=styles['Heading2'], fontSize=16, spaceAfter=12,
+                                   textColor=colors.darkgreen)
+
+    elements = [
+        Paragraph(f"Financial Report for {data['username']}", title_style),
+        Paragraph(f"Generated on: {data['generated_at'].strftime('%B %d, %Y')}", styles['Normal']),
+        Spacer(1, 20),
+        Paragraph("Financial Summary", section_style)
+    ]
+
+    summary_table = Table([['Metric', 'Amount']] + _summary_rows(data), colWidths=[3*inch, 2*inch])
+    summary_table.setStyle(TableStyle(_header_style(colors, 12)))
+    elements += [summary_table, Spacer(1, 20)]
+
+    if data['categories']:
+        category_table = Table(
+            [['Category', 'Total Amount', 'Transaction Count']]
+            + [[category, _rupees(total), str(count)] for category, total, count in data['categories']],
+            colWidths=[2*inch, 2*inch, 1.5*inch], repeatRows=1
+        )
+        category_table.setStyle(TableStyle(_header_style(colors, 10)))
+        elements += [Paragraph("Category Breakdown", section_style), category_table, PageBreak()]
+
+    elements.append(Paragraph("Transaction Details", section_style))
+    return elements + _transaction_tables(data)
+
+
+def _brief_elements(data, styles):
+    from reportlab.lib import colors
+    from reportlab.lib.units import inch
+    from reportlab.platypus import Paragraph, Spacer, Table, TableStyle
+
+    summary_table = Table(_summary_rows(data), colWidths=[3*inch, 2*inch])
+    summary_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, -1), colors.lightgrey),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]))
+    return [Paragraph(f"Financial Report for {data['username']}", styles['Title']), Spacer(1, 20), summary_table]
+
+
+def _summary_elements(data, styles):
+    from reportlab.lib import colors
+    from reportlab.lib.styles import ParagraphStyle
+    from reportlab.lib.units import inch
+    from reportlab.platypus import Paragraph, Spacer, Table, TableStyle
+
+    title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=24, spaceAfter=30, alignment=1)
+    elements = [
+        Paragraph("Personal Finance Report", title_style),
+        Paragraph(f"Generated for: {data['username']}", styles['Normal']),
+        Paragraph(f"Date: {data['generated_at'].strftime('%Y-%m-%d %H:%M:%S')}", styles['Normal']),
+        Spacer(1, 20)
+    ]
+
+    if not data['count']:
+        elements.append(Paragraph("No transactions found.", styles['Normal']))
+        return elements
+
+    summary_table = Table([['Metric', 'Amount']] + _summary_rows(data), colWidths=[2*inch, 2*inch])
+    summary_table.setStyle(TableStyle(_header_style(colors, 14)))
+    elements += [Paragraph("Financial Summary", styles['Heading2']), summary_table, Spacer(1, 20)]
+
+    if data['transactions']:
+        elements.append(Paragraph("Transaction Details", styles['Heading2']))
+        elements += _transaction_tables(data)
+    return elements
+
+
+_BUILDERS = {'full': _full_elements, 'brief': _brief_elements, 'summary': _summary_elements}
+
+
+def render(layout, data):
+    """PDF bytes of a report gathered by report_data"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate
+
+    buffer = BytesIO()
+    if layout == 'full':
+        doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18)
+    else:
+        doc = SimpleDocTemplate(buffer, pagesize=A4)
+    doc.build(_BUILDERS[layout](data, getSampleStyleSheet()))
+    return buffer.getvalue()
@@ -0,0 +1,97 @@
+"""
+Dialect-aware date bucketing for aggregate queries
+
+``period_start(unit, column)`` is the first day of the day, week (ISO,
+starting Monday), month, quarter or year containing a date, as a DATE on
+PostgreSQL and an ISO date string on SQLite. It compiles to deterministic
+built-ins on each database, so it can be indexed: the
+(user_id, period_start('month', date)) expression index lets monthly
+grouping walk the index in order instead of sorting every row.
+"""
+from datetime import date, timedelta
+
+from sqlalchemy import Date, Integer
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from sqlalchemy.sql.visitors import InternalTraversal
+
+UNITS = ('day', 'week', 'month', 'quarter', 'year')
+
+
+class period_start(FunctionElement):
+    """First day of the ``unit`` containing a date column"""
+    name = 'period_start'
+    type = Date()
+    inherit_cache = True
+    # The unit changes the SQL, so it must be part of the statement cache key
+    _traverse_internals = FunctionElement._traverse_internals + [('unit', InternalTraversal.dp_string)]
+
+    def __init__(self, unit, column):
+        if unit not in UNITS:
+            raise ValueError(f'Unknown period {unit!r}; expected one of {", ".join(UNITS)}')
+        self.unit = unit
+        super().__init__(column)
+
+
+# SQLite date() modifiers; weeks and quarters step back from the weekday / month number
+_SQLITE_MODIFIERS = {
+    'day': "",
+    'week': ", '-' || ((CAST(strftime('%w', {0}) AS INTEGER) + 6) % 7) || ' days'",
+    'month': ", 'start of month'",
+    'quarter': ", 'start of month', '-' || ((CAST(strftime('%m', {0}) AS INTEGER) - 1) % 3) || ' months'",
+    'year': ", 'start of year'",
+}
+
+
+@compiles(period_start, 'sqlite')
+def _period_start_sqlite(element, compiler, **kw):
+    column = compiler.process(list(element.clauses)[0], **kw)
+    return f'date({column}{_SQLITE_MODIFIERS[element.unit].format(column)})'
+
+
+@compiles(period_start)
+def _period_start_default(element, compiler, **kw):
+    # date_trunc on a plain TIMESTAMP is immutable, so PostgreSQL can index it
+    column = compiler.process(list(element.clauses)[0], **kw)
+    return f"CAST(date_trunc('{element.unit}', CAST({column} AS TIMESTAMP)) AS DATE)"
+
+
+class epoch_days(FunctionElement):
+    """Whole days from 1970-01-01 to a date column"""
+    name = 'epoch_days'
+    type = Integer()
+    inherit_cache = True
+
+
+@compiles(epoch_days, 'sqlite')
+def _epoch_days_sqlite(element, compiler, **kw):
+    return f'CAST(julianday({compiler.process(element.clauses, **kw)}) - 2440587.5 AS INTEGER)'
+
+
+@compiles(epoch_days)
+def _epoch_days_default(element, compiler, **kw):
+    return f"({compiler.process(element.clauses, **kw)} - DATE '1970-01-01')"
+
+
+def python_period_start(unit, day):
+    """Python counterpart of period_start for a datetime.date"""
+    if unit == 'day':
+        return day
+    if unit == 'week':
+        return day - timedelta(days=day.weekday())
+    if unit == 'month':
+        return day.replace(day=1)
+    if unit == 'quarter':
+        return date(day.year, day.month - (day.month - 1) % 3, 1)
+    if unit == 'year':
+        return date(day.year, 1, 1)
+    raise ValueError(f'Unknown period {unit!r}; expected one of {", ".join(UNITS)}')
+
+
+def python_period_end(unit, day):
+    """Last day of the ``unit`` containing a datetime.date"""
+    start = python_period_start(unit, day)
+    if unit in ('day', 'week'):
+        return start + timedelta(days=0 if unit == 'day' else 6)
+    following = start.year * 12 + start.month - 1 + {'month': 1, 'quarter': 3, 'year': 12}[unit]
+    return date(following // 12, following % 12 + 1, 1) - timedelta(days=1)
@@ -0,0 +1,181 @@
+"""
+Per-user monthly and daily rollups of transactions by category
+
+One TransactionRollup row per (user_id, month, category), and one
+DailyRollup row per (user_id, day, category), holds the net total, count,
+income and expenses of those transactions, in integer paise. Writes keep
+both current inside the same database transaction, and every write is a
+signed delta applied with a single upsert per batch and level: inserts add
+their amounts, deletes subtract them and updates do both. Concurrent writers
+therefore only ever add to a row under its row lock, so none can overwrite
+another's increment, and rows whose count drops to zero are removed.
+Summary reads then scale with the number of months and categories, and
+time series with the number of days and categories, not transactions.
+"""
+from collections import namedtuple
+
+import click
+from flask.cli import AppGroup
+from sqlalchemy import case, delete, func, insert, update
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import cache
+from app.models import db, DailyRollup, Transaction, TransactionRollup, sum_paise
+from app.periods import period_start
+
+# Summed rollup columns, all but count in paise
+MEASURES = ('total_paise', 'count', 'income_paise', 'expenses_paise')
+
+# Rollup rows written per INSERT when rebuilding
+REBUILD_BATCH_SIZE = 5000
+
+rollups_cli = AppGroup('rollups', help='Maintain the monthly and daily transaction rollups.')
+
+
+def month_of(day):
+    """Rollup month key ('YYYY-MM') of a date"""
+    return f'{day.year:04d}-{day.month:02d}'
+
+
+# A rollup table: its model, its period column and the period key of a date
+Level = namedtuple('Level', 'model period key_of')
+
+LEVELS = (
+    Level(TransactionRollup, 'month', month_of),
+    Level(DailyRollup, 'day', lambda day: day),
+)
+
+
+def _group_values(level, user_id, added=(), removed=()):
+    """Net change of one level's values per (period, category) when (date, category, amount_paise)
+    rows are added and removed; groups that do not change are left out"""
+    groups = {}
+    for rows, sign in ((added, 1), (removed, -1)):
+        for day, category, paise in rows:
+            key = (level.key_of(day), category)
+            values = groups.get(key)
+            if values is None:
+                values = groups[key] = {'user_id': user_id, level.period: key[0], 'category': category,
+                                        'total_paise': 0, 'count': 0, 'income_paise': 0, 'expenses_paise': 0}
+            values['total_paise'] += sign * paise
+            values['count'] += sign
+            if paise > 0:
+                values['income_paise'] += sign * paise
+            elif paise < 0:
+                values['expenses_paise'] -= sign * paise
+    return [values for values in groups.values() if any(values[column] for column in MEASURES)]
+
+
+def _upsert_added(level, values):
+    """Add signed group values onto existing rollup rows of a level, creating missing ones"""
+    table = level.model.__table__
+    connection = db.session.connection()
+    dialect = connection.dialect.name
+
+    if dialect in ('sqlite', 'postgresql'):
+        statement = (sqlite.insert if dialect == 'sqlite' else postgresql.insert)(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c[level.period], table.c.category],
+            set_={column: table.c[column] + statement.excluded[column] for column in MEASURES}
+        )
+        connection.execute(statement, values)
+        return
+
+    # Databases without ON CONFLICT: update what exists, insert the rest
+    for row in values:
+        key = (table.c.user_id == row['user_id']) & (table.c[level.period] == row[level.period]) & \
+              (table.c.category == row['category'])
+        updated = connection.execute(update(table).where(key).values(
+            **{column: table.c[column] + row[column] for column in MEASURES}
+        ))
+        if not updated.rowcount:
+            connection.execute(insert(table), [row])
+
+
+def _delete_emptied(level, values):
+    """Remove the rows of groups that lost transactions once nothing is left in them"""
+    table = level.model.__table__
+    for row in values:
+        if row['count'] < 0:
+            db.session.execute(delete(table).where(
+                table.c.user_id == row['user_id'], table.c[level.period] == row[level.period],
+                table.c.category == row['category'], table.c.count <= 0
+            ))
+
+
+def apply_rows(user_id, added=(), removed=()):
+    """Fold inserted (date, category, amount_paise) rows into every rollup and take removed ones out"""
+    added, removed = list(added), list(removed)
+    for level in LEVELS:
+        values = _group_values(level, user_id, added, removed)
+        if values:
+            _upsert_added(level, values)
+            _delete_emptied(level, values)
+
+
+def add_rows(user_id, rows):
+    """Fold newly inserted (date, category, amount_paise) rows into every rollup"""
+    apply_rows(user_id, added=rows)
+
+
+def add_transaction(transaction):
+    """Fold one new ORM transaction into the rollups"""
+    add_rows(transaction.user_id, [row_of(transaction)])
+
+
+def row_of(transaction):
+    """The (date, category, amount_paise) a transaction currently contributes to the rollups"""
+    return transaction.date, transaction.category, transaction.amount_paise
+
+
+def _sums():
+    """Integer SUMs of the transactions matching each rollup measure, in MEASURES order"""
+    paise = Transaction.amount_paise
+    return (
+        sum_paise(paise),
+        func.count(Transaction.id),
+        sum_paise(case((paise > 0, paise), else_=0)),
+        sum_paise(case((paise < 0, -paise), else_=0))
+    )
+
+
+def rebuild(user_id=None):
+    """Recompute the rollups from scratch for one user, or for everyone. The caller commits."""
+    written = 0
+    for level in LEVELS:
+        table = level.model.__table__
+        bucket = period_start(level.period, Transaction.date)
+
+        statement = delete(table)
+        query = db.session.query(Transaction.user_id, bucket, Transaction.category, *_sums())
+        if user_id is not None:
+            statement = statement.where(table.c.user_id == user_id)
+            query = query.filter(Transaction.user_id == user_id)
+        db.session.execute(statement)
+
+        rows = query.group_by(Transaction.user_id, bucket, Transaction.category).all()
+        batch = []
+        for owner, first_day, category, total, count, income, expenses in rows:
+            batch.append({'user_id': owner, level.period: level.key_of(first_day), 'category': category,
+                          'total_paise': total, 'count': count, 'income_paise': income or 0,
+                          'expenses_paise': expenses or 0})
+            if len(batch) == REBUILD_BATCH_SIZE:
+                db.session.execute(insert(table), batch)
+                written += len(batch)
+                batch = []
+        if batch:
+            db.session.execute(insert(table), batch)
+            written += len(batch)
+
+    # Payloads cached from a drifted rollup must not outlive it
+    cache.bump_version(user_id)
+    return written
+
+
+@rollups_cli.command('rebuild')
+@click.option('--user-id', type=int, default=None, help='Only rebuild this user (default: everyone).')
+def rebuild_command(user_id):
+    """Backfill or repair the rollups from the transactions table."""
+    written = rebuild(user_id)
+    db.session.commit()
+    click.echo(f'Rebuilt {written} rollup rows')
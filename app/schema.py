@@ -0,0 +1,80 @@
+"""
+One-off schema setup, kept out of the application factory
+
+Workers no longer create tables when they boot. ``flask init-db`` prepares
+a database once per deploy instead. A database already under migrations is
+upgraded. One without migration history gets its tables from the models
+and is stamped with the latest migration when it is empty, or already
+matches the models (create_all made it); anything older is upgraded.
+
+With AUTO_CREATE_SCHEMA on, as it is for development and tests, the
+factory builds the schema too, but only on a database without any tables.
+Anything else is left to the migrations: adding the newest tables next to
+older ones would give them shapes the pending migrations do not expect.
+"""
+import os
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import inspect
+
+from app.models import db
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'migrations')
+
+
+def ensure_upload_folder(app):
+    """Create the folder uploads are spooled to, if it is missing"""
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+
+
+def matches_models(inspector):
+    """Whether every model table exists with at least the model's columns"""
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            return False
+        present = {column['name'] for column in inspector.get_columns(table.name)}
+        if not set(table.columns.keys()) <= present:
+            return False
+    return True
+
+
+def create_if_empty():
+    """Create the tables of a database that has none and stamp it with the latest migration"""
+    from alembic.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    if inspect(db.engine).get_table_names():
+        return False
+
+    db.create_all()
+    # Stamped so a later `flask db upgrade` has nothing to replay
+    if os.path.isdir(MIGRATIONS_DIR):
+        with db.engine.begin() as connection:
+            MigrationContext.configure(connection).stamp(ScriptDirectory(MIGRATIONS_DIR), 'head')
+    return True
+
+
+def init_schema():
+    """Create or migrate the schema of the app's database; returns what was done"""
+    from flask_migrate import stamp, upgrade
+
+    ensure_upload_folder(current_app)
+    inspector = inspect(db.engine)
+    tables = inspector.get_table_names()
+    if 'alembic_version' in tables or (tables and not matches_models(inspector)):
+        upgrade()
+        return 'upgraded'
+
+    # Faster than replaying every migration, and yields the same schema
+    db.create_all()
+    stamp()
+    return 'created'
+
+
+@click.command('init-db')
+@with_appcontext
+def init_db_command():
+    """Create the tables of an empty database, or apply pending migrations."""
+    click.echo(f'Database schema {init_schema()}')
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark: balance as of a date, summing history vs rollup checkpoints
+
+'sum' adds up every earlier transaction of the user, what answering
+"balance on date X" used to take. 'as-of' is balances.balance_as_of: the
+rollup rows of earlier months plus at most a month of daily rollup rows,
+which should stay flat as rows grow. 'series' is a year of daily running
+balance points. Each is timed for a date near the end of the history.
+
+Usage: python benchmarks/bench_balance.py [rows ...]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import func
+
+from app import balances, create_app, importer
+from app.config import config, Config
+from app.models import db, DailyRollup, Transaction, TransactionRollup, User
+from bench_import import make_frame
+
+REPEATS = 5
+
+# Late in the generated history and in the middle of a month
+AS_OF = date(2023, 11, 17)
+SERIES_START = date(2022, 11, 18)
+
+
+def summed(user_id):
+    """The old way: SUM over every transaction up to the date"""
+    return db.session.query(func.sum(Transaction.amount_paise)).filter(
+        Transaction.user_id == user_id, Transaction.date <= AS_OF
+    ).scalar() or 0
+
+
+def best_ms(run):
+    best, result = float('inf'), None
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        result = run()
+        best = min(best, (time.perf_counter() - started) * 1000)
+    return best, result
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 500_000]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f'sqlite:///{os.path.join(tmp, "bench.db")}'
+        config['benchmark'] = type('BenchmarkConfig', (Config,), {'SQLALCHEMY_DATABASE_URI': url})
+        app = create_app('benchmark')
+
+        with app.app_context():
+            user = User(username='bench', email='bench@example.com')
+            user.set_password('bench-password')
+            db.session.add(user)
+            db.session.commit()
+            user_id = user.id
+
+            print(f'{"rows":>10} {"sum ms":>10} {"as-of ms":>10} {"speedup":>8} {"series ms":>10} {"points":>7}')
+            for size in sizes:
+                db.session.query(Transaction).delete()
+                db.session.query(TransactionRollup).delete()
+                db.session.query(DailyRollup).delete()
+                importer.import_dataframe(make_frame(size), user_id, skip_duplicates=False)
+                db.session.commit()
+
+                full, expected = best_ms(lambda: summed(user_id))
+                as_of, result = best_ms(lambda: balances.balance_as_of(user_id, AS_OF))
+                assert result == expected, (result, expected)
+                series, points = best_ms(lambda: balances.balance_series(user_id, SERIES_START, AS_OF))
+                assert points[-1][1] == expected
+                print(f'{size:>10,} {full:>10.1f} {as_of:>10.2f} {full / as_of:>7.0f}x {series:>10.1f} {len(points):>7}')
+
+
+if __name__ == '__main__':
+    main()
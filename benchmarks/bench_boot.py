@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark: gunicorn boot, time to first request and memory per worker
+
+'per-worker' is how the app used to start: every worker imports the app
+and checks the schema on its own (AUTO_CREATE_SCHEMA=true, no preload).
+'preload' is gunicorn.conf.py as shipped: the schema comes from
+`flask init-db`, the master imports the app once and forks the workers.
+For each mode gunicorn is started on a free port against a temporary
+SQLite database, and the script reports the time until the first
+request succeeds and, once every worker has served requests, the RSS of
+each worker next to its unique (private) memory. With preload most of a
+worker's RSS is pages shared with the master.
+
+Needs Linux (/proc) and gunicorn. Usage: python benchmarks/bench_boot.py [workers]
+"""
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = {
+    'per-worker': {'GUNICORN_PRELOAD': 'false', 'AUTO_CREATE_SCHEMA': 'true'},
+    'preload': {'GUNICORN_PRELOAD': 'true', 'AUTO_CREATE_SCHEMA': 'false'},
+}
+
+# Requests sent after boot so every worker has handled some before memory is read
+WARM_REQUESTS = 200
+BOOT_TIMEOUT = 60
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def memory_kb(pid):
+    """(RSS, unique set size) of a process in kB, from /proc/<pid>/smaps_rollup"""
+    fields = {}
+    with open(f'/proc/{pid}/smaps_rollup') as rollup:
+        for line in rollup:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                fields[parts[0].rstrip(':')] = int(parts[1])
+    return fields['Rss'], fields['Private_Clean'] + fields['Private_Dirty']
+
+
+def children(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as listing:
+        return [int(child) for child in listing.read().split()]
+
+
+def fetch(url):
+    with urllib.request.urlopen(url, timeout=5) as response:
+        return response.status
+
+
+def boot(mode, workers, env):
+    port = free_port()
+    url = f'http://127.0.0.1:{port}/'
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}', '--workers', str(workers), 'run:app'],
+        cwd=ROOT, env={**env, **MODES[mode]}, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        while True:
+            try:
+                fetch(url)
+                break
+            except OSError:
+                if server.poll() is not None or time.perf_counter() - started > BOOT_TIMEOUT:
+                    raise RuntimeError(f'{mode}: gunicorn did not come up')
+                time.sleep(0.02)
+        first_request = (time.perf_counter() - started) * 1000
+
+        # Wait for every worker, then let them all serve
+        while len(children(server.pid)) < workers:
+            time.sleep(0.05)
+        time.sleep(1)
+        for _ in range(WARM_REQUESTS):
+            fetch(url)
+
+        master = memory_kb(server.pid)
+        per_worker = [memory_kb(pid) for pid in children(server.pid)]
+        return first_request, master, per_worker
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**os.environ, 'FLASK_APP': 'run.py', 'FLASK_ENV': 'production',
+               'DATABASE_URL': f'sqlite:///{os.path.join(tmp, "bench.db")}', 'JOB_WORKERS': '0'}
+        subprocess.run([sys.executable, '-m', 'flask', 'init-db'], cwd=ROOT, env=env, check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        print(f'{"mode":>10} {"first request ms":>17} {"process":>9} {"RSS MB":>7} {"unique MB":>10}')
+        for mode in MODES:
+            first_request, master, per_worker = boot(mode, workers, env)
+            rows = [('master', master)] + [(f'worker {n}', usage) for n, usage in enumerate(per_worker, 1)]
+            for index, (process, (rss, unique)) in enumerate(rows):
+                shown = f'{mode:>10} {first_request:>17.0f}' if index == 0 else ' ' * 28
+                print(f'{shown} {process:>9} {rss / 1024:>7.1f} {unique / 1024:>10.1f}')
+            total = sum(unique for _, (_, unique) in rows) / 1024
+            print(f'{"":>28} {"total":>9} {"":>7} {total:>10.1f}')
+
+if __name__ == '__main__':
+    main()
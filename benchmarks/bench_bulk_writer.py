@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark: transaction ingestion through the ORM, executemany and COPY
+
+Runs against a file-backed SQLite database, and also against PostgreSQL
+when BENCH_POSTGRES_URL points at one (its transaction table is emptied).
+
+Usage: python benchmarks/bench_bulk_writer.py [rows ...]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import bulk, create_app
+from app.config import config, Config
+from app.importer import BATCH_SIZE, frame_to_rows, prepare_frame
+from app.models import db, Transaction, User
+from bench_import import make_frame
+
+
+def orm_write(rows):
+    for row in rows:
+        db.session.add(Transaction(**row))
+    db.session.commit()
+
+
+def batched_write(method):
+    def write(rows):
+        for start in range(0, len(rows), BATCH_SIZE):
+            bulk.insert_rows(Transaction.__table__, rows[start:start + BATCH_SIZE], method=method)
+        db.session.commit()
+    return write
+
+
+def bench(label, database_url, sizes):
+    config['benchmark'] = type('BenchmarkConfig', (Config,), {'SQLALCHEMY_DATABASE_URI': database_url})
+    app = create_app('benchmark')
+
+    with app.app_context():
+        methods = [('orm', orm_write), ('executemany', batched_write('executemany'))]
+        if bulk.copy_supported(db.session.connection()):
+            methods.append(('copy', batched_write('copy')))
+
+        user = User.query.filter_by(username='bench').first()
+        if not user:
+            user = User(username='bench', email='bench@example.com')
+            user.set_password('bench-password')
+            db.session.add(user)
+            db.session.commit()
+
+        print(label)
+        for size in sizes:
+            frame, _ = prepare_frame(make_frame(size))
+            rows = frame_to_rows(frame, user.id)
+            for name, write in methods:
+                # The ORM path needs minutes per million rows; skip it there
+                if name == 'orm' and size > 100_000:
+                    print(f'  {size:>9,} {name:<12} {"skipped":>9}')
+                    continue
+                db.session.query(Transaction).delete()
+                db.session.commit()
+                started = time.perf_counter()
+                write(rows)
+                elapsed = time.perf_counter() - started
+                print(f'  {size:>9,} {name:<12} {elapsed:8.2f}s {size / elapsed:12,.0f} rows/sec')
+        db.session.query(Transaction).delete()
+        db.session.commit()
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bench('sqlite', f'sqlite:///{os.path.join(tmp, "bench.db")}', sizes)
+
+    postgres_url = os.environ.get('BENCH_POSTGRES_URL')
+    if postgres_url:
+        bench('postgresql', postgres_url, sizes)
+    else:
+        print('postgresql: skipped (set BENCH_POSTGRES_URL to include it)')
+
+
+if __name__ == '__main__':
+    main()
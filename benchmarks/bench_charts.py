@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-request cost of the dashboard and /reports/charts chart payloads
+
+'figure' is how both were built before: go.Figure objects (validated on
+construction), serialized with PlotlyJSONEncoder and, for the API,
+decoded again so the response could re-encode them. 'spec' is the
+current chart_payload / dashboard_analytics: app.charts dicts encoded
+once with the payload. Both run the same aggregate queries, timed
+alone as 'queries', so the rest is chart building and encoding; each
+payload is built and encoded as on a cache miss, and the two outputs
+are checked to be the same JSON.
+
+Usage: python benchmarks/bench_charts.py [rows ...]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import plotly
+import plotly.graph_objs as go
+
+from app import aggregates, balances, create_app, importer
+from app.api.reports import chart_payload
+from app.config import config, Config
+from app.models import db, DailyRollup, Transaction, TransactionRollup, User, to_rupees
+from app.routes import dashboard_analytics
+from bench_import import make_frame
+
+REPEATS = 20
+
+
+def encoded(figure):
+    return json.dumps(figure, cls=plotly.utils.PlotlyJSONEncoder)
+
+
+def bar_figure(x, y, colors, hovertemplate, text, **layout):
+    figure = go.Figure(data=[go.Bar(x=x, y=y, marker_color=colors, hovertemplate=hovertemplate,
+                                    text=text, textposition='auto')])
+    figure.update_layout(font=dict(size=12), height=400, **layout)
+    return figure
+
+
+def figure_api(user_id):
+    """The /reports/charts payload built the old way"""
+    summary = aggregates.totals(user_id)
+    income, expenses = to_rupees(summary['total_income']), to_rupees(summary['total_expenses'])
+    net = to_rupees(summary['total_income'] - summary['total_expenses'])
+    charts = {'overview': bar_figure(
+        ['Income', 'Expenses', 'Net Balance'], [income, -expenses, net], ['green', 'red', 'blue' if net >= 0 else 'orange'],
+        '<b>%{x}</b><br>Amount: ₹%{y:.2f}<extra></extra>', [f'₹{income:.2f}', f'₹{expenses:.2f}', f'₹{net:.2f}'],
+        title='Financial Overview', yaxis_title='Amount (₹)')}
+
+    categories = {category: to_rupees(paise) for category, paise in aggregates.expense_categories(user_id)}
+    pie = go.Figure(data=[go.Pie(labels=list(categories), values=list(categories.values()),
+                                 hovertemplate='<b>%{label}</b><br>Amount: ₹%{value:.2f}<br>Percentage: %{percent}<extra></extra>')])
+    pie.update_layout(title='Expense Categories', font=dict(size=12), height=400)
+    charts['categories'] = pie
+
+    months = aggregates.monthly_totals(user_id)
+    totals = [to_rupees(month['total']) for month in months]
+    charts['monthly'] = bar_figure(
+        [month['month'] for month in months], totals, ['green' if total >= 0 else 'red' for total in totals],
+        '<b>%{x}</b><br>Total: ₹%{y:.2f}<extra></extra>', [f'₹{total:.2f}' for total in totals],
+        title='Monthly Financial Summary', xaxis_title='Month', yaxis_title='Amount (₹)')
+
+    closing = balances.monthly_balances(user_id)
+    line = go.Figure(data=[go.Scatter(x=[month for month, _ in closing], y=[to_rupees(b) for _, b in closing],
+                                      mode='lines+markers', line=dict(color='blue'),
+                                      hovertemplate='<b>%{x}</b><br>Balance: ₹%{y:.2f}<extra></extra>')])
+    line.update_layout(title='Running Balance', xaxis_title='Month', yaxis_title='Balance (₹)',
+                       font=dict(size=12), height=400)
+    charts['balance'] = line
+    return json.dumps({'charts': {name: json.loads(encoded(figure)) for name, figure in charts.items()}})
+
+
+def figure_dashboard(user_id):
+    """The dashboard charts built the old way: one JSON string per chart inside the payload"""
+    summary, category_totals, monthly_totals = aggregates.overview(user_id)
+    income, expenses = to_rupees(summary['total_income']), to_rupees(summary['total_expenses'])
+    net = to_rupees(summary['total_income'] - summary['total_expenses'])
+    spent = [(cat['category'], to_rupees(-cat['total'])) for cat in category_totals if cat['total'] < 0]
+    pie = go.Figure(data=[go.Pie(labels=[c for c, _ in spent], values=[a for _, a in spent],
+                                 hovertemplate='<b>%{label}</b><br>Amount: ₹%{value:.2f}<br>Percentage: %{percent}<extra></extra>',
+                                 textinfo='label+percent', textposition='auto')])
+    pie.update_layout(title='Spending by Category', font=dict(size=12), height=400)
+    totals = [to_rupees(mt['total']) for mt in monthly_totals]
+    charts = {
+        'category_pie': encoded(pie),
+        'monthly_bar': encoded(bar_figure(
+            [mt['month'] for mt in monthly_totals], totals, ['green' if total >= 0 else 'red' for total in totals],
+            '<b>%{x}</b><br>Total: ₹%{y:.2f}<extra></extra>', [f'₹{total:.2f}' for total in totals],
+            title='Monthly Financial Summary', xaxis_title='Month', yaxis_title='Amount (₹)')),
+        'overview_bar': encoded(bar_figure(
+            ['Income', 'Expenses', 'Net Balance'], [income, -expenses, net], ['green', 'red', 'blue' if net >= 0 else 'orange'],
+            '<b>%{x}</b><br>Amount: ₹%{y:.2f}<extra></extra>', [f'₹{income:.2f}', f'₹{expenses:.2f}', f'₹{net:.2f}'],
+            title='Financial Overview', yaxis_title='Amount (₹)')),
+    }
+    return json.dumps({'charts_json': charts})
+
+
+def queries_api(user_id):
+    aggregates.totals(user_id)
+    aggregates.expense_categories(user_id)
+    aggregates.monthly_totals(user_id)
+    balances.monthly_balances(user_id)
+
+
+def best_ms(run):
+    best, result = float('inf'), None
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        result = run()
+        best = min(best, (time.perf_counter() - started) * 1000)
+    return best, result
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f'sqlite:///{os.path.join(tmp, "bench.db")}'
+        config['benchmark'] = type('BenchmarkConfig', (Config,), {'SQLALCHEMY_DATABASE_URI': url})
+        app = create_app('benchmark')
+
+        with app.test_request_context():
+            user = User(username='bench', email='bench@example.com')
+            user.set_password('bench-password')
+            db.session.add(user)
+            db.session.commit()
+            user_id = user.id
+
+            pages = {
+                '/reports/charts': (lambda: queries_api(user_id), lambda: figure_api(user_id),
+                                    lambda: json.dumps(chart_payload(user_id))),
+                'dashboard': (lambda: aggregates.overview(user_id), lambda: figure_dashboard(user_id),
+                              lambda: json.dumps(dashboard_analytics(user_id))),
+            }
+            print(f'{"rows":>10} {"page":>16} {"queries ms":>11} {"figure ms":>10} {"spec ms":>8} '
+                  f'{"speedup":>8} {"KB":>6}')
+            for size in sizes:
+                db.session.query(Transaction).delete()
+                db.session.query(TransactionRollup).delete()
+                db.session.query(DailyRollup).delete()
+                importer.import_dataframe(make_frame(size), user_id, skip_duplicates=False)
+                db.session.commit()
+
+                for page, (queries, figure, spec) in pages.items():
+                    spec()  # compiles the shared layouts once, like a worker's first request
+                    query_ms, _ = best_ms(queries)
+                    figure_ms, old = best_ms(figure)
+                    spec_ms, new = best_ms(spec)
+                    old, new = json.loads(old), json.loads(new)
+                    if 'charts_json' in old:
+                        old = {'charts': {name: json.loads(text) for name, text in old['charts_json'].items()}}
+                    assert old['charts'] == new['charts'], f'{page}: chart JSON differs'
+                    print(f'{size:>10,} {page:>16} {query_ms:>11.2f} {figure_ms:>10.2f} {spec_ms:>8.2f} '
+                          f'{figure_ms / spec_ms:>7.1f}x {len(json.dumps(new)) / 1024:>6.0f}')
+
+
+if __name__ == '__main__':
+    main()
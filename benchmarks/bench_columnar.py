@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark: report breakdowns over a range that splits a month, SQL vs columnar
+
+Both modes compute totals, category, expense-category and monthly
+breakdowns plus the top expenses and incomes for a start date that splits
+a month, so the rollup cannot serve them. 'sql' runs each as its own
+query over the transactions table (the path used outside a request);
+'columnar' loads the range once into NumPy arrays and derives everything
+from them, as a report request does. The columnar time is split into the
+load and the in-memory computation, and the results are checked against
+the SQL ones.
+
+Usage: python benchmarks/bench_columnar.py [rows ...]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import aggregates, columnar, create_app, importer
+from app.config import config, Config
+from app.models import db, DailyRollup, Transaction, TransactionRollup, User
+from bench_import import make_frame
+
+REPEATS = 3
+
+# Before every generated date, but not the first of a month
+RAW_START = date(2019, 12, 31)
+
+
+def breakdowns(user_id):
+    """Every breakdown a summary report needs, through the aggregates module"""
+    return (
+        aggregates.totals(user_id, RAW_START),
+        aggregates.category_totals(user_id, RAW_START),
+        aggregates.expense_categories(user_id, RAW_START),
+        aggregates.monthly_totals(user_id, RAW_START),
+        [t.id for t in aggregates.top_transactions(user_id, True, start_date=RAW_START)],
+        [t.id for t in aggregates.top_transactions(user_id, False, start_date=RAW_START)],
+    )
+
+
+def computed(columns):
+    """The same breakdowns from already loaded columns"""
+    return (
+        columns.totals(),
+        columns.category_totals(),
+        columns.expense_categories(),
+        columns.monthly_totals(),
+        columns.top_ids(True),
+        columns.top_ids(False),
+    )
+
+
+def best_ms(run):
+    best, result = float('inf'), None
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        result = run()
+        best = min(best, (time.perf_counter() - started) * 1000)
+    return best, result
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1_000, 100_000, 1_000_000]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f'sqlite:///{os.path.join(tmp, "bench.db")}'
+        config['benchmark'] = type('BenchmarkConfig', (Config,), {'SQLALCHEMY_DATABASE_URI': url})
+        app = create_app('benchmark')
+
+        with app.app_context():
+            user = User(username='bench', email='bench@example.com')
+            user.set_password('bench-password')
+            db.session.add(user)
+            db.session.commit()
+            user_id = user.id
+
+            print(f'{"rows":>10} {"sql ms":>10} {"load ms":>10} {"compute ms":>11} '
+                  f'{"columnar ms":>12} {"speedup":>8} {"array MB":>9}')
+            for size in sizes:
+                db.session.query(Transaction).delete()
+                db.session.query(TransactionRollup).delete()
+                db.session.query(DailyRollup).delete()
+                importer.import_dataframe(make_frame(size), user_id, skip_duplicates=False)
+                db.session.commit()
+
+                sql, expected = best_ms(lambda: breakdowns(user_id))
+                load, columns = best_ms(lambda: columnar.load(user_id, RAW_START))
+                compute, result = best_ms(lambda: computed(columnar.Columns(
+                    columns.ids, columns.days, columns.paise, columns.codes, columns.categories)))
+                assert result == expected, 'columnar results differ from SQL'
+                assert len(columns) == size, len(columns)
+
+                megabytes = sum(a.nbytes for a in (columns.ids, columns.days, columns.paise, columns.codes)) / 2 ** 20
+                print(f'{size:>10,} {sql:>10.1f} {load:>10.1f} {compute:>11.1f} '
+                      f'{load + compute:>12.1f} {sql / (load + compute):>7.1f}x {megabytes:>9.1f}')
+
+
+if __name__ == '__main__':
+    main()
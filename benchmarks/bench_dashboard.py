@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark: queries and latency of the dashboard for a user with a long history
+
+'legacy' is the data loading the dashboard used to do: every transaction
+via .all() plus four separate aggregate queries (the template only showed
+20 rows and the count). It is timed without template rendering, so it
+understates the old page. 'cold' is a full GET /dashboard with the cached
+analytics invalidated first (one rollup query and a LIMIT query); 'warm'
+serves the analytics from the cache. 'page' is one lazy table request.
+
+Usage: python benchmarks/bench_dashboard.py [rows]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event, func
+
+from app import cache, create_app, importer
+from app.config import config, Config
+from app.models import db, Transaction, User
+from bench_import import make_frame
+
+REPEATS = 5
+
+
+def legacy_dashboard(user_id):
+    """The queries the dashboard ran before the rollup and the lazy table"""
+    transactions = Transaction.query.filter_by(user_id=user_id).order_by(Transaction.date.desc()).all()
+    category_totals = db.session.query(
+        Transaction.category, func.sum(Transaction.amount), func.count(Transaction.id)
+    ).filter_by(user_id=user_id).group_by(Transaction.category).all()
+    monthly_totals = db.session.query(
+        func.strftime('%Y-%m', Transaction.date), func.sum(Transaction.amount)
+    ).filter_by(user_id=user_id).group_by(func.strftime('%Y-%m', Transaction.date)).all()
+    total_income = db.session.query(func.sum(Transaction.amount)).filter(
+        Transaction.amount > 0, Transaction.user_id == user_id
+    ).scalar() or 0
+    total_expenses = abs(db.session.query(func.sum(Transaction.amount)).filter(
+        Transaction.amount < 0, Transaction.user_id == user_id
+    ).scalar() or 0)
+    return len(transactions[:20]), len(transactions), category_totals, monthly_totals, total_income, total_expenses
+
+
+def timed(run, statements, prepare=None):
+    """Best-of-N milliseconds and the number of SQL statements of one run"""
+    best = float('inf')
+    for _ in range(REPEATS):
+        if prepare:
+            prepare()
+        statements.clear()
+        started = time.perf_counter()
+        run()
+        best = min(best, (time.perf_counter() - started) * 1000)
+    return best, len(statements)
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f'sqlite:///{os.path.join(tmp, "bench.db")}'
+        config['benchmark'] = type('BenchmarkConfig', (Config,), {'SQLALCHEMY_DATABASE_URI': url})
+        app = create_app('benchmark')
+
+        with app.app_context():
+            user = User(username='bench', email='bench@example.com')
+            user.set_password('bench-password')
+            db.session.add(user)
+            db.session.commit()
+            user_id = user.id
+            importer.import_dataframe(make_frame(rows), user_id, skip_duplicates=False)
+            db.session.commit()
+            engine = db.engine
+
+        statements = []
+        event.listen(engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+            session['_fresh'] = True
+
+        def legacy():
+            with app.app_context():
+                legacy_dashboard(user_id)
+
+        def invalidate():
+            with app.app_context():
+                cache.bump_version(user_id)
+                db.session.commit()
+
+        def dashboard():
+            response = client.get('/dashboard')
+            assert response.status_code == 200, response.status_code
+
+        cursor = client.get('/dashboard/transactions?cursor=').get_json()['next_cursor']
+
+        def page():
+            assert client.get(f'/dashboard/transactions?cursor={cursor}').status_code == 200
+
+        print(f'{rows:,} transactions')
+        print(f'{"mode":<8} {"ms":>9} {"queries":>8}')
+        for mode, run, prepare in [('legacy', legacy, None), ('cold', dashboard, invalidate),
+                                   ('warm', dashboard, None), ('page', page, None)]:
+            elapsed, queries = timed(run, statements, prepare)
+            print(f'{mode:<8} {elapsed:>9.1f} {queries:>8}')
+
+
+if __name__ == '__main__':
+    main()
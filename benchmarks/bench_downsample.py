@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark: downsampling long chart series with max_points
+
+First the LTTB kernel alone: app.downsample.lttb_indices (vectorized
+within each bucket) against a plain Python LTTB loop, reducing random
+walks of growing length to 1,000 points. Then the endpoints: the daily
+running balance and the daily series by category over the whole
+generated history (four years), with and without max_points, reporting
+the response size and the uncached request time.
+
+Usage: python benchmarks/bench_downsample.py [rows]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from flask_jwt_extended import create_access_token
+
+from app import cache, create_app, downsample, importer
+from app.config import config, Config
+from app.models import db, User
+from bench_import import make_frame
+
+REPEATS = 3
+KERNEL_SIZES = (10_000, 100_000, 1_000_000)
+KERNEL_POINTS = 1_000
+MAX_POINTS = 300
+
+ENDPOINTS = (
+    '/api/v1/reports/balance?start_date=2020-01-01&end_date=2023-12-31&granularity=day',
+    '/api/v1/reports/timeseries?granularity=day&group_by=category',
+)
+
+
+def python_lttb(x, y, threshold):
+    """Textbook LTTB over Python lists"""
+    count = len(x)
+    every = (count - 2) / (threshold - 2)
+    selected, previous = [0], 0
+    for bucket in range(threshold - 2):
+        start, end = int(bucket * every) + 1, int((bucket + 1) * every) + 1
+        following = range(end, min(int((bucket + 2) * every) + 1, count)) or [count - 1]
+        avg_x = sum(x[i] for i in following) / len(following)
+        avg_y = sum(y[i] for i in following) / len(following)
+        best, pick = -1.0, start
+        for i in range(start, end):
+            area = abs((x[previous] - avg_x) * (y[i] - y[previous]) - (x[previous] - x[i]) * (avg_y - y[previous]))
+            if area > best:
+                best, pick = area, i
+        selected.append(pick)
+        previous = pick
+    selected.append(count - 1)
+    return selected
+
+
+def best_ms(run):
+    best, result = float('inf'), None
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        result = run()
+        best = min(best, (time.perf_counter() - started) * 1000)
+    return best, result
+
+
+def kernel():
+    print(f'{"points":>10} {"python ms":>10} {"numpy ms":>9} {"speedup":>8}')
+    random = np.random.default_rng(0)
+    for size in KERNEL_SIZES:
+        x = np.arange(size, dtype=np.float64)
+        y = np.cumsum(random.normal(size=size))
+        slow, _ = best_ms(lambda: python_lttb(x.tolist(), y.tolist(), KERNEL_POINTS))
+        fast, picked = best_ms(lambda: downsample.lttb_indices(x, y, KERNEL_POINTS))
+        assert len(picked) == KERNEL_POINTS
+        print(f'{size:>10,} {slow:>10.1f} {fast:>9.1f} {slow / fast:>7.0f}x')
+
+
+def endpoints(rows):
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f'sqlite:///{os.path.join(tmp, "bench.db")}'
+        config['benchmark'] = type('BenchmarkConfig', (Config,), {'SQLALCHEMY_DATABASE_URI': url})
+        app = create_app('benchmark')
+        client = app.test_client()
+
+        with app.app_context():
+            user = User(username='bench', email='bench@example.com')
+            user.set_password('bench-password')
+            db.session.add(user)
+            db.session.commit()
+            user_id = user.id
+            importer.import_dataframe(make_frame(rows), user_id, skip_duplicates=False)
+            db.session.commit()
+            headers = {'Authorization': f'Bearer {create_access_token(identity=user_id)}'}
+
+        def request(url):
+            # A fresh data version each time, so the payload is rebuilt rather than served from the cache
+            with app.app_context():
+                cache.bump_version(user_id)
+                db.session.commit()
+            response = client.get(url, headers=headers)
+            assert response.status_code == 200, response.get_data(as_text=True)
+            return response.data
+
+        print(f'\n{rows:,} transactions, max_points={MAX_POINTS}')
+        print(f'{"endpoint":>12} {"full KB":>8} {"full ms":>8} {"thin KB":>8} {"thin ms":>8}')
+        for url in ENDPOINTS:
+            full_ms, full = best_ms(lambda: request(url))
+            thin_ms, thin = best_ms(lambda: request(f'{url}&max_points={MAX_POINTS}'))
+            name = url.split('/')[-1].split('?')[0]
+            print(f'{name:>12} {len(full) / 1024:>8.0f} {full_ms:>8.1f} {len(thin) / 1024:>8.0f} {thin_ms:>8.1f}')
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    kernel()
+    endpoints(rows)
+
+
+if __name__ == '__main__':
+    main()
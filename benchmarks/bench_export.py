@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark: streaming export vs building the whole list response
+
+For each size the transactions are stored once in a file-backed SQLite
+database; every mode then runs in a fresh subprocess, so the reported peak
+RSS growth belongs to that one request. 'list' is GET /transactions with
+limit set to every row, which materializes the full response before
+sending anything.
+
+Usage: python benchmarks/bench_export.py [rows ...]
+"""
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+MODES = {
+    'csv': '/api/v1/transactions/export?format=csv',
+    'ndjson': '/api/v1/transactions/export?format=ndjson',
+    'list': '/api/v1/transactions/?limit={rows}',
+}
+
+
+def make_app(database_path):
+    from app import create_app
+    from app.config import config, Config
+
+    config['benchmark'] = type('BenchmarkConfig', (Config,), {'SQLALCHEMY_DATABASE_URI': f'sqlite:///{database_path}'})
+    return create_app('benchmark')
+
+
+def seed(database_path, rows):
+    """Store ``rows`` transactions for a bench user"""
+    from app import importer
+    from app.models import db, User
+    from bench_import import make_frame
+
+    app = make_app(database_path)
+    with app.app_context():
+        user = User(username='bench', email='bench@example.com')
+        user.set_password('bench-password')
+        db.session.add(user)
+        db.session.commit()
+        importer.import_dataframe(make_frame(rows), user.id, skip_duplicates=False)
+        db.session.commit()
+
+
+def child(database_path, mode, rows):
+    """Run one request and print time to first byte, total seconds, MB sent and peak RSS growth"""
+    from flask_jwt_extended import create_access_token
+    from app.models import User
+
+    app = make_app(database_path)
+    with app.app_context():
+        user = User.query.filter_by(username='bench').one()
+        headers = {'Authorization': f'Bearer {create_access_token(identity=user.id)}'}
+    client = app.test_client()
+    client.get('/api/v1/transactions/?limit=1', headers=headers)
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    started = time.perf_counter()
+    response = client.get(MODES[mode].format(rows=rows), headers=headers, buffered=False)
+    chunks = iter(response.response)
+    size = len(next(chunks))
+    first_byte = time.perf_counter() - started
+    for chunk in chunks:
+        size += len(chunk)
+    elapsed = time.perf_counter() - started
+    response.close()
+
+    growth_mb = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline) / 1024
+    print(f'{first_byte * 1000:.1f} {elapsed:.2f} {size / 1024 / 1024:.1f} {growth_mb:.0f}')
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--child':
+        child(sys.argv[2], sys.argv[3], int(sys.argv[4]))
+        return
+
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100_000, 500_000, 1_000_000]
+
+    print(f'{"rows":>10} {"mode":>7} {"first byte":>11} {"total":>8} {"size":>8} {"peak RSS +":>11}')
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in sizes:
+            database_path = os.path.join(tmp, f'export_{rows}.db')
+            seed(database_path, rows)
+            for mode in MODES:
+                out = subprocess.run(
+                    [sys.executable, __file__, '--child', database_path, mode, str(rows)],
+                    capture_output=True, text=True, check=True, cwd=ROOT
+                ).stdout.split()
+                first_byte, elapsed, size_mb, growth_mb = out[-4:]
+                print(f'{rows:>10,} {mode:>7} {first_byte:>8} ms {elapsed:>6} s {size_mb:>5} MB {growth_mb:>8} MB')
+
+
+if __name__ == '__main__':
+    main()
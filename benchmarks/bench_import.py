@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark: CSV import throughput, legacy iterrows loop vs vectorized engine
+
+Usage: python benchmarks/bench_import.py [rows ...]
+"""
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from app import create_app, importer
+from app.models import db, Transaction, User
+
+CATEGORIES = ['Food', 'Transport', 'Shopping', 'Bills', 'Rent', 'Salary', 'Healthcare', 'Travel']
+
+
+def make_frame(rows, seed=42):
+    """Build a bank-export-like DataFrame with string columns as read_csv would"""
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 365 * 4, rows), unit='D')
+    return pd.DataFrame({
+        'date': dates.strftime('%Y-%m-%d'),
+        'category': rng.choice(CATEGORIES, rows),
+        'amount': np.round(rng.normal(-500, 2000, rows), 2),
+        'description': [f'Transaction {i}' for i in range(rows)],
+    })
+
+
+def legacy_import(df, user_id):
+    """The per-row loop the upload endpoints used before the import engine"""
+    for _, row in df.iterrows():
+        transaction = Transaction(
+            date=pd.to_datetime(row['date']).date(),
+            category=str(row['category']),
+            amount=float(row['amount']),
+            description=str(row['description']) if pd.notna(row['description']) else '',
+            user_id=user_id
+        )
+        db.session.add(transaction)
+    db.session.commit()
+
+
+def engine_import(df, user_id):
+    importer.import_dataframe(df, user_id)
+    db.session.commit()
+
+
+def run(label, func, df, user_id):
+    db.session.query(Transaction).delete()
+    db.session.commit()
+    started = time.perf_counter()
+    func(df, user_id)
+    elapsed = time.perf_counter() - started
+    count = Transaction.query.count()
+    assert count == len(df), f'{label}: expected {len(df)} rows, found {count}'
+    print(f'  {label:<10} {elapsed:8.2f}s  {len(df) / elapsed:12,.0f} rows/sec')
+    return elapsed
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 50_000, 200_000]
+    app = create_app('testing')
+
+    with app.app_context():
+        user = User(username='bench', email='bench@example.com')
+        user.set_password('bench-password')
+        db.session.add(user)
+        db.session.commit()
+
+        for rows in sizes:
+            df = make_frame(rows)
+            print(f'{rows:,} rows')
+            before = run('iterrows', legacy_import, df, user.id)
+            after = run('engine', engine_import, df, user.id)
+            print(f'  speedup    {before / after:8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
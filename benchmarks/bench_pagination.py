@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark: GET /api/v1/transactions latency by page depth, offset vs cursor
+
+Offset paging makes the database walk every skipped row, so it slows down
+as the page gets deeper; cursor paging seeks straight to the page.
+
+Usage: python benchmarks/bench_pagination.py [rows] [page_size]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_jwt_extended import create_access_token
+
+from app import create_app, importer
+from app.config import config, Config
+from app.models import db, User
+from bench_import import make_frame
+
+REPEATS = 20
+
+
+def timed_get(client, url, headers):
+    """Median milliseconds for a GET, plus the last JSON body"""
+    timings = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        response = client.get(url, headers=headers)
+        timings.append((time.perf_counter() - started) * 1000)
+        assert response.status_code == 200, response.get_data(as_text=True)
+    timings.sort()
+    return timings[len(timings) // 2], response.get_json()
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    page_size = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+    # A file database, so every request sees the same data whichever connection it gets
+    tmp = tempfile.TemporaryDirectory()
+    url = f'sqlite:///{os.path.join(tmp.name, "bench.db")}'
+    config['benchmark'] = type('BenchmarkConfig', (Config,), {'SQLALCHEMY_DATABASE_URI': url})
+
+    app = create_app('benchmark')
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', email='bench@example.com')
+        user.set_password('bench-password')
+        db.session.add(user)
+        db.session.commit()
+
+        importer.import_dataframe(make_frame(rows), user.id, skip_duplicates=False)
+        db.session.commit()
+        headers = {'Authorization': f'Bearer {create_access_token(identity=user.id)}'}
+
+    client = app.test_client()
+    depths = [depth for depth in (0, 10, 100, 500, 1000, rows // page_size - 1) if depth * page_size < rows]
+
+    # Walk the cursor chain once, remembering the cursor that opens each measured page
+    cursors = {0: ''}
+    cursor, page = '', 0
+    while page < max(depths):
+        body = client.get(f'/api/v1/transactions/?limit={page_size}&cursor={cursor}', headers=headers).get_json()
+        cursor, page = body['next_cursor'], page + 1
+        if page in depths:
+            cursors[page] = cursor
+
+    print(f'{rows:,} transactions, {page_size} per page, median of {REPEATS} requests')
+    print(f'{"page":>8} {"offset ms":>10} {"cursor ms":>10}')
+    for depth in depths:
+        offset_ms, by_offset = timed_get(
+            client, f'/api/v1/transactions/?limit={page_size}&offset={depth * page_size}', headers)
+        cursor_ms, by_cursor = timed_get(
+            client, f'/api/v1/transactions/?limit={page_size}&cursor={cursors[depth]}', headers)
+        assert by_offset == by_cursor['transactions'], f'page {depth} differs between offset and cursor'
+        print(f'{depth:>8,} {offset_ms:>10.2f} {cursor_ms:>10.2f}')
+
+    tmp.cleanup()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark: iterrows loop vs streaming import vs parallel multi-file import
+
+The rows are split across several CSV files, as a batch of monthly
+statements would be. The parallel import parses them on a spawned process
+pool while the main process writes; its speedup grows with the number of
+CPU cores available.
+
+Usage: python benchmarks/bench_parallel_import.py [rows] [files] [processes]
+"""
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+from bench_streaming_import import write_csv  # noqa: E402
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 400_000
+    file_count = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    processes = int(sys.argv[3]) if len(sys.argv) > 3 else os.cpu_count()
+
+    import pandas as pd
+
+    from app import create_app, importer
+    from app.config import config, Config
+    from app.models import db, User, Transaction
+    from bench_import import legacy_import
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for index in range(file_count):
+            path = os.path.join(tmp, f'statement_{index}.csv')
+            write_csv(path, rows // file_count, offset=index * rows)
+            paths.append(path)
+        files = [(os.path.basename(path), path) for path in paths]
+
+        executor = ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context('spawn'))
+        # Start the workers before timing, as a long-running server would have them
+        list(executor.map(abs, range(processes)))
+
+        modes = {
+            'iterrows': lambda user_id: [legacy_import(pd.read_csv(path), user_id) for path in paths],
+            'stream': lambda user_id: [importer.import_csv(path, user_id) for path in paths],
+            'parallel': lambda user_id: importer.import_files(files, user_id, executor),
+        }
+
+        print(f'{rows:,} rows in {file_count} files, {processes} worker processes')
+        print(f'{"mode":>10} {"seconds":>8} {"rows/s":>10}')
+        for mode, run in modes.items():
+            # Each mode gets its own file-backed database so the writes are comparable
+            url = f'sqlite:///{os.path.join(tmp, mode)}.db'
+            config['benchmark'] = type('BenchmarkConfig', (Config,), {'SQLALCHEMY_DATABASE_URI': url})
+            app = create_app('benchmark')
+            with app.app_context():
+                user = User(username='bench', email='bench@example.com')
+                user.set_password('bench-password')
+                db.session.add(user)
+                db.session.commit()
+
+                started = time.perf_counter()
+                run(user.id)
+                elapsed = time.perf_counter() - started
+
+                stored = db.session.query(Transaction).count()
+                assert stored == rows // file_count * file_count, (mode, stored)
+                print(f'{mode:>10} {elapsed:>8.2f} {stored / elapsed:>10,.0f}')
+                db.engine.dispose()
+
+        executor.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark: PDF reports rendered in the request vs as background jobs
+
+POST /reports/pdf lists the latest ``rows`` transactions in three ways:
+
+- 'sync': laid out inside the request (PDF_SYNC_MAX_ROWS raised above
+  rows), as every report was before.
+- 'thread': queued as a job rendered on the job thread (PDF_PROCESSES=0).
+- 'process': queued as a job rendered on the process pool.
+
+'request ms' is how long the POST held the request worker and 'ready s'
+how long until the PDF could be downloaded. While a job renders, its
+status is polled in a loop; the poll latencies show how much the
+rendering slows down the other requests of the same worker process
+(ReportLab on the job thread holds the GIL, the process pool does not).
+
+Usage: python benchmarks/bench_pdf.py [rows ...]
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_jwt_extended import create_access_token
+
+from app import create_app, importer
+from app.config import config, Config
+from app.models import db, User
+from bench_import import make_frame
+
+PROCESSES = 2
+
+
+def run(client, headers, rows, mode):
+    """(request ms, ready s, poll latencies in ms, PDF bytes) of one report"""
+    query = '' if mode == 'sync' else '?async=true'
+    started = time.perf_counter()
+    response = client.post(f'/api/v1/reports/pdf{query}', headers=headers, json={'detail_rows': rows})
+    request_ms = (time.perf_counter() - started) * 1000
+    if mode == 'sync':
+        return request_ms, request_ms / 1000, [], len(response.data)
+
+    job = response.get_json()
+    polls = []
+    while True:
+        polled = time.perf_counter()
+        status = client.get(job['status_url'], headers=headers).get_json()
+        polls.append((time.perf_counter() - polled) * 1000)
+        if status['status'] not in ('queued', 'running'):
+            break
+        time.sleep(0.01)
+    ready = time.perf_counter() - started
+    assert status['status'] == 'finished', status
+    return request_ms, ready, polls, status['size_bytes']
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1_000, 10_000, 50_000]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f'sqlite:///{os.path.join(tmp, "bench.db")}'
+        config['benchmark'] = type('BenchmarkConfig', (Config,), {
+            'SQLALCHEMY_DATABASE_URI': url, 'PDF_FOLDER': os.path.join(tmp, 'reports'),
+            'PDF_MAX_DETAIL_ROWS': max(sizes)
+        })
+        app = create_app('benchmark')
+        client = app.test_client()
+
+        with app.app_context():
+            user = User(username='bench', email='bench@example.com')
+            user.set_password('bench-password')
+            db.session.add(user)
+            db.session.commit()
+            importer.import_dataframe(make_frame(max(sizes)), user.id, skip_duplicates=False)
+            db.session.commit()
+            headers = {'Authorization': f'Bearer {create_access_token(identity=user.id)}'}
+
+        # Spawn the pool's processes before timing anything
+        app.config['PDF_PROCESSES'] = PROCESSES
+        run(client, headers, 10, 'process')
+
+        print(f'{"rows":>8} {"mode":>8} {"request ms":>11} {"ready s":>8} {"polls":>6} {"poll p50 ms":>12} '
+              f'{"poll max ms":>12} {"KB":>7}')
+        for rows in sizes:
+            for mode in ('sync', 'thread', 'process'):
+                app.config['PDF_SYNC_MAX_ROWS'] = rows if mode == 'sync' else 0
+                app.config['PDF_PROCESSES'] = PROCESSES if mode == 'process' else 0
+                request_ms, ready, polls, size = run(client, headers, rows, mode)
+                p50 = f'{statistics.median(polls):.1f}' if polls else '-'
+                worst = f'{max(polls):.1f}' if polls else '-'
+                print(f'{rows:>8,} {mode:>8} {request_ms:>11.1f} {ready:>8.2f} {len(polls):>6} {p50:>12} '
+                      f'{worst:>12} {size / 1024:>7.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark: summary aggregates from the monthly rollup vs scanning transactions
+
+The same totals, category and monthly breakdowns are computed twice per
+history size: once over the whole history, which is served from the
+transaction_rollup table, and once with a start date that splits a month,
+which forces the GROUP BY over the transactions table. The rollup's cost
+depends on months x categories, so it should stay flat as rows grow.
+
+Usage: python benchmarks/bench_rollup.py [rows ...]
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import aggregates, create_app, importer
+from app.config import config, Config
+from app.models import db, DailyRollup, Transaction, TransactionRollup, User
+from bench_import import make_frame
+
+REPEATS = 5
+
+# Before every generated date, but not the first of a month
+RAW_START = date(2019, 12, 31)
+
+
+def summarize(user_id, start_date=None):
+    aggregates.totals(user_id, start_date)
+    aggregates.category_totals(user_id, start_date)
+    aggregates.monthly_totals(user_id, start_date)
+
+
+def best_ms(user_id, start_date=None):
+    best = float('inf')
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        summarize(user_id, start_date)
+        best = min(best, (time.perf_counter() - started) * 1000)
+    return best
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 500_000]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f'sqlite:///{os.path.join(tmp, "bench.db")}'
+        config['benchmark'] = type('BenchmarkConfig', (Config,), {'SQLALCHEMY_DATABASE_URI': url})
+        app = create_app('benchmark')
+
+        with app.app_context():
+            user = User(username='bench', email='bench@example.com')
+            user.set_password('bench-password')
+            db.session.add(user)
+            db.session.commit()
+            user_id = user.id
+
+            print(f'{"rows":>10} {"rollup rows":>12} {"rollup ms":>10} {"scan ms":>10} {"speedup":>8}')
+            for size in sizes:
+                db.session.query(Transaction).delete()
+                db.session.query(TransactionRollup).delete()
+                db.session.query(DailyRollup).delete()
+                importer.import_dataframe(make_frame(size), user_id, skip_duplicates=False)
+                db.session.commit()
+
+                counts = aggregates.totals(user_id)['transaction_count'], aggregates.totals(user_id, RAW_START)['transaction_count']
+                assert counts == (size, size), counts
+                groups = TransactionRollup.query.filter_by(user_id=user_id).count()
+                rollup = best_ms(user_id)
+                scan = best_ms(user_id, RAW_START)
+                print(f'{size:>10,} {groups:>12,} {rollup:>10.1f} {scan:>10.1f} {scan / rollup:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark: worker startup, import time of create_app()
+
+Each run starts a fresh interpreter, as a new or recycled gunicorn worker
+does, and times importing the app plus create_app(). 'lazy' is the app
+as it is: pandas, NumPy and Plotly load on first use through app.lazy.
+'eager' first imports them the way the module-level imports used to, so
+the difference is what every worker saved. A `python -X importtime`
+profile of the lazy start then lists the slowest imports, and the heavy
+modules are checked to be absent until a request needs them.
+
+Usage: python benchmarks/bench_startup.py [runs]
+"""
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY = ('pandas', 'numpy', 'plotly', 'reportlab')
+
+# What app.importer, app.api.transactions and app.api.reports imported at module level before
+EAGER_IMPORTS = 'import numpy, pandas, plotly, plotly.graph_objs\n'
+
+STARTUP = '''
+import sys, time
+started = time.perf_counter()
+{prelude}
+from app import create_app
+from app.config import config, Config
+config['benchmark'] = type('BenchmarkConfig', (Config,), {{'SQLALCHEMY_DATABASE_URI': {url!r}}})
+create_app('benchmark')
+print((time.perf_counter() - started) * 1000)
+print(','.join(name for name in {heavy!r} if name in sys.modules))
+'''
+
+TOP_IMPORTS = 15
+
+
+def run(code, *flags):
+    return subprocess.run([sys.executable, *flags, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+
+
+def startup_ms(prelude, url, runs):
+    """Median wall time of imports + create_app() in a fresh interpreter, and the heavy modules it loaded"""
+    times, loaded = [], ''
+    for _ in range(runs):
+        lines = run(STARTUP.format(prelude=prelude, url=url, heavy=HEAVY)).stdout.splitlines()
+        times.append(float(lines[-2]))
+        loaded = lines[-1]
+    return statistics.median(times), loaded or '-'
+
+
+def import_profile(url):
+    """(cumulative µs, module) of the first two levels of imports of a lazy start, slowest first"""
+    stderr = run(STARTUP.format(prelude='', url=url, heavy=HEAVY), '-X', 'importtime').stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nesting is shown by two spaces per level; keep top-level imports and the ones they make directly
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth <= 1:
+            rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f'sqlite:///{os.path.join(tmp, "bench.db")}'
+        run(STARTUP.format(prelude='', url=url, heavy=HEAVY))  # create the schema and warm the OS file cache
+
+        print(f'{"mode":>6} {"startup ms":>11} heavy modules loaded')
+        lazy, lazy_loaded = startup_ms('', url, runs)
+        eager, eager_loaded = startup_ms(EAGER_IMPORTS, url, runs)
+        print(f'{"lazy":>6} {lazy:>11.0f} {lazy_loaded}')
+        print(f'{"eager":>6} {eager:>11.0f} {eager_loaded}')
+        print(f'saved {eager - lazy:.0f} ms per worker start ({eager / lazy:.1f}x)')
+
+        print('\nSlowest imports of a lazy start (python -X importtime, cumulative):')
+        for cumulative, name in import_profile(url)[:TOP_IMPORTS]:
+            print(f'{cumulative / 1000:>9.1f} ms  {name}')
+
+
+if __name__ == '__main__':
+    main()
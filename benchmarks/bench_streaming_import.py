@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark: peak memory of the streaming CSV import as the file grows
+
+Each size runs in a fresh subprocess against a file-backed SQLite database,
+so the reported peak RSS belongs to that import alone and does not include
+the stored rows.
+
+Usage: python benchmarks/bench_streaming_import.py [rows ...]
+"""
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+CATEGORIES = ['Food', 'Transport', 'Shopping', 'Bills', 'Rent', 'Salary', 'Healthcare', 'Travel']
+
+
+def write_csv(path, rows, offset=0):
+    """Write a synthetic statement line by line without holding it in memory"""
+    with open(path, 'w') as f:
+        f.write('date,category,amount,description\n')
+        for i in range(rows):
+            f.write(f'20{20 + i % 5}-{1 + i % 12:02d}-{1 + i % 28:02d},{CATEGORIES[i % len(CATEGORIES)]},'
+                    f'{(i % 9000) - 6000}.{i % 100:02d},Transaction {offset + i}\n')
+
+
+def child(path, mode, chunk_size):
+    """Import one file and print elapsed seconds and peak RSS in MB"""
+    os.environ['DEV_DATABASE_URL'] = f'sqlite:///{path}.{mode}.db'
+
+    from app import create_app, importer
+    from app.models import db, User
+
+    app = create_app('development')
+    with app.app_context():
+        user = User(username='bench', email='bench@example.com')
+        user.set_password('bench-password')
+        db.session.add(user)
+        db.session.commit()
+
+        started = time.perf_counter()
+        with open(path, 'rb') as f:
+            if mode == 'stream':
+                result = importer.import_csv(f, user.id, chunk_size=chunk_size)
+            else:
+                import pandas as pd
+                result = importer.import_dataframe(pd.read_csv(f), user.id)
+                db.session.commit()
+        elapsed = time.perf_counter() - started
+
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f'{elapsed:.2f} {peak_mb:.0f} {result.created}')
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] == '--child':
+        child(sys.argv[2], sys.argv[3], int(sys.argv[4]))
+        return
+
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100_000, 500_000, 1_000_000]
+    chunk_size = 50_000
+
+    print(f'{"rows":>10} {"mode":>8} {"seconds":>8} {"peak RSS":>10}')
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in sizes:
+            path = os.path.join(tmp, f'statement_{rows}.csv')
+            write_csv(path, rows)
+            for mode in ('whole', 'stream'):
+                out = subprocess.run(
+                    [sys.executable, __file__, '--child', path, mode, str(chunk_size)],
+                    capture_output=True, text=True, check=True, cwd=ROOT
+                ).stdout.split()
+                elapsed, peak_mb, created = out[-3:]
+                print(f'{rows:>10,} {mode:>8} {float(elapsed):>8.2f} {peak_mb:>7} MB')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark: latency and Python memory of the summary endpoints as history grows
+
+The summaries are computed with GROUP BY queries, so the Python-side peak
+allocation should stay flat while the row count grows; only the database
+scan gets longer. 'cold' bumps the user's data version before every
+request so the payload is rebuilt; 'cached' is served from the cache.
+
+Usage: python benchmarks/bench_summary.py [rows ...]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_jwt_extended import create_access_token
+
+from app import cache, create_app, importer
+from app.config import config, Config
+from app.models import db, Transaction, User
+from bench_import import make_frame
+
+ENDPOINTS = ['/api/v1/transactions/summary', '/api/v1/reports/summary', '/api/v1/reports/charts']
+REPEATS = 5
+
+
+def invalidate(app, user_id):
+    with app.app_context():
+        cache.bump_version(user_id)
+        db.session.commit()
+
+
+def measure(app, client, url, headers, user_id, cold):
+    """Best-of-N milliseconds and the peak Python allocation of one request in MB"""
+    best = float('inf')
+    for _ in range(REPEATS):
+        if cold:
+            invalidate(app, user_id)
+        started = time.perf_counter()
+        response = client.get(url, headers=headers)
+        best = min(best, (time.perf_counter() - started) * 1000)
+        assert response.status_code == 200, response.get_data(as_text=True)
+
+    if cold:
+        invalidate(app, user_id)
+    tracemalloc.start()
+    client.get(url, headers=headers)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak / 1024 / 1024
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 500_000]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f'sqlite:///{os.path.join(tmp, "bench.db")}'
+        config['benchmark'] = type('BenchmarkConfig', (Config,), {'SQLALCHEMY_DATABASE_URI': url})
+        app = create_app('benchmark')
+        client = app.test_client()
+
+        with app.app_context():
+            user = User(username='bench', email='bench@example.com')
+            user.set_password('bench-password')
+            db.session.add(user)
+            db.session.commit()
+            user_id = user.id
+            headers = {'Authorization': f'Bearer {create_access_token(identity=user_id)}'}
+
+        print(f'{"rows":>10} {"endpoint":<32} {"cold ms":>9} {"peak MB":>8} {"cached ms":>10}')
+        for size in sizes:
+            with app.app_context():
+                db.session.query(Transaction).delete()
+                importer.import_dataframe(make_frame(size), user_id, skip_duplicates=False)
+                db.session.commit()
+
+            for endpoint in ENDPOINTS:
+                elapsed, peak_mb = measure(app, client, endpoint, headers, user_id, cold=True)
+                cached, _ = measure(app, client, endpoint, headers, user_id, cold=False)
+                print(f'{size:>10,} {endpoint:<32} {elapsed:>9.1f} {peak_mb:>8.2f} {cached:>10.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark: multi-granularity time series, raw rows vs the daily rollup
+
+'python' reads every transaction of the user and buckets them by period
+and category in Python, the way the month loops of the reports used to.
+'group by' buckets the transactions table with period_start in SQL.
+'cube' is timeseries.series, which groups the daily rollup rows instead;
+its cost follows days x categories, not transactions. Each is timed for
+a daily and a monthly series split by category over the whole history,
+and the results are checked against each other.
+
+Usage: python benchmarks/bench_timeseries.py [rows ...]
+"""
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app, importer, timeseries
+from app.config import config, Config
+from app.models import db, DailyRollup, Transaction, TransactionRollup, User, sum_paise
+from app.periods import period_start, python_period_start
+from bench_import import make_frame
+
+REPEATS = 3
+
+GRANULARITIES = ('day', 'month')
+
+
+def python_buckets(user_id, granularity):
+    """The old way: every row into Python, bucketed there"""
+    sums = defaultdict(int)
+    for day, category, paise in db.session.query(Transaction.date, Transaction.category, Transaction.amount_paise)\
+            .filter(Transaction.user_id == user_id):
+        sums[(python_period_start(granularity, day), category)] += paise
+    return dict(sums)
+
+
+def grouped(user_id, granularity):
+    """GROUP BY period_start over the transactions table"""
+    bucket = period_start(granularity, Transaction.date)
+    return dict(((start, category), total) for start, category, total in db.session.query(
+        bucket, Transaction.category, sum_paise(Transaction.amount_paise)
+    ).filter(Transaction.user_id == user_id).group_by(bucket, Transaction.category))
+
+
+def cube(user_id, granularity):
+    """timeseries.series over the daily rollup, flattened to the same shape"""
+    first, last = timeseries.data_range(user_id)
+    starts, series = timeseries.series(user_id, first, last, granularity, 'category')
+    return {
+        (start, category): net
+        for category, values in series.items()
+        for start, net, count in zip(starts, values['net'], values['count']) if count
+    }
+
+
+def best_ms(run):
+    best, result = float('inf'), None
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        result = run()
+        best = min(best, (time.perf_counter() - started) * 1000)
+    return best, result
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 500_000]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f'sqlite:///{os.path.join(tmp, "bench.db")}'
+        config['benchmark'] = type('BenchmarkConfig', (Config,), {'SQLALCHEMY_DATABASE_URI': url})
+        app = create_app('benchmark')
+
+        with app.app_context():
+            user = User(username='bench', email='bench@example.com')
+            user.set_password('bench-password')
+            db.session.add(user)
+            db.session.commit()
+            user_id = user.id
+
+            print(f'{"rows":>10} {"unit":>6} {"python ms":>10} {"group by ms":>12} {"cube ms":>8} '
+                  f'{"speedup":>8} {"cube rows":>10}')
+            for size in sizes:
+                db.session.query(Transaction).delete()
+                db.session.query(TransactionRollup).delete()
+                db.session.query(DailyRollup).delete()
+                importer.import_dataframe(make_frame(size), user_id, skip_duplicates=False)
+                db.session.commit()
+                cube_rows = DailyRollup.query.filter_by(user_id=user_id).count()
+
+                for granularity in GRANULARITIES:
+                    python, expected = best_ms(lambda: python_buckets(user_id, granularity))
+                    sql, result = best_ms(lambda: grouped(user_id, granularity))
+                    assert result == expected, 'GROUP BY differs from Python'
+                    fast, result = best_ms(lambda: cube(user_id, granularity))
+                    assert result == expected, 'cube differs from Python'
+                    print(f'{size:>10,} {granularity:>6} {python:>10.1f} {sql:>12.1f} {fast:>8.1f} '
+                          f'{python / fast:>7.0f}x {cube_rows:>10,}')
+
+
+if __name__ == '__main__':
+    main()
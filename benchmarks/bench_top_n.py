@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark: top-N expenses and income sources as history grows
+
+'sort' is how the report used to pick them: load every transaction of
+the user and sort the expenses and incomes in Python. 'indexed' is
+aggregates.top_transactions, an ORDER BY amount_paise LIMIT N on each end
+of ix_transaction_user_amount, which should stay flat as rows grow. Both
+are checked to return the same transactions.
+
+Usage: python benchmarks/bench_top_n.py [rows ...]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import aggregates, create_app, importer
+from app.config import config, Config
+from app.models import db, DailyRollup, Transaction, TransactionRollup, User
+from bench_import import make_frame
+
+REPEATS = 5
+TOP_N = 10
+
+
+def sorted_top(user_id):
+    """The old approach: every row in memory, sorted by amount"""
+    transactions = Transaction.query.filter_by(user_id=user_id).all()
+    expenses = sorted((t for t in transactions if t.amount_paise < 0), key=lambda t: (t.amount_paise, t.id))
+    incomes = sorted((t for t in transactions if t.amount_paise > 0), key=lambda t: (-t.amount_paise, t.id))
+    return [t.id for t in expenses[:TOP_N]], [t.id for t in incomes[:TOP_N]]
+
+
+def indexed_top(user_id):
+    return ([t.id for t in aggregates.top_transactions(user_id, expenses=True, limit=TOP_N)],
+            [t.id for t in aggregates.top_transactions(user_id, expenses=False, limit=TOP_N)])
+
+
+def best_ms(run, user_id):
+    best, result = float('inf'), None
+    for _ in range(REPEATS):
+        db.session.expunge_all()
+        started = time.perf_counter()
+        result = run(user_id)
+        best = min(best, (time.perf_counter() - started) * 1000)
+    return best, result
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 500_000]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f'sqlite:///{os.path.join(tmp, "bench.db")}'
+        config['benchmark'] = type('BenchmarkConfig', (Config,), {'SQLALCHEMY_DATABASE_URI': url})
+        app = create_app('benchmark')
+
+        with app.app_context():
+            user = User(username='bench', email='bench@example.com')
+            user.set_password('bench-password')
+            db.session.add(user)
+            db.session.commit()
+            user_id = user.id
+
+            print(f'{"rows":>10} {"sort ms":>10} {"indexed ms":>11} {"speedup":>8}')
+            for size in sizes:
+                db.session.query(Transaction).delete()
+                db.session.query(TransactionRollup).delete()
+                db.session.query(DailyRollup).delete()
+                importer.import_dataframe(make_frame(size), user_id, skip_duplicates=False)
+                db.session.commit()
+
+                sort, expected = best_ms(sorted_top, user_id)
+                indexed, result = best_ms(indexed_top, user_id)
+                assert result == expected, 'indexed top-N differs from the full sort'
+                print(f'{size:>10,} {sort:>10.1f} {indexed:>11.2f} {sort / indexed:>7.0f}x')
+
+
+if __name__ == '__main__':
+    main()
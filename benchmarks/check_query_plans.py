@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Query-plan check: do the hot transaction queries use the per-user indexes?
+
+Seeds several users, drives the list, summary and dashboard endpoints
+through the test client while recording every SELECT they send, then runs
+EXPLAIN on each one. A query that scans the whole transaction table
+instead of seeking on an ix_transaction_user_* index, or that the database
+cannot run, fails the check.
+
+Runs against a file-backed SQLite database, and also against PostgreSQL
+when BENCH_POSTGRES_URL points at one (its transaction table is emptied).
+
+Usage: python benchmarks/check_query_plans.py [users] [rows_per_user]
+"""
+import os
+import re
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event, inspect, text
+from sqlalchemy.exc import DBAPIError
+
+from app import create_app, importer
+from app.config import config, Config
+from app.models import db, Transaction, User
+from bench_import import make_frame
+
+INDEX_PREFIX = 'ix_transaction_user_'
+
+# SQLite quotes the table name, PostgreSQL does not
+FROM_TRANSACTION = re.compile(r'\bFROM "?transaction"?\s', re.IGNORECASE)
+
+
+def seed(users, rows_per_user):
+    """Create bench users with their own transactions and refresh planner statistics"""
+    db.session.query(Transaction).delete()
+    ids = []
+    for index in range(users):
+        user = User.query.filter_by(username=f'plan{index}').first()
+        if not user:
+            user = User(username=f'plan{index}', email=f'plan{index}@example.com')
+            user.set_password('plan-password')
+            db.session.add(user)
+            db.session.flush()
+        importer.import_dataframe(make_frame(rows_per_user, seed=index), user.id, skip_duplicates=False)
+        ids.append(user.id)
+    db.session.commit()
+    db.session.execute(text('ANALYZE'))
+    db.session.commit()
+    return ids
+
+
+def capture_selects(app, user_id):
+    """Hit the hot endpoints as one user and return the distinct transaction SELECTs they ran"""
+    statements = {}
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and FROM_TRANSACTION.search(statement):
+            statements.setdefault(statement, parameters)
+
+    client = app.test_client()
+    with app.app_context():
+        headers = {'Authorization': f'Bearer {create_access_token(identity=user_id)}'}
+        engine = db.engine
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        first_page = client.get('/api/v1/transactions/?limit=50&cursor=', headers=headers).get_json()
+        client.get(f'/api/v1/transactions/?limit=50&cursor={first_page["next_cursor"]}', headers=headers)
+        client.get('/api/v1/transactions/?limit=50&offset=100&start_date=2021-01-01&end_date=2021-12-31',
+                   headers=headers)
+        client.get('/api/v1/transactions/summary', headers=headers)
+        client.get('/api/v1/reports/summary', headers=headers)
+        # Ranges that split a month bypass the rollup and group the transactions themselves
+        client.get('/api/v1/reports/summary?start_date=2021-01-15', headers=headers)
+        client.get('/api/v1/reports/summary?start_date=2021-01-15&end_date=2021-06-20', headers=headers)
+        client.get('/api/v1/reports/charts', headers=headers)
+
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user_id)
+            session['_fresh'] = True
+        client.get('/dashboard')
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+    return statements
+
+
+def explain(statement, parameters):
+    """Return the plan lines for one statement on the current database"""
+    connection = db.session.connection()
+    if connection.dialect.name == 'sqlite':
+        rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {statement}', parameters).all()
+        return [row[-1] for row in rows]
+    rows = connection.exec_driver_sql(f'EXPLAIN {statement}', parameters).all()
+    return [row[0] for row in rows]
+
+
+def full_scan(plan):
+    """True when a plan reads transactions without one of the per-user indexes"""
+    for line in plan:
+        if line.startswith('SCAN transaction') and INDEX_PREFIX not in line:
+            return True
+        if 'Seq Scan on transaction' in line:
+            return True
+    return False
+
+
+def index_names(engine):
+    """Names of the indexes on transaction, including expression indexes"""
+    if engine.dialect.name == 'sqlite':
+        # SQLAlchemy's reflection skips expression indexes on SQLite
+        with engine.connect() as connection:
+            return {row[1] for row in connection.exec_driver_sql('PRAGMA index_list("transaction")')}
+    return {index['name'] for index in inspect(engine).get_indexes('transaction')}
+
+
+def check(label, database_url, users, rows_per_user):
+    config['benchmark'] = type('BenchmarkConfig', (Config,), {'SQLALCHEMY_DATABASE_URI': database_url})
+    app = create_app('benchmark')
+
+    with app.app_context():
+        # create_all() never adds indexes to an existing table, only migrations do
+        present = index_names(db.engine)
+        missing = sorted(index.name for index in Transaction.__table__.indexes if index.name not in present)
+        if missing:
+            print(f'{label}: missing {", ".join(missing)}; run `flask db upgrade` first')
+        user_ids = seed(users, rows_per_user)
+
+    statements = capture_selects(app, user_ids[0])
+
+    failures = 0
+    print(f'{label}: {users} users x {rows_per_user:,} transactions, {len(statements)} distinct queries')
+    with app.app_context():
+        for statement, parameters in statements.items():
+            try:
+                plan = explain(statement, parameters)
+                status = 'FULL SCAN' if full_scan(plan) else 'ok'
+            except DBAPIError as e:
+                db.session.rollback()
+                plan = [str(e.orig).strip()]
+                status = 'ERROR'
+            failures += status != 'ok'
+            print(f'\n[{status}] {" ".join(statement.split())[:160]}')
+            for line in plan:
+                print(f'    {line}')
+        db.session.query(Transaction).delete()
+        db.session.commit()
+
+    print()
+    return failures
+
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    rows_per_user = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        failures = check('sqlite', f'sqlite:///{os.path.join(tmp, "plans.db")}', users, rows_per_user)
+
+    postgres_url = os.environ.get('BENCH_POSTGRES_URL')
+    if postgres_url:
+        failures += check('postgresql', postgres_url, users, rows_per_user)
+
+    print(f'{failures} queries failed the check' if failures else 'All queries use an index')
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Gunicorn settings, read automatically from the working directory: gunicorn run:app
+
+The app is imported once in the master (preload_app) and the workers are
+forked from it, so they share its memory copy-on-write and a new or
+recycled worker starts without importing anything. Run `flask init-db`
+before starting; workers do not create the schema.
+
+Import and PDF jobs run on threads of the worker that accepted them, so a
+worker that exits takes its jobs with it. Worker recycling is therefore off
+unless GUNICORN_MAX_REQUESTS is set. Jobs whose worker stopped refreshing
+their heartbeat are marked failed when the master is ready (see app.jobs).
+"""
+import gc
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', 4))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() in ['true', 'on', '1']
+
+# Opt-in recycling to bound slow leaks (0 never recycles); with preload this is a
+# cheap fork, but a recycled worker interrupts the background jobs it is running
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+
+def when_ready(server):
+    if server.cfg.preload_app:
+        from app.jobs import fail_interrupted_jobs
+        from app.models import db
+
+        # Only jobs with a stale heartbeat, so live jobs of other instances are left alone
+        app = server.app.wsgi()
+        with app.app_context():
+            failed = fail_interrupted_jobs()
+            db.session.remove()
+            for engine in db.engines.values():
+                engine.dispose()
+        if failed:
+            server.log.warning('Marked %s interrupted jobs as failed', failed)
+
+        # Move everything the preloaded app allocated out of the collector's reach, so
+        # garbage collection in the workers does not touch (and copy) the shared pages
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    # Connections opened in the master must not be shared across processes
+    if server.cfg.preload_app:
+        from app.models import db
+
+        with server.app.wsgi().app_context():
+            for engine in db.engines.values():
+                engine.dispose(close=False)
@@ -4,6 +4,7 @@ import sys
 from logging.config import fileConfig
 from sqlalchemy import engine_from_config, pool
 from alembic import context
+from flask import current_app, has_app_context
 
 # Add your model's MetaData object here for 'autogenerate' support
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
@@ -21,11 +22,15 @@ if config.config_file_name is not None:
 # Add your model's MetaData object here for 'autogenerate' support
 target_metadata = db.metadata
 
+def get_app():
+    """The app `flask db` loaded, so the schema is not set up a second time; a new one otherwise"""
+    if has_app_context():
+        return current_app._get_current_object()
+    return create_app()
+
 def get_url():
     """Get database URL from Flask app config"""
-    app = create_app()
-    with app.app_context():
-        return app.config.get('SQLALCHEMY_DATABASE_URI')
+    return get_app().config.get('SQLALCHEMY_DATABASE_URI')
 
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode."""
@@ -43,7 +48,7 @@ def run_migrations_offline() -> None:
 def run_migrations_online() -> None:
     """Run migrations in 'online' mode."""
     # Get Flask app configuration
-    app = create_app()
+    app = get_app()
     
     with app.app_context():
         connectable = db.engine
@@ -0,0 +1,60 @@
+"""Initial schema: user and transaction tables
+
+Revision ID: 0001_initial_schema
+Revises: 
+Create Date: 2026-10-18 09:00:00.000000
+
+Databases created by db.create_all() before migrations existed already have
+these tables, so they are only created when missing.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001_initial_schema'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    tables = sa.inspect(op.get_bind()).get_table_names()
+    
+    if 'user' not in tables:
+        op.create_table(
+            'user',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('username', sa.String(length=80), nullable=False),
+            sa.Column('email', sa.String(length=120), nullable=False),
+            sa.Column('password_hash', sa.String(length=255), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_user_email', 'user', ['email'], unique=True)
+        op.create_index('ix_user_username', 'user', ['username'], unique=True)
+    
+    if 'transaction' not in tables:
+        op.create_table(
+            'transaction',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('date', sa.Date(), nullable=False),
+            sa.Column('category', sa.String(length=100), nullable=False),
+            sa.Column('amount', sa.Float(), nullable=False),
+            sa.Column('description', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_transaction_date', 'transaction', ['date'], unique=False)
+        op.create_index('ix_transaction_category', 'transaction', ['category'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_transaction_category', table_name='transaction')
+    op.drop_index('ix_transaction_date', table_name='transaction')
+    op.drop_table('transaction')
+    op.drop_index('ix_user_username', table_name='user')
+    op.drop_index('ix_user_email', table_name='user')
+    op.drop_table('user')
@@ -0,0 +1,83 @@
+"""Add transaction fingerprints for duplicate-free re-imports
+
+Revision ID: 0003_transaction_fingerprint
+Revises: 0002_import_job
+Create Date: 2026-10-18 09:20:00.000000
+
+Existing rows are fingerprinted in batches with the key the importer
+used at this revision, so re-uploading an old statement skips what is
+stored.
+"""
+import hashlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_transaction_fingerprint'
+down_revision = '0002_import_job'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+
+def transaction_fingerprint(user_id, date, amount, category, description):
+    """app.models.transaction_fingerprint as of this revision, frozen so the backfill never changes"""
+    description = ' '.join((description or '').split()).casefold()
+    key = f'{user_id}|{date.isoformat()}|{amount:.2f}|{category.strip().casefold()}|{description}'
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    
+    if 'transactions_skipped' not in {c['name'] for c in inspector.get_columns('import_job')}:
+        with op.batch_alter_table('import_job') as batch_op:
+            batch_op.add_column(sa.Column('transactions_skipped', sa.Integer(), nullable=False, server_default='0'))
+    
+    if 'fingerprint' not in {c['name'] for c in inspector.get_columns('transaction')}:
+        with op.batch_alter_table('transaction') as batch_op:
+            batch_op.add_column(sa.Column('fingerprint', sa.String(length=40), nullable=True))
+    
+    # Backfill in id order, one batch at a time
+    transaction = sa.table(
+        'transaction',
+        sa.column('id', sa.Integer), sa.column('user_id', sa.Integer), sa.column('date', sa.Date),
+        sa.column('amount', sa.Float), sa.column('category', sa.String), sa.column('description', sa.Text),
+        sa.column('fingerprint', sa.String)
+    )
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(transaction.c.id, transaction.c.user_id, transaction.c.date, transaction.c.amount,
+                      transaction.c.category, transaction.c.description)
+            .where(transaction.c.id > last_id, transaction.c.fingerprint.is_(None))
+            .order_by(transaction.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        
+        bind.execute(
+            transaction.update().where(transaction.c.id == sa.bindparam('row_id')),
+            [
+                {'row_id': row.id,
+                 'fingerprint': transaction_fingerprint(row.user_id, row.date, row.amount, row.category, row.description)}
+                for row in rows
+            ]
+        )
+        last_id = rows[-1].id
+    
+    if 'ix_transaction_user_fingerprint' not in {i['name'] for i in inspector.get_indexes('transaction')}:
+        op.create_index('ix_transaction_user_fingerprint', 'transaction', ['user_id', 'fingerprint'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_transaction_user_fingerprint', table_name='transaction')
+    with op.batch_alter_table('transaction') as batch_op:
+        batch_op.drop_column('fingerprint')
+    with op.batch_alter_table('import_job') as batch_op:
+        batch_op.drop_column('transactions_skipped')
@@ -0,0 +1,29 @@
+"""Index transactions by (user_id, date, id) for newest-first paging
+
+Revision ID: 0004_transaction_user_date_index
+Revises: 0003_transaction_fingerprint
+Create Date: 2026-10-18 11:05:00.000000
+
+Matches the (date desc, id desc) order of the transaction listing, so both
+offset and cursor pages are read straight off the index.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_transaction_user_date_index'
+down_revision = '0003_transaction_fingerprint'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    
+    if 'ix_transaction_user_date_id' not in {i['name'] for i in inspector.get_indexes('transaction')}:
+        op.create_index('ix_transaction_user_date_id', 'transaction', ['user_id', 'date', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_transaction_user_date_id', table_name='transaction')
@@ -0,0 +1,36 @@
+"""Index transactions by (user_id, category) and drop the global date/category indexes
+
+Revision ID: 0005_user_scoped_indexes
+Revises: 0004_transaction_user_date_index
+Create Date: 2026-10-18 11:40:00.000000
+
+No query reads transactions across users, so the single-column date and
+category indexes only slowed down inserts and tempted the planner into
+scanning every user's rows; the composite indexes replace them.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_user_scoped_indexes'
+down_revision = '0004_transaction_user_date_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    indexes = {i['name'] for i in sa.inspect(op.get_bind()).get_indexes('transaction')}
+    
+    if 'ix_transaction_user_category' not in indexes:
+        op.create_index('ix_transaction_user_category', 'transaction', ['user_id', 'category'], unique=False)
+    if 'ix_transaction_date' in indexes:
+        op.drop_index('ix_transaction_date', table_name='transaction')
+    if 'ix_transaction_category' in indexes:
+        op.drop_index('ix_transaction_category', table_name='transaction')
+
+
+def downgrade():
+    op.create_index('ix_transaction_category', 'transaction', ['category'], unique=False)
+    op.create_index('ix_transaction_date', 'transaction', ['date'], unique=False)
+    op.drop_index('ix_transaction_user_category', table_name='transaction')
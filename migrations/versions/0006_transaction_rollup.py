@@ -0,0 +1,80 @@
+"""Add transaction_rollup table with per-user monthly totals by category
+
+Revision ID: 0006_transaction_rollup
+Revises: 0005_user_scoped_indexes
+Create Date: 2026-10-18 13:20:00.000000
+
+The table is backfilled from the existing transactions; afterwards the
+application keeps it current on every write. `flask rollups rebuild`
+recomputes it from scratch if it is ever suspected to have drifted.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006_transaction_rollup'
+down_revision = '0005_user_scoped_indexes'
+branch_labels = None
+depends_on = None
+
+# Rollup rows written per INSERT during the backfill
+BATCH_SIZE = 5000
+
+
+def upgrade():
+    bind = op.get_bind()
+    columns = [
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('month', sa.String(length=7), nullable=False),
+        sa.Column('category', sa.String(length=100), nullable=False),
+        sa.Column('total', sa.Float(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('income', sa.Float(), nullable=False),
+        sa.Column('expenses', sa.Float(), nullable=False),
+    ]
+    if 'transaction_rollup' not in sa.inspect(bind).get_table_names():
+        rollup = op.create_table(
+            'transaction_rollup',
+            *columns,
+            sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+            sa.PrimaryKeyConstraint('user_id', 'month', 'category')
+        )
+    else:
+        rollup = sa.table('transaction_rollup', *(sa.column(column.name) for column in columns))
+
+    # A table created earlier by db.create_all() is still empty; fill it too
+    if bind.execute(sa.select(sa.func.count()).select_from(rollup)).scalar():
+        return
+
+    transaction = sa.table(
+        'transaction',
+        sa.column('user_id', sa.Integer()),
+        sa.column('date', sa.Date()),
+        sa.column('category', sa.String()),
+        sa.column('amount', sa.Float())
+    )
+    year = sa.extract('year', transaction.c.date)
+    month = sa.extract('month', transaction.c.date)
+    amount = transaction.c.amount
+    groups = bind.execute(
+        sa.select(
+            transaction.c.user_id, year, month, transaction.c.category,
+            sa.func.sum(amount),
+            sa.func.count(),
+            sa.func.sum(sa.case((amount > 0, amount), else_=0)),
+            sa.func.sum(sa.case((amount < 0, -amount), else_=0))
+        ).group_by(transaction.c.user_id, year, month, transaction.c.category)
+    ).all()
+
+    rows = [
+        {'user_id': user_id, 'month': f'{int(y):04d}-{int(m):02d}', 'category': category,
+         'total': total, 'count': count, 'income': income or 0.0, 'expenses': expenses or 0.0}
+        for user_id, y, m, category, total, count, income, expenses in groups
+    ]
+    for start in range(0, len(rows), BATCH_SIZE):
+        op.bulk_insert(rollup, rows[start:start + BATCH_SIZE])
+
+
+def downgrade():
+    op.drop_table('transaction_rollup')
@@ -0,0 +1,31 @@
+"""Add user.data_version for versioned cache keys
+
+Revision ID: 0007_user_data_version
+Revises: 0006_transaction_rollup
+Create Date: 2026-10-18 14:10:00.000000
+
+Every write to a user's transactions increments the counter, so cached
+summaries keyed by it can never be served stale.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007_user_data_version'
+down_revision = '0006_transaction_rollup'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'data_version' in {c['name'] for c in sa.inspect(op.get_bind()).get_columns('user')}:
+        return
+
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.add_column(sa.Column('data_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.drop_column('data_version')
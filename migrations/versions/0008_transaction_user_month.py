@@ -0,0 +1,40 @@
+"""Index transactions by (user_id, first day of month)
+
+Revision ID: 0008_transaction_user_month
+Revises: 0007_user_data_version
+Create Date: 2026-10-18 15:00:00.000000
+
+An expression index on the same period_start('month', date) the aggregate
+queries group by, written out for the database being migrated (date() on
+SQLite, date_trunc() on PostgreSQL).
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.schema import CreateIndex
+
+
+# revision identifiers, used by Alembic.
+revision = '0008_transaction_user_month'
+down_revision = '0007_user_data_version'
+branch_labels = None
+depends_on = None
+
+
+def month_start(column):
+    """app.periods.period_start('month', column) as of this revision, frozen so the index never changes"""
+    if op.get_bind().dialect.name == 'sqlite':
+        return sa.func.date(column, sa.literal_column("'start of month'"), type_=sa.Date())
+    # date_trunc on a plain TIMESTAMP is immutable, so PostgreSQL can index it
+    return sa.cast(sa.func.date_trunc(sa.literal_column("'month'"), sa.cast(column, sa.TIMESTAMP())), sa.Date())
+
+
+def upgrade():
+    transaction = sa.Table('transaction', sa.MetaData(), sa.Column('user_id', sa.Integer), sa.Column('date', sa.Date))
+    index = sa.Index('ix_transaction_user_month', transaction.c.user_id, month_start(transaction.c.date))
+
+    # Reflection skips expression indexes on SQLite, so let the database check for one made by create_all()
+    op.get_bind().execute(CreateIndex(index, if_not_exists=True))
+
+
+def downgrade():
+    op.drop_index('ix_transaction_user_month', table_name='transaction')
@@ -0,0 +1,132 @@
+"""Store transaction amounts and rollup sums as integer paise
+
+Revision ID: 0009_amount_paise
+Revises: 0008_transaction_user_month
+Create Date: 2026-10-18 16:40:00.000000
+
+transaction.amount (FLOAT, rupees) becomes transaction.amount_paise
+(BIGINT), rounded half away from zero, and the rollup's float sums become
+total_paise / income_paise / expenses_paise recomputed from the converted
+amounts, so sums are exact from here on.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.schema import CreateIndex
+
+
+# revision identifiers, used by Alembic.
+revision = '0009_amount_paise'
+down_revision = '0008_transaction_user_month'
+branch_labels = None
+depends_on = None
+
+# Rollup rows written per INSERT during the backfill
+BATCH_SIZE = 5000
+
+
+def month_start(column):
+    """First day of the month, as app.periods.period_start compiled it at this revision (index and backfill)"""
+    if op.get_bind().dialect.name == 'sqlite':
+        return sa.func.date(column, sa.literal_column("'start of month'"), type_=sa.Date())
+    # date_trunc on a plain TIMESTAMP is immutable, so PostgreSQL can index it
+    return sa.cast(sa.func.date_trunc(sa.literal_column("'month'"), sa.cast(column, sa.TIMESTAMP())), sa.Date())
+
+
+def _recreate_month_index():
+    """Batch mode rebuilds the table on SQLite and drops expression indexes it cannot reflect"""
+    transaction = sa.Table('transaction', sa.MetaData(), sa.Column('user_id', sa.Integer), sa.Column('date', sa.Date))
+    index = sa.Index('ix_transaction_user_month', transaction.c.user_id, month_start(transaction.c.date))
+    op.get_bind().execute(CreateIndex(index, if_not_exists=True))
+
+
+def _rollup_columns(money_type, suffix):
+    return [
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('month', sa.String(length=7), nullable=False),
+        sa.Column('category', sa.String(length=100), nullable=False),
+        sa.Column(f'total{suffix}', money_type, nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column(f'income{suffix}', money_type, nullable=False),
+        sa.Column(f'expenses{suffix}', money_type, nullable=False),
+    ]
+
+
+def _rebuild_rollup(amount_column, money_type, suffix):
+    """Recreate transaction_rollup with the given money columns and fill it from the transactions"""
+    bind = op.get_bind()
+    op.drop_table('transaction_rollup')
+    rollup = op.create_table(
+        'transaction_rollup',
+        *_rollup_columns(money_type, suffix),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('user_id', 'month', 'category')
+    )
+
+    transaction = sa.table(
+        'transaction',
+        sa.column('user_id', sa.Integer()),
+        sa.column('date', sa.Date()),
+        sa.column('category', sa.String()),
+        sa.column(amount_column, money_type)
+    )
+    month = month_start(transaction.c.date)
+    amount = transaction.c[amount_column]
+    groups = bind.execute(
+        sa.select(
+            transaction.c.user_id, month, transaction.c.category,
+            sa.cast(sa.func.sum(amount), money_type),
+            sa.func.count(),
+            sa.cast(sa.func.sum(sa.case((amount > 0, amount), else_=0)), money_type),
+            sa.cast(sa.func.sum(sa.case((amount < 0, -amount), else_=0)), money_type)
+        ).group_by(transaction.c.user_id, month, transaction.c.category)
+    ).all()
+
+    rows = [
+        {'user_id': user_id, 'month': f'{first_day.year:04d}-{first_day.month:02d}', 'category': category,
+         f'total{suffix}': total, 'count': count, f'income{suffix}': income, f'expenses{suffix}': expenses}
+        for user_id, first_day, category, total, count, income, expenses in groups
+    ]
+    for start in range(0, len(rows), BATCH_SIZE):
+        op.bulk_insert(rollup, rows[start:start + BATCH_SIZE])
+
+
+def upgrade():
+    bind = op.get_bind()
+    with op.batch_alter_table('transaction') as batch_op:
+        batch_op.add_column(sa.Column('amount_paise', sa.BigInteger(), nullable=True))
+
+    # Round half away from zero on the decimal value, as app.models.to_paise does: via NUMERIC on
+    # PostgreSQL, and on SQLite after first dropping binary noise (1.005 * 100 is 100.4999...)
+    amount = sa.column('amount', sa.Float())
+    if bind.dialect.name == 'sqlite':
+        paise = sa.func.round(sa.func.round(amount * 100, 6))
+    else:
+        paise = sa.func.round(sa.cast(amount, sa.Numeric()) * 100)
+    op.execute(
+        sa.table('transaction', sa.column('amount_paise', sa.BigInteger()))
+        .update().values(amount_paise=sa.cast(paise, sa.BigInteger()))
+    )
+
+    with op.batch_alter_table('transaction') as batch_op:
+        batch_op.alter_column('amount_paise', existing_type=sa.BigInteger(), nullable=False)
+        batch_op.drop_column('amount')
+    _recreate_month_index()
+
+    _rebuild_rollup('amount_paise', sa.BigInteger(), '_paise')
+
+
+def downgrade():
+    with op.batch_alter_table('transaction') as batch_op:
+        batch_op.add_column(sa.Column('amount', sa.Float(), nullable=True))
+
+    op.execute(
+        sa.table('transaction', sa.column('amount', sa.Float()), sa.column('amount_paise', sa.BigInteger()))
+        .update().values(amount=sa.column('amount_paise') / 100.0)
+    )
+
+    with op.batch_alter_table('transaction') as batch_op:
+        batch_op.alter_column('amount', existing_type=sa.Float(), nullable=False)
+        batch_op.drop_column('amount_paise')
+    _recreate_month_index()
+
+    _rebuild_rollup('amount', sa.Float(), '')
@@ -0,0 +1,30 @@
+"""Index transactions by (user_id, amount_paise) for top-N reports
+
+Revision ID: 0010_transaction_user_amount
+Revises: 0009_amount_paise
+Create Date: 2026-10-18 17:30:00.000000
+
+The largest expenses and income sources are read with ORDER BY
+amount_paise LIMIT N from either end of this index instead of sorting
+every transaction of the user.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0010_transaction_user_amount'
+down_revision = '0009_amount_paise'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    indexes = {i['name'] for i in sa.inspect(op.get_bind()).get_indexes('transaction')}
+    
+    if 'ix_transaction_user_amount' not in indexes:
+        op.create_index('ix_transaction_user_amount', 'transaction', ['user_id', 'amount_paise'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_transaction_user_amount', table_name='transaction')
@@ -0,0 +1,70 @@
+"""Add the per-user daily rollup behind multi-granularity time series
+
+Revision ID: 0011_transaction_daily
+Revises: 0010_transaction_user_amount
+Create Date: 2026-10-18 18:20:00.000000
+
+transaction_daily holds the net total, count, income and expenses in
+paise of each (user_id, day, category). It is filled here with one
+GROUP BY over the transactions and kept current by app.rollups.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0011_transaction_daily'
+down_revision = '0010_transaction_user_amount'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    tables = sa.inspect(op.get_bind()).get_table_names()
+    
+    if 'transaction_daily' not in tables:
+        op.create_table(
+            'transaction_daily',
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('day', sa.Date(), nullable=False),
+            sa.Column('category', sa.String(length=100), nullable=False),
+            sa.Column('total_paise', sa.BigInteger(), nullable=False),
+            sa.Column('count', sa.Integer(), nullable=False),
+            sa.Column('income_paise', sa.BigInteger(), nullable=False),
+            sa.Column('expenses_paise', sa.BigInteger(), nullable=False),
+            sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+            sa.PrimaryKeyConstraint('user_id', 'day', 'category')
+        )
+    
+    daily = sa.table(
+        'transaction_daily',
+        *(sa.column(name) for name in ('user_id', 'day', 'category', 'total_paise', 'count',
+                                       'income_paise', 'expenses_paise'))
+    )
+    transaction = sa.table(
+        'transaction',
+        sa.column('user_id', sa.Integer()),
+        sa.column('date', sa.Date()),
+        sa.column('category', sa.String()),
+        sa.column('amount_paise', sa.BigInteger())
+    )
+    paise = transaction.c.amount_paise
+    
+    def summed(expression):
+        return sa.cast(sa.func.sum(expression), sa.BigInteger())
+    
+    op.execute(daily.delete())
+    op.execute(daily.insert().from_select(
+        ['user_id', 'day', 'category', 'total_paise', 'count', 'income_paise', 'expenses_paise'],
+        sa.select(
+            transaction.c.user_id, transaction.c.date, transaction.c.category,
+            summed(paise),
+            sa.func.count(),
+            summed(sa.case((paise > 0, paise), else_=0)),
+            summed(sa.case((paise < 0, -paise), else_=0))
+        ).group_by(transaction.c.user_id, transaction.c.date, transaction.c.category)
+    ))
+
+
+def downgrade():
+    op.drop_table('transaction_daily')
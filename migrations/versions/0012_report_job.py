@@ -0,0 +1,48 @@
+"""Add report_job table for background PDF rendering
+
+Revision ID: 0012_report_job
+Revises: 0011_transaction_daily
+Create Date: 2026-10-18 21:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0012_report_job'
+down_revision = '0011_transaction_daily'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'report_job' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    
+    op.create_table(
+        'report_job',
+        sa.Column('id', sa.String(length=32), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('layout', sa.String(length=20), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('filename', sa.String(length=255), nullable=True),
+        sa.Column('path', sa.String(length=500), nullable=True),
+        sa.Column('table_rows', sa.Integer(), nullable=False),
+        sa.Column('size_bytes', sa.Integer(), nullable=True),
+        sa.Column('message', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_report_job_user_id', 'report_job', ['user_id'], unique=False)
+    op.create_index('ix_report_job_expires_at', 'report_job', ['expires_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_report_job_expires_at', table_name='report_job')
+    op.drop_index('ix_report_job_user_id', table_name='report_job')
+    op.drop_table('report_job')
@@ -0,0 +1,44 @@
+"""Add owner and heartbeat_at to the background job tables
+
+Revision ID: 0013_job_heartbeat
+Revises: 0012_report_job
+Create Date: 2026-10-18 23:30:00.000000
+
+The worker process that queues a job records itself as owner and keeps
+refreshing heartbeat_at while the job is queued or running, so a job
+whose worker died can be told apart from one that is still running on
+another worker or host. Jobs left unfinished from before this revision
+have no heartbeat and count as interrupted.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0013_job_heartbeat'
+down_revision = '0012_report_job'
+branch_labels = None
+depends_on = None
+
+TABLES = ('import_job', 'report_job')
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    
+    for table in TABLES:
+        if 'heartbeat_at' in {c['name'] for c in inspector.get_columns(table)}:
+            continue
+        
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column('owner', sa.String(length=255), nullable=True))
+            batch_op.add_column(sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+            batch_op.create_index(f'ix_{table}_status_heartbeat', ['status', 'heartbeat_at'], unique=False)
+
+
+def downgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_index(f'ix_{table}_status_heartbeat')
+            batch_op.drop_column('heartbeat_at')
+            batch_op.drop_column('owner')